@@ -7,15 +7,20 @@ import pandas as pd
 
 # Import layouts from pages
 from src.pages import home, methodology, exploration, leviers, upload
-from src.data import load_data
+from src.data import UPLOADS_DIR, get_snapshot, load_metadata
+from src.datasets import get_dataset
+from src.static_assets import STATIC_CACHE_CONTROL, STATIC_URL_PREFIX, resolve_static_file, stylesheet_urls
 
 # Load data for filter options
-gdf_merged, variable_dict, category_dict, sens_dict, description_dict, unit_dict, gdf_deps, source_dict, classement_dict = load_data()
+variable_dict, category_dict, sens_dict, description_dict, unit_dict, gdf_deps, source_dict, classement_dict = load_metadata()
 
-def get_options(target_cats):
+def get_options(target_cats, dataset=None):
+    ds = dataset if dataset is not None else get_dataset('default')
+    table, variable_dict, category_dict = ds.table, ds.variable_dict, ds.category_dict
+    sens_dict, description_dict, classement_dict = ds.sens_dict, ds.description_dict, ds.classement_dict
     options = []
     for col, label in variable_dict.items():
-        if col not in gdf_merged.columns: continue
+        if col not in table: continue
         cat = str(category_dict.get(col, "")).lower()
         if cat in target_cats:
             rank = str(classement_dict.get(col, ""))
@@ -59,7 +64,8 @@ social_options = get_options(['socioéco'])
 offre_options = get_options(['offre de soins'])
 env_options = get_options(['environnement'])
 
-epci_radar_options = [{'label': n, 'value': c} for n, c in zip(gdf_merged['nom_EPCI'], gdf_merged['EPCI_CODE']) if pd.notnull(n)]
+epci_labels = get_snapshot().table.get(['nom_EPCI', 'EPCI_CODE'])
+epci_radar_options = [{'label': n, 'value': c} for n, c in zip(epci_labels['nom_EPCI'], epci_labels['EPCI_CODE']) if pd.notnull(n)]
 
 NAV_LINK_STYLE = {
     "root": {
@@ -123,13 +129,8 @@ NAV_LINK_STYLE = {
 }
 
 # --- App Setup ---
-external_stylesheets = [
-    'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap',
-    'https://use.fontawesome.com/releases/v5.15.4/css/all.css',
-    'https://unpkg.com/@mantine/core@7/styles.css',
-    'https://unpkg.com/@mantine/dates@7/styles.css',
-    'https://unpkg.com/@mantine/charts@7/styles.css',
-]
+# CDN stylesheets, replaced by their local content-hashed copies once the ETL 'assets' stage has run
+external_stylesheets = stylesheet_urls()
 from flask import send_from_directory, Response
 
 app = dash.Dash(
@@ -171,6 +172,46 @@ def serve_sitemap():
 </urlset>"""
     return Response(content, mimetype='application/xml')
 
+@server.route('/geometry/<tier>/<layer>.geojson')
+def serve_geometry(tier, layer):
+    # Map outlines decoded from the ETL topology (src/topology.py), kept gzip-compressed in memory
+    from flask import request, abort
+    from src.geometry import GEOMETRY_TIERS
+    from src.topology import geojson_layer
+    if tier not in dict(GEOMETRY_TIERS):
+        abort(404)
+    payload = geojson_layer(tier, layer)
+    if payload is None:
+        abort(404)
+    raw, compressed = payload
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(compressed, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(raw, mimetype='application/json')
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+@server.route(STATIC_URL_PREFIX + '<path:filename>')
+def serve_static_asset(filename):
+    # Content-hashed files: the name changes with the content, so they can be cached for a year
+    from flask import request, abort, send_file
+    found = resolve_static_file(filename, request.headers.get('Accept-Encoding', ''))
+    if found is None:
+        abort(404)
+    path, encoding, mimetype, etag = found
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=False, etag=False)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = STATIC_CACHE_CONTROL
+    return response
+
 sidebar = dmc.AppShellNavbar(
     p="md",
     className="app-sidebar",
@@ -748,107 +789,13 @@ def fetch_user_datasets(session_data, pathname, refresh_trigger, local_datasets)
      State('session-store', 'data')]
 )
 def update_active_dataset_data(dataset_value, available_datasets, session_data):
-    global gdf_merged, variable_dict, category_dict, sens_dict, description_dict, unit_dict, gdf_deps, source_dict, classement_dict
-    
-    import src.pages.exploration as explo
-    import src.pages.methodology as methodo
-    
-    if not dataset_value or dataset_value == 'default':
-        g, v, c, s, d, u, gd, sd, cl = load_data()
-    else:
-        dataset_meta = None
-        for d_item in available_datasets:
-            if d_item['file_path'] == dataset_value:
-                dataset_meta = d_item
-                break
-                
-        if not dataset_meta:
-            g, v, c, s, d, u, gd, sd, cl = load_data()
-        else:
-            columns_metadata = dataset_meta.get("columns_metadata", {})
-            local_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", dataset_value)
-            
-            try:
-                # Load the local CSV file
-                df_user = pd.read_csv(local_path)
-                
-                # Merge with base data
-                g_base, v_base, c_base, s_base, d_base, u_base, gd_base, sd_base, cl_base = load_data()
-                
-                # Simplified merging logic since the upload already aggregated it
-                if "CODE_EPCI" in df_user.columns:
-                    df_user['CODE_EPCI'] = df_user['CODE_EPCI'].astype(str).str.replace('.0', '', regex=False).str.strip()
-                    cols_to_add = [col for col in df_user.columns if col == 'CODE_EPCI' or col not in g_base.columns]
-                    df_user_filtered = df_user[cols_to_add]
-                    
-                    g_new = g_base.merge(df_user_filtered, left_on='EPCI_CODE', right_on='CODE_EPCI', how='left')
-                    if 'CODE_EPCI_y' in g_new.columns:
-                        g_new = g_new.drop(columns=['CODE_EPCI_y'])
-                    if 'CODE_EPCI_x' in g_new.columns:
-                        g_new = g_new.rename(columns={'CODE_EPCI_x': 'CODE_EPCI'})
-                        
-                    # Update dictionaries
-                    new_vars = [col for col in df_user.columns if col not in ['CODE_EPCI', 'EPCI_CODE', 'CODE_COMMUNE']]
-                    for var in new_vars:
-                        meta = columns_metadata.get(var, {})
-                        custom_label = meta.get("label", str(var).replace('_', ' ').strip().capitalize())
-                        category = meta.get("category", "environnement")
-                        
-                        v_base[var] = f"⭐ {custom_label}"
-                        c_base[var] = category
-                        s_base[var] = 0
-                        d_base[var] = f"Indicateur importé : {custom_label}"
-                        u_base[var] = "valeur"
-                        sd_base[var] = "Import local"
-                        cl_base[var] = "99"
-                        
-                    g, v, c, s, d, u, gd, sd, cl = g_new, v_base, c_base, s_base, d_base, u_base, gd_base, sd_base, cl_base
-                else:
-                    print("Erreur: CODE_EPCI absent du dataset local.")
-                    g, v, c, s, d, u, gd, sd, cl = g_base, v_base, c_base, s_base, d_base, u_base, gd_base, sd_base, cl_base
-            except Exception as ex:
-                print(f"Erreur de chargement du dataset local ({local_path}): {ex}")
-                g, v, c, s, d, u, gd, sd, cl = load_data()
-                
-    gdf_merged = g
-    variable_dict = v
-    category_dict = c
-    sens_dict = s
-    description_dict = d
-    unit_dict = u
-    gdf_deps = gd
-    source_dict = sd
-    classement_dict = cl
-    
-    explo.gdf_merged = g
-    explo.variable_dict = v
-    explo.category_dict = c
-    explo.sens_dict = s
-    explo.description_dict = d
-    explo.unit_dict = u
-    explo.gdf_deps = gd
-    explo.source_dict = sd
-    explo.classement_dict = cl
-    
-    if g.crs is None:
-        g.set_crs(epsg=4326, inplace=True)
-    explo.gdf_4326 = g.to_crs(epsg=4326)
-    if gd.crs is None:
-        gd.set_crs(epsg=4326, inplace=True)
-    explo.gdf_deps_4326 = gd.to_crs(epsg=4326)
-    
-    methodo.gdf_merged = g
-    methodo.variable_dict = v
-    methodo.category_dict = c
-    methodo.sens_dict = s
-    methodo.description_dict = d
-    methodo.unit_dict = u
-    methodo.source_dict = sd
-    methodo.classement_dict = cl
-
-    social_opts = get_options(['socioéco'])
-    offre_opts = get_options(['offre de soins'])
-    env_opts = get_options(['environnement'])
+    # The dataset is resolved per request from the session's selection: no module global is mutated
+    ds = get_dataset(dataset_value, available_datasets)
+    v, c = ds.variable_dict, ds.category_dict
+
+    social_opts = get_options(['socioéco'], ds)
+    offre_opts = get_options(['offre de soins'], ds)
+    env_opts = get_options(['environnement'], ds)
     
     health_opts = [
         {'label': 'Incidence', 'value': 'INCI'},
@@ -968,7 +915,7 @@ def execute_dataset_deletion(confirm_clicks, target_dataset, session_data, curre
     # Mode offline : suppression locale
     if owner_uid == "local":
         try:
-            local_abs_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", file_path)
+            local_abs_path = os.path.join(UPLOADS_DIR, file_path)
             if os.path.exists(local_abs_path):
                 os.remove(local_abs_path)
         except Exception as e:
@@ -985,12 +932,16 @@ def execute_dataset_deletion(confirm_clicks, target_dataset, session_data, curre
 @app.callback(
     Output("main-indicator-tooltip", "label"),
     [Input("map-indic-select", "value"),
-     Input("map-patho-select", "value")]
+     Input("map-patho-select", "value")],
+    [State("dataset-select", "value"),
+     State("available-datasets-store", "data")]
 )
-def update_main_indicator_tooltip(ind, patho):
+def update_main_indicator_tooltip(ind, patho, dataset_value, available_datasets):
     target = f"{ind}_{patho}"
     if target == 'INCI_CNR': target = 'Taux_CNR'
     
+    ds = get_dataset(dataset_value, available_datasets)
+    variable_dict, description_dict, sens_dict = ds.variable_dict, ds.description_dict, ds.sens_dict
     friendly_cat = "Santé"
     label_var = variable_dict.get(target, target)
     desc = description_dict.get(target, "Description non disponible.")
@@ -0,0 +1,110 @@
+if (!window.dash_clientside) {
+    window.dash_clientside = {};
+}
+
+// Clientside range filtering of the exploration map (SENIAURA_MAP_CLIENTSIDE=1).
+// Mirrors src/filters.py: inclusive bounds, missing values are excluded. Columns arrive as
+// base64 float64, the values the server filters on, so both sides exclude the same territories.
+(function () {
+    var decoded = {}; // "version:column" -> Float64Array
+
+    function column(payload, col) {
+        var key = payload.version + ':' + col;
+        if (!decoded[key]) {
+            var b64 = payload.columns[col];
+            if (b64 === undefined) {
+                return null;
+            }
+            var bin = atob(b64);
+            var bytes = new Uint8Array(bin.length);
+            for (var i = 0; i < bin.length; i++) {
+                bytes[i] = bin.charCodeAt(i);
+            }
+            decoded[key] = new Float64Array(bytes.buffer);
+        }
+        return decoded[key];
+    }
+
+    window.dash_clientside.map = {
+        filterMap: function (dragValues, values, ids, payload, figure, highlightVar) {
+            var noUpdate = window.dash_clientside.no_update;
+            if (!payload || !figure || !figure.data || figure.data.length < 6) {
+                return noUpdate;
+            }
+            // The figure must belong to the dataset the payload was built for
+            if (!figure.layout || figure.layout.meta !== payload.version) {
+                return noUpdate;
+            }
+            var target = column(payload, figure.data[1].meta);
+            if (!target) {
+                return noUpdate;
+            }
+
+            var triggered = (window.dash_clientside.callback_context || {}).triggered || [];
+            var dragging = triggered.some(function (t) { return t.prop_id.indexOf('.drag_value') !== -1; });
+
+            var filters = [];
+            (ids || []).forEach(function (id, i) {
+                var val = (dragging && dragValues[i]) ? dragValues[i] : values[i];
+                var data = column(payload, id.index);
+                if (!val || !data) {
+                    return;
+                }
+                filters.push({
+                    col: id.index,
+                    data: data,
+                    lo: val[0],
+                    hi: val[1],
+                    label: '<br>- ' + (payload.labels[id.index] || id.index)
+                });
+            });
+
+            var n = payload.n;
+            var reasons = new Array(n).fill('');
+            var highlight = null;
+            filters.forEach(function (f) {
+                var isHighlight = f.col === highlightVar;
+                if (isHighlight) {
+                    highlight = {locations: [], z: [], text: []};
+                }
+                for (var i = 0; i < n; i++) {
+                    var v = f.data[i];
+                    // NaN fails both comparisons, i.e. excluded
+                    if (!(v >= f.lo && v <= f.hi)) {
+                        reasons[i] += f.label;
+                        if (isHighlight) {
+                            highlight.locations.push(payload.codes[i]);
+                            highlight.z.push(1);
+                            highlight.text.push(payload.names[i]);
+                        }
+                    }
+                }
+            });
+
+            var bgText = new Array(n);
+            var focus = {locations: [], z: [], text: [], customdata: []};
+            for (var i = 0; i < n; i++) {
+                if (reasons[i]) {
+                    bgText[i] = payload.background[i] + payload.header + reasons[i];
+                } else {
+                    bgText[i] = payload.background[i];
+                    var z = target[i];
+                    focus.locations.push(payload.codes[i]);
+                    focus.z.push(isNaN(z) ? null : z);
+                    focus.text.push(payload.focus[i]);
+                    focus.customdata.push(payload.codes[i]);
+                }
+            }
+
+            var data = figure.data.slice();
+            data[0] = Object.assign({}, data[0], {text: bgText});
+            data[1] = Object.assign({}, data[1], focus);
+            if (highlight) {
+                data[3] = Object.assign({}, data[3], highlight);
+            } else {
+                data[3] = Object.assign({}, data[3], {locations: [], z: [], text: []});
+            }
+            return Object.assign({}, figure, {data: data});
+        }
+    };
+})();
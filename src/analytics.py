@@ -0,0 +1,182 @@
+"""
+Per-dataset descriptive statistics shared by the radar, the quantile panel and the PDF report.
+
+`stats_table(ds)` is built once per snapshot (memoized), `stats_table(ds, variables)` from
+per-column results memoized the same way; both answer every lookup with array indexing: values,
+regional percentiles and the alert / strength classification are (territories × variables)
+matrices, and EPCI codes and variable names resolve to row / column positions through plain dicts.
+Percentiles and statuses are stored as int8.
+"""
+
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+NON_NUMERIC_COLUMNS = {'CODE_EPCI', 'EPCI_CODE', 'nom_EPCI', 'LIBEPCI', 'Département', 'NATURE_EPCI', 'geometry'}
+
+# Regional positioning of a territory on a variable (thresholds 10 / 25 / 75 / 90 % in the
+# favourable direction given by `Sens`). Missing values are classified as balanced.
+STATUS_ALERT = -2
+STATUS_WATCH = -1
+STATUS_BALANCED = 0
+STATUS_ASSET = 1
+STATUS_STRENGTH = 2
+
+PERCENTILE_MISSING = -1
+
+
+def classify_percentiles(pct, high_is_good):
+    """
+    Status matrix (int8) for percentiles `pct` in [0, 100] (n × k, NaN allowed) and the per-variable
+    direction `high_is_good` (k,): for a variable where higher is better, ≤ 10 is an alert and
+    ≥ 90 a strength; otherwise the other way round.
+    """
+    hi = np.asarray(high_is_good, dtype=bool)[None, :]
+    with np.errstate(invalid='ignore'):
+        low10, low25, high75, high90 = pct <= 10, pct <= 25, pct >= 75, pct >= 90
+    alert = np.where(hi, low10, high90)
+    watch = np.where(hi, low25, high75) & ~alert
+    strength = np.where(hi, high90, low10)
+    asset = np.where(hi, high75, low25) & ~strength
+    return np.select(
+        [alert, watch, strength, asset],
+        [STATUS_ALERT, STATUS_WATCH, STATUS_STRENGTH, STATUS_ASSET],
+        STATUS_BALANCED,
+    ).astype(np.int8)
+
+
+@dataclass(frozen=True)
+class StatsTable:
+    """
+    Column statistics of one dataset. `values`, `percentile` and `status` are (n_epci, n_vars);
+    `minimum`, `maximum`, `mean`, `std` (ddof=1, like pandas) and `high_is_good` are (n_vars,).
+    NaN values are ignored by the statistics and get PERCENTILE_MISSING / STATUS_BALANCED.
+    """
+    columns: tuple
+    position: dict      # variable -> column position
+    row_of: dict        # EPCI_CODE -> row position (first occurrence)
+    codes: np.ndarray
+    names: np.ndarray
+    values: np.ndarray
+    percentile: np.ndarray      # int8, rounded regional percentile rank (pandas rank(pct=True) × 100)
+    status: np.ndarray          # int8, STATUS_* computed from the exact ranks
+    high_is_good: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+
+    def cols(self, variables):
+        """Column positions of `variables` (KeyError for a variable that is not numeric here)."""
+        return np.fromiter((self.position[v] for v in variables), dtype=np.intp, count=len(variables))
+
+    def rows(self, epci_codes):
+        """Row positions of the known `epci_codes`, in the given order (unknown codes are skipped)."""
+        rows = [self.row_of[str(c)] for c in (epci_codes or []) if str(c) in self.row_of]
+        return np.asarray(rows, dtype=np.intp)
+
+
+def _is_statistic(table, column, variable_dict):
+    return column not in NON_NUMERIC_COLUMNS and (
+        column in variable_dict or pd.api.types.is_numeric_dtype(table[column]))
+
+
+def _row_lookup(table):
+    """(codes, names, row_of) of an attribute table."""
+    codes = table['EPCI_CODE'].astype(str).to_numpy(dtype=object)
+    row_of = {}
+    for i, code in enumerate(codes):
+        row_of.setdefault(code, i)
+    names = table['nom_EPCI'].to_numpy(dtype=object) if 'nom_EPCI' in table.columns else codes
+    return codes, names, row_of
+
+
+def _assemble(columns, values, pct, rows, sens_dict):
+    """StatsTable from the (n × k) values and exact percentile ranks of `columns`."""
+    codes, names, row_of = rows
+    # Ranks are exact when classifying; only the stored percentile is rounded to int8
+    high_is_good = np.array([sens_dict.get(c, -1) == 1 for c in columns], dtype=bool)
+    status = classify_percentiles(pct, high_is_good)
+    percentile = np.where(np.isnan(pct), PERCENTILE_MISSING, np.rint(pct)).astype(np.int8)
+
+    # Nan-aware reductions; all-NaN columns give NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        minimum = np.nanmin(values, axis=0) if len(values) else np.full(len(columns), np.nan)
+        maximum = np.nanmax(values, axis=0) if len(values) else np.full(len(columns), np.nan)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0, ddof=1)
+
+    for arr in (values, percentile, status, high_is_good, minimum, maximum, mean, std):
+        arr.setflags(write=False)
+    return StatsTable(
+        columns=columns,
+        position={c: i for i, c in enumerate(columns)},
+        row_of=row_of,
+        codes=codes,
+        names=names,
+        values=values,
+        percentile=percentile,
+        status=status,
+        high_is_good=high_is_good,
+        minimum=minimum,
+        maximum=maximum,
+        mean=mean,
+        std=std,
+    )
+
+
+def build_stats_table(gdf_merged, variable_dict, sens_dict, columns=None):
+    """
+    StatsTable of `columns` (default: every numeric column) of a merged frame or of a snapshot's
+    ColumnTable (only `columns` are then loaded).
+    """
+    g = gdf_merged
+    if columns is None:
+        columns = [c for c in g.columns if c not in NON_NUMERIC_COLUMNS]
+        source = g[columns]
+        columns = [c for c in columns if _is_statistic(source, c, variable_dict)]
+    columns = tuple(dict.fromkeys(columns))
+    source = g[list(columns)]
+    frame = pd.DataFrame({c: pd.to_numeric(source[c], errors='coerce') for c in columns}, index=source.index)
+    values = frame.to_numpy(dtype=np.float64)
+    pct = frame.rank(pct=True).to_numpy(dtype=np.float64) * 100
+    return _assemble(columns, values, pct, _row_lookup(g), sens_dict)
+
+
+def stats_table(ds, variables=None):
+    """
+    StatsTable of the dataset. Without `variables`, every numeric column, built once per snapshot.
+    With `variables`, only those (the numeric ones; others raise KeyError in `cols`): each column's
+    statistics are built once per snapshot and the requested ones stacked, so the radar only loads
+    the columns it shows.
+    """
+    if variables is None:
+        return ds.memo('analytics.stats', lambda: build_stats_table(ds.table, ds.variable_dict, ds.sens_dict))
+
+    table = ds.table
+    # One projection for every column not loaded yet
+    source = table.load([v for v in dict.fromkeys(variables) if v in table])
+    rows = ds.memo('analytics.rows', lambda: _row_lookup(table))
+
+    def column_stats(column):
+        def build():
+            frame = pd.DataFrame({column: pd.to_numeric(source[column], errors='coerce')})
+            values = frame.to_numpy(dtype=np.float64)
+            pct = frame.rank(pct=True).to_numpy(dtype=np.float64) * 100
+            return _assemble((column,), values, pct, rows, ds.sens_dict)
+        return ds.memo(f'analytics.column.{column}', build)
+
+    parts = [column_stats(c) for c in source if _is_statistic(source, c, ds.variable_dict)]
+    if not parts:
+        return build_stats_table(table, ds.variable_dict, ds.sens_dict, columns=())
+    first = parts[0]
+    columns = tuple(p.columns[0] for p in parts)
+    stacked = {name: np.concatenate([getattr(p, name) for p in parts], axis=-1)
+               for name in ('values', 'percentile', 'status', 'high_is_good', 'minimum', 'maximum', 'mean', 'std')}
+    for arr in stacked.values():
+        arr.setflags(write=False)
+    return StatsTable(columns=columns, position={c: i for i, c in enumerate(columns)}, row_of=first.row_of,
+                      codes=first.codes, names=first.names, **stacked)
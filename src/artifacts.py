@@ -0,0 +1,42 @@
+"""
+Read-only access to the build artifacts produced by `src/etl/pipeline.py` (data/artifacts/).
+The app only reads them; the pipeline is the single writer.
+"""
+
+import os
+import json
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get("SENIAURA_DATA_DIR", os.path.join(PROJECT_ROOT, "data"))
+# Artifacts live next to the data they were built from
+ARTIFACTS_DIR = os.environ.get("SENIAURA_ARTIFACTS_DIR", os.path.join(DATA_DIR, "artifacts"))
+
+
+def artifact_path(name):
+    return os.path.join(ARTIFACTS_DIR, name)
+
+
+def read_json_artifact(name):
+    """Returns the decoded JSON artifact, or None if it has not been built."""
+    path = artifact_path(name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Artefact illisible ({path}) : {e}")
+        return None
+
+
+def write_json_artifact(name, payload):
+    """Writes a JSON artifact atomically (build side only). Returns its path."""
+    path = artifact_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = dict(payload, created=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,121 @@
+"""
+Global K-Means typology (`Cluster_Global`).
+
+The model is fitted offline by the `clustering` stage of `src/etl/pipeline.py` and persisted as
+data/artifacts/cluster_global.json (imputation medians, scaler, ordered centroids, label mapping and
+per-EPCI labels). At runtime the app only loads it: known EPCIs keep their stored label and new or
+uploaded territories are assigned to the nearest centroid, so every worker gets the same labels.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from .artifacts import artifact_path, read_json_artifact
+
+CLUSTER_MODEL_ARTIFACT = "cluster_global.json"
+CLUSTER_MODEL_PATH = artifact_path(CLUSTER_MODEL_ARTIFACT)
+CLUSTER_MODEL_FORMAT = 1
+
+GLOBAL_CLUSTER_VARS = [
+    'FDep_2021',
+    'APL-med_general_2023',
+    'APL_Cardio_EPCI',
+    'Part de personnes isolées 60 ans et plus',
+    'AIR01',
+    'MORT_CardIsch'
+]
+N_CLUSTERS = 4
+
+# Variables of each thematic profile of the exploration page (THEME_METADATA)
+THEME_VARIABLES = {
+    'sante': ['INCI_AVC', 'INCI_CardIsch', 'INCI_InsuCard', 'MORT_AVC', 'MORT_CardIsch', 'MORT_InsuCard', 'PREV_AVC', 'PREV_CardIsch', 'PREV_InsuCard'],
+    'socio': ['FDep_2021', 'MED_SL', 'PR_MD60', 'Part de personnes isolées 60 ans et plus', 'Taux de chomeurs_2022'],
+    'offre': ['APL-med_general_2023', 'APL_Cardio_EPCI', 'Officines_2025', 'Centres_Sante_2025', 'Maisons_Sante_2025'],
+    'env': ['AIR01', 'AIR02', 'BRUIT01', 'BRUIT02'],
+}
+
+
+def _prepare_features(gdf_merged, global_vars, medians=None):
+    """Numeric feature table with missing values imputed (column median, or the stored medians)."""
+    df_cluster = gdf_merged[['EPCI_CODE'] + [c for c in global_vars if c in gdf_merged.columns]].copy()
+    used_medians = {}
+    for col in global_vars:
+        if col not in df_cluster.columns:
+            df_cluster[col] = 0.0
+        df_cluster[col] = pd.to_numeric(df_cluster[col], errors='coerce')
+        if medians is not None:
+            median_val = medians.get(col, 0.0)
+        else:
+            median_val = df_cluster[col].median()
+            median_val = float(median_val) if pd.notna(median_val) else 0.0
+        used_medians[col] = median_val
+        if df_cluster[col].isnull().any():
+            df_cluster[col] = df_cluster[col].fillna(median_val)
+    return df_cluster, used_medians
+
+
+def fit_global_model(gdf_merged, sens_dict, global_vars=GLOBAL_CLUSTER_VARS, n_clusters=N_CLUSTERS):
+    """Fits StandardScaler + K-Means (K=4) with anti-label-switching and returns the serialisable model."""
+    df_cluster, medians = _prepare_features(gdf_merged, global_vars)
+
+    # Standardize data
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(df_cluster[global_vars])
+
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    raw_clusters = kmeans.fit_predict(X_scaled)
+
+    # Anti-Label Switching: Sort clusters by average vulnerability direction
+    directions = np.array([sens_dict.get(v, -1) for v in global_vars])
+    cluster_vulnerability = []
+    for c in range(n_clusters):
+        c_mean_z = X_scaled[raw_clusters == c].mean(axis=0)
+        vuln_score = np.sum(c_mean_z * (-directions))
+        cluster_vulnerability.append((c, vuln_score))
+
+    sorted_clusters = sorted(cluster_vulnerability, key=lambda x: x[1], reverse=True)
+    label_mapping = {raw_c: new_c for new_c, (raw_c, _) in enumerate(sorted_clusters)}
+
+    # Centroids stored in final label order: nearest centroid index == Cluster_Global label
+    ordered_centroids = [kmeans.cluster_centers_[raw_c].tolist() for raw_c, _ in sorted_clusters]
+    labels = pd.Series(raw_clusters, index=df_cluster.index).map(label_mapping)
+
+    return {
+        "format": CLUSTER_MODEL_FORMAT,
+        "variables": list(global_vars),
+        "n_clusters": n_clusters,
+        "impute_medians": medians,
+        "scaler": {"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()},
+        "centroids": ordered_centroids,
+        "label_mapping": {str(k): int(v) for k, v in label_mapping.items()},
+        "labels": {str(code): int(lbl) for code, lbl in zip(df_cluster['EPCI_CODE'], labels)},
+    }
+
+
+def load_global_model():
+    """Returns the persisted model, or None if the pipeline has not produced it."""
+    model = read_json_artifact(CLUSTER_MODEL_ARTIFACT)
+    if model is None or model.get("format") != CLUSTER_MODEL_FORMAT:
+        return None
+    return model
+
+
+def assign_global_clusters(gdf_merged, model):
+    """Cluster_Global labels for `gdf_merged`: stored label if known, nearest centroid otherwise."""
+    global_vars = model["variables"]
+    codes = gdf_merged['EPCI_CODE'].astype(str)
+    labels = codes.map(model["labels"])
+
+    missing = labels.isna().to_numpy()
+    if missing.any():
+        df_cluster, _ = _prepare_features(gdf_merged.loc[missing], global_vars, medians=model["impute_medians"])
+        mean = np.asarray(model["scaler"]["mean"])
+        scale = np.asarray(model["scaler"]["scale"])
+        centroids = np.asarray(model["centroids"])
+        X_scaled = (df_cluster[global_vars].to_numpy(dtype=float) - mean) / np.where(scale == 0, 1.0, scale)
+        dist = ((X_scaled[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        labels.loc[missing] = dist.argmin(axis=1)
+
+    return labels.astype(int)
@@ -0,0 +1,182 @@
+"""
+Column-on-demand access to a snapshot's attribute table.
+
+`DataSnapshot.table` is a ColumnTable: the key and label columns (`KEY_COLUMNS`) are read up
+front, every other indicator column is taken from the snapshot's cache file the first time a
+callback asks for it (`table[name]`, `table.get(names)`), then kept for the life of the snapshot.
+A session that maps one health indicator with a few determinants therefore only ever loads those
+columns, whatever the width of the dataset.
+
+The cache file is an uncompressed Arrow IPC (Feather v2) file, memory-mapped read-only
+(`from_arrow`). Numeric columns are written with NaN as a value rather than as null, so they map
+to numpy arrays over the mapping without any copy: every Gunicorn worker reads the same pages of
+the OS page cache instead of holding its own copy of the table.
+
+A ColumnTable answers the read-only subset of the DataFrame interface the callbacks use
+(`columns`, `index`, `len()`, `in`, `table[name]`, `table[[names]]`); `frame()` materializes the
+whole table for legacy code (`DataSnapshot.gdf_merged`, `load_data()`).
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Identifier and label columns, loaded with the table (option lists, tooltips, joins)
+KEY_COLUMNS = ('EPCI_CODE', 'CODE_EPCI', 'nom_EPCI', 'LIBEPCI', 'Département', 'DEPARTEMEN', 'NATURE_EPCI', 'Cluster_Global')
+
+
+class ColumnTable:
+    """
+    Read-only attribute table whose columns are loaded on first access and cached. Columns come
+    back as pandas Series on a RangeIndex, aligned by position with the snapshot's geometry store.
+    """
+
+    def __init__(self, columns, n_rows, reader, loaded=None, arrow=None):
+        self._columns = pd.Index(columns)
+        self._index = pd.RangeIndex(n_rows)
+        self._reader = reader
+        self._cache = dict(loaded or {})
+        self._frame = None
+        self._arrow = arrow
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Table over an in-memory frame (every column already loaded)."""
+        frame = frame.reset_index(drop=True)
+        table = cls(frame.columns, len(frame), None, loaded={c: frame[c] for c in frame.columns})
+        table._frame = frame
+        return table
+
+    @classmethod
+    def from_arrow(cls, path, eager=KEY_COLUMNS):
+        """
+        Table over an Arrow IPC file written by `write_arrow`, memory-mapped read-only. The mapping
+        stays valid after the file has been pruned from the cache.
+        """
+        arrow = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        index = pd.RangeIndex(arrow.num_rows)
+
+        def read(columns):
+            return {c: _to_series(arrow.column(c), c, index) for c in columns}
+
+        table = cls(arrow.column_names, arrow.num_rows, read, arrow=arrow)
+        table.load([c for c in eager if c in table])
+        return table
+
+    def extend(self, frame):
+        """
+        New table with the columns of `frame` (row-aligned, e.g. an uploaded dataset) appended;
+        the other columns are still served, and cached, by this table.
+        """
+        frame = frame.reset_index(drop=True)
+        added = [c for c in frame.columns if c not in self]
+        base = self
+
+        def read(columns):
+            return base.load(columns)
+
+        # Same Arrow buffers as this table, plus the new columns
+        arrow, added_arrow = self.arrow(), to_arrow(frame[added])
+        for field, column in zip(added_arrow.schema, added_arrow.columns):
+            arrow = arrow.append_column(field, column)
+        return ColumnTable(list(self._columns) + added, len(self), read, loaded={c: frame[c] for c in added}, arrow=arrow)
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def loaded(self):
+        """Names of the columns already handed out (numeric ones are views of the mapping), in table order."""
+        return tuple(c for c in self._columns if c in self._cache)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, key):
+        if isinstance(key, (list, tuple, pd.Index)):
+            return self.get(key)
+        return self.load([key])[key]
+
+    def load(self, names):
+        """{name: Series} of `names`, reading the missing ones in one projection (no frame is built)."""
+        missing = [c for c in dict.fromkeys(names) if c not in self._cache]
+        if missing:
+            unknown = [c for c in missing if c not in self]
+            if unknown:
+                raise KeyError(unknown)
+            with self._lock:
+                missing = [c for c in missing if c not in self._cache]
+                if missing:
+                    self._cache.update(self._reader(missing))
+        return {c: self._cache[c] for c in names}
+
+    def get(self, names):
+        """DataFrame of `names` (in the given order), loading the columns not read yet."""
+        names = list(names)
+        columns = self.load(names)
+        frame = pd.DataFrame({c: columns[c] for c in dict.fromkeys(names)}, index=self._index)
+        return frame if len(frame.columns) == len(names) else frame[names]
+
+    def arrow(self):
+        """
+        The table as a pyarrow Table, for readers that scan it themselves (src/query.py): the
+        memory-mapped cache file, plus the columns added by `extend`. Converted once from the
+        frame for a table without cache file.
+        """
+        if self._arrow is None:
+            arrow = to_arrow(self.frame())
+            with self._lock:
+                if self._arrow is None:
+                    self._arrow = arrow
+        return self._arrow
+
+    def frame(self):
+        """The whole table as one DataFrame (loads every column once; shared, do not modify)."""
+        if self._frame is None:
+            frame = self.get(self._columns)
+            with self._lock:
+                if self._frame is None:
+                    self._frame = frame
+                    # The cached Series become views of the frame instead of separate copies
+                    self._cache = {c: frame[c] for c in self._columns}
+        return self._frame
+
+
+def to_arrow(frame):
+    """
+    pyarrow Table of `frame`. Numpy numeric columns keep NaN as a value (no validity bitmap) so
+    that `from_arrow` can hand them out without copying; other columns map missing values to null.
+    """
+    arrays = []
+    for column in frame.columns:
+        series = frame[column]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'fiu':
+            arrays.append(pa.array(series.to_numpy()))
+        else:
+            arrays.append(pa.array(series, from_pandas=True))
+    return pa.table(arrays, names=[str(c) for c in frame.columns])
+
+
+def write_arrow(frame, path):
+    """Writes `frame` as one uncompressed record batch (Feather v2), the layout `from_arrow` maps."""
+    table = to_arrow(frame)
+    feather.write_feather(table, path, compression='uncompressed', chunksize=max(table.num_rows, 1))
+
+
+def _to_series(column, name, index):
+    """Series over an Arrow column: a view of the mapping for a contiguous numeric column without nulls."""
+    if column.num_chunks == 1 and column.null_count == 0 and (pa.types.is_floating(column.type) or pa.types.is_integer(column.type)):
+        return pd.Series(column.chunk(0).to_numpy(zero_copy_only=True), index=index, name=name, copy=False)
+    return pd.Series(column.to_pandas(), name=name).set_axis(index)
@@ -2,54 +2,375 @@
 import pandas as pd
 import geopandas as gpd
 import os
+import glob
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+import pyarrow as pa
+
+from .columns import ColumnTable, write_arrow
+from .geometry import GeometryStore
+from .territories import TERRITORIES_PATH, file_hash, load_departments
+from .clustering import CLUSTER_MODEL_PATH, assign_global_clusters, fit_global_model, load_global_model
 
 # Paths
 # Assumes this file is in src/, so we go up one level to dashboard interactif, then up/down to data
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # dashboard interactif
 PROJECT_ROOT = os.path.dirname(BASE_DIR) # projet_2
 
-DATA_DIR_DASH = os.path.join(BASE_DIR, "data")
+# SENIAURA_DATA_DIR points the whole build at another data set (e.g. a synthetic one from src/etl/synthetic.py)
+DATA_DIR_DASH = os.environ.get("SENIAURA_DATA_DIR", os.path.join(BASE_DIR, "data"))
 GEOJSON_SIMPLIFIED_PATH = os.path.join(DATA_DIR_DASH, "epci-ara-simplified.geojson")
 GEOJSON_ORIGINAL_PATH = os.path.join(DATA_DIR_DASH, "epci-ara.geojson")
 DATASET_PARQUET_PATH = os.path.join(DATA_DIR_DASH, "FINAL-DATASET-epci-11.parquet")
 DATASET_EXCEL_PATH = os.path.join(DATA_DIR_DASH, "FINAL-DATASET-epci-11.xlsx")
 METADATA_PATH = os.path.join(PROJECT_ROOT, "data", "table_variables.csv")
+DICT_PATH = os.path.join(DATA_DIR_DASH, "dictionnaire_variables.csv")
 
-def load_data():
+# User uploads: the `file_path` of a local dataset ("local/<id>.csv") is relative to this directory. It does not
+# follow SENIAURA_DATA_DIR, so switching the base data set keeps the uploads already listed in the browser readable.
+UPLOADS_DIR = os.environ.get("SENIAURA_UPLOADS_DIR", os.path.join(BASE_DIR, "data"))
+
+# Persistent cache of the fully built snapshot (Arrow IPC + GeoParquet + JSON sidecar), shared by workers and
+# restarts. The Arrow files are memory-mapped read-only, so the workers of one host share a single copy.
+# Bump CACHE_FORMAT whenever the build logic changes so stale caches are ignored.
+CACHE_DIR = os.environ.get("SENIAURA_CACHE_DIR", os.path.join(DATA_DIR_DASH, "cache"))
+CACHE_FORMAT = 5
+
+
+@dataclass(frozen=True)
+class DataSnapshot:
     """
-    Loads and merges the GeoJSON and Excel/Parquet data.
-    Returns:
-        gdf_merged (GeoDataFrame): The merged data ready for visualization.
-        variable_dict (dict): Dictionary mapping column names to human-readable labels.
-        category_dict (dict): Dictionary mapping column names to their category.
-        sens_dict (dict): Dictionary mapping column names to their sens.
-        description_dict (dict): Dictionary mapping column names to their descriptions.
+    Immutable result of one full data build, shared by every page and callback of the process.
+    The dictionaries are read-only views and the frames must not be modified in place.
+    `table` is the attribute table (a ColumnTable: indicator columns are loaded on first use);
+    the outlines live in `geometry`, aligned with it by row position.
     """
+    version: str
+    table: ColumnTable
+    variable_dict: MappingProxyType
+    category_dict: MappingProxyType
+    sens_dict: MappingProxyType
+    description_dict: MappingProxyType
+    unit_dict: MappingProxyType
+    gdf_deps: gpd.GeoDataFrame
+    source_dict: MappingProxyType
+    classement_dict: MappingProxyType
+    geometry: GeometryStore
+    _memo: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Reentrant: a factory may itself memoize other values (e.g. the map payload reads filter_matrix)
+    _memo_lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+
+    @property
+    def gdf_merged(self):
+        """The whole attribute table as one DataFrame (loads every column; prefer `table`)."""
+        return self.table.frame()
+
+    def metadata(self):
+        """Legacy tuple without the attribute table: the dictionaries (mutable copies) and gdf_deps."""
+        return (dict(self.variable_dict), dict(self.category_dict), dict(self.sens_dict), dict(self.description_dict),
+                dict(self.unit_dict), self.gdf_deps, dict(self.source_dict), dict(self.classement_dict))
+
+    def as_tuple(self):
+        """Legacy 9-tuple returned by load_data(), with mutable copies of the dictionaries."""
+        return (self.gdf_merged,) + self.metadata()
 
-    # 1. Load GeoJSON (Simplified preferred)
+    def memo(self, key, factory):
+        """Computes `factory()` once per snapshot and returns the cached value afterwards."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._memo_lock:
+            if key not in self._memo:
+                self._memo[key] = factory()
+            return self._memo[key]
+
+
+_snapshot = None
+_snapshot_stat = None
+_snapshot_lock = threading.Lock()
+
+
+def _source_paths():
+    """
+    Returns the (geojson, dataset, dictionary, cluster model, territory artifacts) files a build
+    reads. The last three are optional.
+    """
+    # GeoJSON (Simplified preferred)
     if os.path.exists(GEOJSON_SIMPLIFIED_PATH):
-        geojson_path_to_load = GEOJSON_SIMPLIFIED_PATH
+        geojson_path = GEOJSON_SIMPLIFIED_PATH
     elif os.path.exists(GEOJSON_ORIGINAL_PATH):
-        geojson_path_to_load = GEOJSON_ORIGINAL_PATH
+        geojson_path = GEOJSON_ORIGINAL_PATH
     else:
         raise FileNotFoundError(f"GeoJSON not found at {GEOJSON_SIMPLIFIED_PATH} or {GEOJSON_ORIGINAL_PATH}")
-    
-    gdf_epci = gpd.read_file(geojson_path_to_load)
-    gdf_epci['EPCI_CODE'] = gdf_epci['EPCI_CODE'].astype(str)
 
-    # 2. Load Dataset (Parquet preferred)
+    # Dataset (Parquet preferred)
     if os.path.exists(DATASET_PARQUET_PATH):
-        df = pd.read_parquet(DATASET_PARQUET_PATH)
+        dataset_path = DATASET_PARQUET_PATH
     elif os.path.exists(DATASET_EXCEL_PATH):
-        df = pd.read_excel(DATASET_EXCEL_PATH)
+        dataset_path = DATASET_EXCEL_PATH
     else:
         raise FileNotFoundError(f"Dataset not found at {DATASET_PARQUET_PATH} or {DATASET_EXCEL_PATH}")
+
+    dict_path = DICT_PATH if os.path.exists(DICT_PATH) else None
+    # The cluster model is part of the version so a new `clustering` build invalidates the snapshot
+    model_path = CLUSTER_MODEL_PATH if os.path.exists(CLUSTER_MODEL_PATH) else None
+    territories_path = TERRITORIES_PATH if os.path.exists(TERRITORIES_PATH) else None
+    return geojson_path, dataset_path, dict_path, model_path, territories_path
+
+
+def geometry_source_path():
+    """EPCI GeoJSON the snapshot is built from (the simplified file when present)."""
+    return _source_paths()[0]
+
+
+def _stat_signature(paths):
+    """Cheap change detector: (path, mtime, size) of every source file."""
+    signature = []
+    for path in paths:
+        if path is None:
+            signature.append(None)
+            continue
+        st = os.stat(path)
+        signature.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def _content_hash(paths):
+    """SHA-256 of the source files' contents, used as the snapshot version."""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(str(path).encode("utf-8"))
+        if path is None:
+            continue
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def get_snapshot():
+    """
+    Returns the process-wide DataSnapshot, building it on first use.
+    The sources' mtimes are checked on every call (a few stat() calls); when they change, the
+    contents are re-hashed and the snapshot is rebuilt only if the hash actually differs.
+    """
+    global _snapshot, _snapshot_stat
+
+    paths = _source_paths()
+    stat_key = _stat_signature(paths)
+    snapshot = _snapshot
+    if snapshot is not None and _snapshot_stat == stat_key:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is not None and _snapshot_stat == stat_key:
+            return _snapshot
+        version = _content_hash(paths)
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _build_snapshot(paths, version)
+        _snapshot_stat = stat_key
+        return _snapshot
+
+
+def load_data():
+    """
+    Returns the merged GeoJSON and Excel/Parquet data from the cached process snapshot.
+    Returns:
+        gdf_merged (DataFrame): The merged attributes ready for visualization (read-only, shared).
+            Outlines are in `get_snapshot().geometry`, aligned by row position.
+        variable_dict (dict): Dictionary mapping column names to human-readable labels.
+        category_dict (dict): Dictionary mapping column names to their category.
+        sens_dict (dict): Dictionary mapping column names to their sens.
+        description_dict (dict): Dictionary mapping column names to their descriptions.
+        unit_dict (dict): Dictionary mapping column names to their unit.
+        gdf_deps (GeoDataFrame): Department boundaries in EPSG:4326 with centroid, bbox and area
+            columns (read-only, shared; built by the ETL `territoires` stage when available).
+        source_dict (dict): Dictionary mapping column names to their sources.
+        classement_dict (dict): Dictionary mapping column names to their ranking.
+    """
+    return get_snapshot().as_tuple()
+
+
+def load_metadata():
+    """
+    Same as load_data() without the attribute table, so no indicator column is loaded:
+    (variable_dict, category_dict, sens_dict, description_dict, unit_dict, gdf_deps, source_dict,
+    classement_dict). Columns are read through `get_snapshot().table`.
+    """
+    return get_snapshot().metadata()
+
+
+def _cache_paths(version):
+    stem = os.path.join(CACHE_DIR, f"snapshot-v{CACHE_FORMAT}-{version}")
+    return stem + ".arrow", stem + "-geom.arrow", stem + "-deps.parquet", stem + ".json"
+
+
+def _read_snapshot_cache(version):
+    """Returns the cached DataSnapshot for `version`, or None when absent or unreadable."""
+    merged_path, geom_path, deps_path, meta_path = _cache_paths(version)
+    # The sidecar is written last: its presence means the data files are complete
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != CACHE_FORMAT or meta.get("version") != version:
+            return None
+        # Memory-mapped: only the key and label columns are read here, the indicators on first use
+        table = ColumnTable.from_arrow(merged_path)
+        geom = pa.ipc.open_file(pa.memory_map(geom_path, 'r')).read_all()
+        geometry = GeometryStore.from_wkb(geom.column('EPCI_CODE').to_numpy(), geom.column('wkb'))
+        gdf_deps = gpd.read_parquet(deps_path)
+    except Exception as e:
+        print(f"Cache de données illisible ({meta_path}), reconstruction : {e}")
+        return None
+
+    dicts = meta["dicts"]
+    return DataSnapshot(
+        version=version,
+        table=table,
+        variable_dict=MappingProxyType(dicts["variable"]),
+        category_dict=MappingProxyType(dicts["category"]),
+        sens_dict=MappingProxyType(dicts["sens"]),
+        description_dict=MappingProxyType(dicts["description"]),
+        unit_dict=MappingProxyType(dicts["unit"]),
+        gdf_deps=gdf_deps,
+        source_dict=MappingProxyType(dicts["source"]),
+        classement_dict=MappingProxyType(dicts["classement"]),
+        geometry=geometry,
+    )
+
+
+def _write_snapshot_cache(snapshot):
+    """
+    Writes the snapshot atomically (temp files + rename) and prunes caches of other versions.
+    Returns True when the cache was written.
+    """
+    merged_path, geom_path, deps_path, meta_path = _cache_paths(snapshot.version)
+    tmp_suffix = f".tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        write_arrow(snapshot.gdf_merged, merged_path + tmp_suffix)
+        write_arrow(pd.DataFrame({
+            'EPCI_CODE': snapshot.geometry.codes,
+            'wkb': snapshot.geometry.to_wkb(),
+        }), geom_path + tmp_suffix)
+        snapshot.gdf_deps.to_parquet(deps_path + tmp_suffix)
+        meta = {
+            "format": CACHE_FORMAT,
+            "version": snapshot.version,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "dicts": {
+                "variable": dict(snapshot.variable_dict),
+                "category": dict(snapshot.category_dict),
+                "sens": dict(snapshot.sens_dict),
+                "description": dict(snapshot.description_dict),
+                "unit": dict(snapshot.unit_dict),
+                "source": dict(snapshot.source_dict),
+                "classement": dict(snapshot.classement_dict),
+            },
+        }
+        with open(meta_path + tmp_suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(merged_path + tmp_suffix, merged_path)
+        os.replace(geom_path + tmp_suffix, geom_path)
+        os.replace(deps_path + tmp_suffix, deps_path)
+        os.replace(meta_path + tmp_suffix, meta_path)
+    except Exception as e:
+        print(f"Impossible d'écrire le cache de données dans {CACHE_DIR} : {e}")
+        for path in (merged_path, geom_path, deps_path, meta_path):
+            if os.path.exists(path + tmp_suffix):
+                os.remove(path + tmp_suffix)
+        return False
+
+    current = {merged_path, geom_path, deps_path, meta_path}
+    for path in glob.glob(os.path.join(CACHE_DIR, "snapshot-v*")):
+        if path not in current and ".tmp-" not in path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return True
+
+
+def _build_snapshot(paths, version):
+    """Loads the snapshot from the on-disk cache, or runs the full build and caches it."""
+    snapshot = _read_snapshot_cache(version)
+    if snapshot is None:
+        snapshot = _compute_snapshot(paths, version)
+        if _write_snapshot_cache(snapshot):
+            # Serve the columns from the file just written, like a cache hit: the built frame is released
+            snapshot = replace(snapshot, table=ColumnTable.from_arrow(_cache_paths(version)[0]))
+    return snapshot
+
+
+def _compute_snapshot(paths, version):
+    """Runs the full build (read, enrich, merge, cluster, department layer) for the given sources."""
+    gdf_epci, gdf_merged, dicts = build_merged_table(paths)
+    _assign_global_clusters(gdf_merged, dicts[2])
+    gdf_deps = load_departments(gdf_epci, file_hash(paths[0]))
+
+    # Geometries are kept once, apart from the ~200 attribute columns
+    geometry = GeometryStore.from_geodataframe(gdf_merged)
+    gdf_merged = pd.DataFrame(gdf_merged.drop(columns=gdf_merged.geometry.name))
+
+    variable_dict, category_dict, sens_dict, description_dict, unit_dict, source_dict, classement_dict = dicts
+    return DataSnapshot(
+        version=version,
+        table=ColumnTable.from_frame(gdf_merged),
+        variable_dict=MappingProxyType(variable_dict),
+        category_dict=MappingProxyType(category_dict),
+        sens_dict=MappingProxyType(sens_dict),
+        description_dict=MappingProxyType(description_dict),
+        unit_dict=MappingProxyType(unit_dict),
+        gdf_deps=gdf_deps,
+        source_dict=MappingProxyType(source_dict),
+        classement_dict=MappingProxyType(classement_dict),
+        geometry=geometry,
+    )
+
+
+def build_merged_table(paths=None):
+    """
+    Read, enrich and merge stages only (no clustering): returns (gdf_epci, gdf_merged, dicts).
+    Used by the snapshot build and by the ETL stages that fit models on the merged table.
+    """
+    geojson_path, dataset_path, dict_path = (paths or _source_paths())[:3]
+
+    gdf_epci = _read_geometry(geojson_path)
+    df = _read_table(dataset_path)
+    dicts = _read_dictionary(dict_path, df)
+    df = _add_derived_variables(df, dicts)
+    gdf_merged = _merge(gdf_epci, df)
+    return gdf_epci, gdf_merged, dicts
+
+
+def _read_geometry(geojson_path):
+    # 1. Load GeoJSON
+    gdf_epci = gpd.read_file(geojson_path)
+    gdf_epci['EPCI_CODE'] = gdf_epci['EPCI_CODE'].astype(str)
+    return gdf_epci
+
+
+def _read_table(dataset_path):
+    # 2. Load Dataset
+    if dataset_path.endswith('.parquet'):
+        df = pd.read_parquet(dataset_path)
+    else:
+        df = pd.read_excel(dataset_path)
     
     df['CODE_EPCI'] = df['CODE_EPCI'].astype(str).str.replace('.0', '', regex=False)
+    return df
+
 
+def _read_dictionary(dict_path, df):
+    """Returns (variable, category, sens, description, unit, source, classement) dictionaries."""
     # 3. Load Metadata for Dictionary & Categories
     variable_dict = {}
     category_dict = {}
@@ -59,11 +380,8 @@ def load_data():
     source_dict = {}
     classement_dict = {}
     
-    # Path to the new CSV
-    DICT_PATH = os.path.join(DATA_DIR_DASH, "dictionnaire_variables.csv")
-    
-    if os.path.exists(DICT_PATH):
-        df_meta = pd.read_csv(DICT_PATH)
+    if dict_path:
+        df_meta = pd.read_csv(dict_path)
         for _, row in df_meta.iterrows():
             var_code = str(row['Variable']).strip()
             cat = str(row['Catégorie']).strip()
@@ -144,6 +462,13 @@ def load_data():
              if k not in classement_dict:
                  classement_dict[k] = ""
 
+    return variable_dict, category_dict, sens_dict, description_dict, unit_dict, source_dict, classement_dict
+
+
+def _add_derived_variables(df, dicts):
+    """Numeric coercion plus the demographic and Taux_CNR syntheses. Registers new variables in `dicts`."""
+    variable_dict, category_dict, sens_dict, description_dict, unit_dict, source_dict, classement_dict = dicts
+
     # 4. Processing
     # Ensure numeric for known plotting variables
     for col in df.columns:
@@ -196,57 +521,23 @@ def load_data():
             description_dict['Taux_CNR'] = "Incidence Globale CNR (Somme des taux)"
             unit_dict['Taux_CNR'] = "taux"
             source_dict['Taux_CNR'] = ""
-    
-    # Merge
-    gdf_merged = gdf_epci.merge(df, left_on='EPCI_CODE', right_on='CODE_EPCI', how='left')
-
-    # 5. Pre-calculate static Global K-Means clusters (K=4, Anti-label switching)
-    global_vars = [
-        'FDep_2021',
-        'APL-med_general_2023',
-        'APL_Cardio_EPCI',
-        'Part de personnes isolées 60 ans et plus',
-        'AIR01',
-        'MORT_CardIsch'
-    ]
-    
-    df_cluster = gdf_merged[['EPCI_CODE'] + global_vars].copy()
-    
-    # Impute missing values with column median and force numeric
-    for col in global_vars:
-        if col not in df_cluster.columns:
-            df_cluster[col] = 0.0
-        df_cluster[col] = pd.to_numeric(df_cluster[col], errors='coerce')
-        if df_cluster[col].isnull().any():
-            median_val = df_cluster[col].median()
-            df_cluster[col] = df_cluster[col].fillna(median_val if pd.notna(median_val) else 0.0)
-            
-    # Standardize data
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(df_cluster[global_vars])
-    
-    # Run K-Means with K=4
-    n_clusters = 4
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    raw_clusters = kmeans.fit_predict(X_scaled)
-    
-    # Anti-Label Switching: Sort clusters by average vulnerability direction
-    directions = np.array([sens_dict.get(v, -1) for v in global_vars])
-    cluster_vulnerability = []
-    for c in range(n_clusters):
-        c_mean_z = X_scaled[raw_clusters == c].mean(axis=0)
-        vuln_score = np.sum(c_mean_z * (-directions))
-        cluster_vulnerability.append((c, vuln_score))
-        
-    sorted_clusters = sorted(cluster_vulnerability, key=lambda x: x[1], reverse=True)
-    label_mapping = {raw_c: new_c for new_c, (raw_c, _) in enumerate(sorted_clusters)}
-    
-    gdf_merged['Cluster_Global'] = pd.Series(raw_clusters, index=df_cluster.index).map(label_mapping)
 
-    # Create Department boundaries for overlay
-    gdf_deps = gdf_epci.dissolve(by='DEPARTEMEN')
+    return df
+
+
+def _merge(gdf_epci, df):
+    return gdf_epci.merge(df, left_on='EPCI_CODE', right_on='CODE_EPCI', how='left')
+
 
-    return gdf_merged, variable_dict, category_dict, sens_dict, description_dict, unit_dict, gdf_deps, source_dict, classement_dict
+def _assign_global_clusters(gdf_merged, sens_dict):
+    """Adds the static `Cluster_Global` column (in place) from the model fitted by the ETL pipeline."""
+    # 5. Global K-Means clusters (K=4, Anti-label switching), precomputed by `pipeline.py --stages clustering`
+    model = load_global_model()
+    if model is None:
+        # No artifact yet: fit in-process so the app still starts (labels may then differ between builds)
+        print(f"Modèle de clustering absent ({CLUSTER_MODEL_PATH}), calcul K-Means à la volée.")
+        model = fit_global_model(gdf_merged, sens_dict)
+    gdf_merged['Cluster_Global'] = assign_global_clusters(gdf_merged, model)
 
 
 def get_commune_epci_mapping():
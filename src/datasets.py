@@ -0,0 +1,139 @@
+"""
+Registry of the datasets a session can activate: the default regional snapshot and the local
+uploads listed in `available-datasets-store`.
+
+Callbacks resolve their dataset from the session's `dataset-select` value on each request
+(`get_dataset(dataset_value, available_datasets)`) instead of reading module globals, so two
+users of the same worker can explore different datasets without cross-talk. Built datasets are
+kept in a bounded LRU cache so switching back and forth does not rebuild anything.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from types import MappingProxyType
+
+import pandas as pd
+
+from . import query
+from .data import UPLOADS_DIR, get_snapshot
+
+DATASET_CACHE_SIZE = int(os.environ.get("DATASET_CACHE_SIZE", "8"))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _find_dataset_meta(dataset_value, available_datasets):
+    for d_item in available_datasets or []:
+        if d_item.get('file_path') == dataset_value:
+            return d_item
+    return None
+
+
+def _local_path(dataset_value):
+    """Resolves a dataset `file_path` inside UPLOADS_DIR, refusing anything that escapes it."""
+    uploads_dir = os.path.abspath(UPLOADS_DIR)
+    local_path = os.path.abspath(os.path.join(uploads_dir, dataset_value))
+    if os.path.commonpath([local_path, uploads_dir]) != uploads_dir:
+        raise ValueError(f"Chemin de dataset invalide : {dataset_value}")
+    return local_path
+
+
+def get_dataset(dataset_value, available_datasets=None):
+    """
+    Returns the DataSnapshot for a `dataset-select` value.
+    'default' (or an unknown / unreadable dataset) resolves to the shared regional snapshot.
+    """
+    base = get_snapshot()
+    if not dataset_value or dataset_value == 'default':
+        return base
+
+    dataset_meta = _find_dataset_meta(dataset_value, available_datasets)
+    if not dataset_meta:
+        return base
+
+    columns_metadata = dataset_meta.get("columns_metadata", {}) or {}
+    try:
+        local_path = _local_path(dataset_value)
+        st = os.stat(local_path)
+    except (OSError, ValueError) as ex:
+        print(f"Erreur de chargement du dataset local ({dataset_value}): {ex}")
+        return base
+
+    # The cache key covers everything the build depends on: base data, file state and labels
+    key = (base.version, dataset_value, st.st_mtime_ns, st.st_size, json.dumps(columns_metadata, sort_keys=True))
+    with _cache_lock:
+        dataset = _cache.get(key)
+        if dataset is not None:
+            _cache.move_to_end(key)
+            return dataset
+
+    try:
+        dataset = _build_user_dataset(base, local_path, columns_metadata, key)
+    except Exception as ex:
+        print(f"Erreur de chargement du dataset local ({local_path}): {ex}")
+        return base
+
+    with _cache_lock:
+        _cache[key] = dataset
+        _cache.move_to_end(key)
+        while len(_cache) > DATASET_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return dataset
+
+
+def _build_user_dataset(base, local_path, columns_metadata, key):
+    """Merges an uploaded CSV (already aggregated per EPCI) onto the base snapshot."""
+    df_user = pd.read_csv(local_path)
+    if "CODE_EPCI" not in df_user.columns:
+        print("Erreur: CODE_EPCI absent du dataset local.")
+        return base
+
+    table = base.table
+    df_user['CODE_EPCI'] = df_user['CODE_EPCI'].astype(str).str.replace('.0', '', regex=False).str.strip()
+    # One row per EPCI: the merged table must stay row-aligned with the shared geometry store
+    df_user = df_user.drop_duplicates(subset='CODE_EPCI', keep='first')
+    cols_to_add = [col for col in df_user.columns if col == 'CODE_EPCI' or col not in table]
+    df_user_filtered = df_user[cols_to_add]
+
+    # Only the imported columns are aligned on the base rows; the base columns stay shared (and lazy)
+    if query.available():
+        # Left join in DuckDB: only EPCI_CODE is read from the base table
+        user_columns = query.join_user_table(base, df_user_filtered)
+    else:
+        keys = table.get(['EPCI_CODE'])
+        user_columns = keys.merge(df_user_filtered, left_on='EPCI_CODE', right_on='CODE_EPCI', how='left')
+        user_columns = user_columns.drop(columns=['EPCI_CODE', 'CODE_EPCI'])
+
+    v, c, s = dict(base.variable_dict), dict(base.category_dict), dict(base.sens_dict)
+    d, u, sd, cl = dict(base.description_dict), dict(base.unit_dict), dict(base.source_dict), dict(base.classement_dict)
+
+    new_vars = [col for col in df_user.columns if col not in ['CODE_EPCI', 'EPCI_CODE', 'CODE_COMMUNE']]
+    for var in new_vars:
+        meta = columns_metadata.get(var, {})
+        custom_label = meta.get("label", str(var).replace('_', ' ').strip().capitalize())
+        v[var] = f"⭐ {custom_label}"
+        c[var] = meta.get("category", "environnement")
+        s[var] = 0
+        d[var] = f"Indicateur importé : {custom_label}"
+        u[var] = "valeur"
+        sd[var] = "Import local"
+        cl[var] = "99"
+
+    version = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:16]
+    return replace(
+        base,
+        version=version,
+        table=table.extend(user_columns),
+        variable_dict=MappingProxyType(v),
+        category_dict=MappingProxyType(c),
+        sens_dict=MappingProxyType(s),
+        description_dict=MappingProxyType(d),
+        unit_dict=MappingProxyType(u),
+        source_dict=MappingProxyType(sd),
+        classement_dict=MappingProxyType(cl),
+    )
@@ -1,66 +1,544 @@
 """
-Script de benchmark pour mesurer les gains de performance de chargement des données.
-Compare le chargement via Parquet vs Excel d'origine.
+Benchmark reproductible du chargement des données.
+
+Chaque cas est exécuté après des tours de chauffe, répété N fois (min / p50 / p95 / moyenne en ms),
+puis rejoué une fois sous tracemalloc pour mesurer le pic mémoire Python (pour les cas qui lancent des
+processus, le pic de RSS du plus gros processus enfant est mesuré en plus). Les cas couvrent :
+- le chargement complet (`load_data` à froid, relecture du cache disque) ;
+- chaque étape de `load_data` séparément (lecture GeoJSON, lecture table, dictionnaire,
+  variables dérivées, fusion, clustering, contours départementaux) ;
+- la comparaison historique Excel + GeoJSON original / Parquet + GeoJSON simplifié ;
+- les callbacks interactifs (`update_sliders`, `update_map`, `update_radar`, jumeaux, rapport PDF),
+  appelés directement, avec la taille de leur réponse sérialisée ;
+- la jointure d'un import par DuckDB, avec en regard les filtres et bornes des sliders calculés
+  en mémoire.
+
+Les résultats peuvent être écrits en JSON et comparés à une référence enregistrée :
+    python src/etl/benchmark.py --output resultats.json
+    python src/etl/benchmark.py --save-baseline            # enregistre la référence
+    python src/etl/benchmark.py --only load_data.stage      # compare à la référence si elle existe
+    python src/etl/benchmark.py --suites callbacks --repeat 20
+Le code de sortie vaut 1 si un cas est plus lent que la référence au-delà du seuil (--threshold), ou
+si un cas parallèle (`SPEEDUPS`) n'est pas plus rapide que son équivalent séquentiel sur une machine
+qui a assez de CPU.
 """
 
+import argparse
+import copy
+import gc
+import json
 import os
+import platform
+import subprocess
+import sys
 import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # SeniAura-main
-DATA_DIR = os.path.join(BASE_DIR, "data")
+# Même jeu de données que l'application (SENIAURA_DATA_DIR, ex. jeu synthétique national)
+DATA_DIR = os.environ.get("SENIAURA_DATA_DIR", os.path.join(BASE_DIR, "data"))
 
 EXCEL_PATH = os.path.join(DATA_DIR, "FINAL-DATASET-epci-11.xlsx")
 PARQUET_PATH = os.path.join(DATA_DIR, "FINAL-DATASET-epci-11.parquet")
 GEO_ORIGINAL = os.path.join(DATA_DIR, "epci-ara.geojson")
 GEO_SIMPLIFIED = os.path.join(DATA_DIR, "epci-ara-simplified.geojson")
 
-def test_load(df_path, geo_path, desc):
-    start = time.time()
-    
-    # 1. Load GeoJSON
+BASELINE_PATH = os.path.join(DATA_DIR, "benchmarks", "baseline.json")
+BENCHMARK_FORMAT = 1
+
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+
+@dataclass
+class Case:
+    """
+    One benchmarked operation. `setup()` returns the arguments of `run` and is not timed;
+    `output_size(result)` gives the serialized size of what the operation returns, in bytes.
+    `forks` marks operations that run part of their work in child processes, which tracemalloc
+    does not see.
+    """
+    name: str
+    run: Callable
+    setup: Optional[Callable] = None
+    output_size: Optional[Callable] = None
+    forks: bool = False
+
+
+def _traced_peak(case, a):
+    """Peak traced memory (bytes) of one run of `case` in this process."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.run(*a)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _forked_peaks(case, a):
+    """
+    (peak traced memory of the calling process in bytes, peak RSS of its largest child in KiB)
+    of one run of `case`. The run happens in a freshly forked process, so RUSAGE_CHILDREN only
+    covers the children of this run; (None, None) where fork or `resource` is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    if not hasattr(os, "fork"):
+        return None, None
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            peak = _traced_peak(case, a)
+            rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            if sys.platform == "darwin":  # octets sous macOS, Kio sous Linux
+                rss //= 1024
+            os.write(write_fd, json.dumps([peak, rss]).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as f:
+        data = f.read()
+    os.waitpid(pid, 0)
+    return tuple(json.loads(data)) if data else (None, None)
+
+
+def measure(case, warmup=1, repeat=5):
+    """
+    Timings (ms) and peak traced memory (KiB) of `case`; for a case that `forks`, the traced
+    peak only covers the calling process and `children_peak_rss_kib` gives its largest child's.
+    """
+    def args():
+        return case.setup() if case.setup else ()
+
+    for _ in range(warmup):
+        case.run(*args())
+
+    samples = []
+    result = None
+    for _ in range(repeat):
+        a = args()
+        gc.collect()
+        start = time.perf_counter()
+        result = case.run(*a)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    # Separate run: tracemalloc slows allocations down, so it never overlaps the timed runs
+    a = args()
+    children_rss = None
+    if case.forks:
+        peak, children_rss = _forked_peaks(case, a)
+    else:
+        peak = _traced_peak(case, a)
+
+    samples = np.asarray(samples)
+    res = {
+        "runs": int(repeat),
+        "min_ms": float(samples.min()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "mean_ms": float(samples.mean()),
+        "peak_kib": peak / 1024 if peak is not None else None,
+    }
+    if case.forks:
+        res["children_peak_rss_kib"] = children_rss
+    if case.output_size:
+        res["output_bytes"] = int(case.output_size(result))
+    return res
+
+
+# --- Cas de mesure ---
+
+def legacy_load(df_path, geo_path):
+    """Chargement historique (avant/après Parquet) : GeoJSON + table + fusion."""
     gdf = gpd.read_file(geo_path)
     gdf['EPCI_CODE'] = gdf['EPCI_CODE'].astype(str).str.strip()
-    # 2. Load Data
     if df_path.endswith('.parquet'):
         df = pd.read_parquet(df_path)
     else:
         df = pd.read_excel(df_path)
     df['CODE_EPCI'] = df['CODE_EPCI'].astype(str).str.replace('.0', '', regex=False).str.strip()
-    # 3. Merge
-    gdf_merged = gdf.merge(df, left_on='EPCI_CODE', right_on='CODE_EPCI', how='left')
-    
-    elapsed = (time.time() - start) * 1000 # ms
-    print(f"⏱️ Chargement [{desc}] : {elapsed:.2f} ms")
-    return elapsed
-
-def main():
-    print("=" * 60)
-    print("📊 BENCHMARK DE PERFORMANCE DE CHARGEMENT")
-    print("=" * 60)
-    
-    # Test 1 : Ancien format (Excel + GeoJSON original)
+    return gdf.merge(df, left_on='EPCI_CODE', right_on='CODE_EPCI', how='left')
+
+
+def load_cases():
+    """Cas du chargement de `load_data`, étape par étape puis de bout en bout."""
+    from src import data
+    from src.territories import file_hash, load_departments
+
+    paths = data._source_paths()
+    geojson_path, dataset_path, dict_path = paths[:3]
+    version = data._content_hash(paths)
+
+    # Entrées de chaque étape, préparées une fois hors chronométrage
+    gdf_epci = data._read_geometry(geojson_path)
+    df_raw = data._read_table(dataset_path)
+    dicts = data._read_dictionary(dict_path, df_raw)
+    df = data._add_derived_variables(df_raw.copy(), copy.deepcopy(dicts))
+    gdf_merged = data._merge(gdf_epci, df)
+    source_hash = file_hash(geojson_path)
+
+    cases = [
+        Case("load_data.stage.geo_read", data._read_geometry, lambda: (geojson_path,)),
+        Case("load_data.stage.table_read", data._read_table, lambda: (dataset_path,)),
+        Case("load_data.stage.dictionary", data._read_dictionary, lambda: (dict_path, df_raw)),
+        Case("load_data.stage.derived_variables", data._add_derived_variables,
+             lambda: (df_raw.copy(), copy.deepcopy(dicts))),
+        Case("load_data.stage.merge", data._merge, lambda: (gdf_epci, df)),
+        Case("load_data.stage.clustering", data._assign_global_clusters, lambda: (gdf_merged.copy(), dicts[2])),
+        Case("load_data.stage.dissolve", load_departments, lambda: (gdf_epci, source_hash)),
+        Case("load_data.cold", data._compute_snapshot, lambda: (paths, version)),
+    ]
+    if os.path.exists(data._cache_paths(version)[-1]):
+        # Le cache ne lit que les colonnes clés ; `columns.vars5` ajoute une session type (un
+        # indicateur de santé et quatre déterminants), `full_frame` la table entière (load_data())
+        variables = [c for c in gdf_merged.columns if c in dicts[0] and pd.api.types.is_numeric_dtype(gdf_merged[c])][:5]
+        cases += [
+            Case("load_data.cache", data._read_snapshot_cache, lambda: (version,)),
+            Case("load_data.cache.columns.vars5", lambda: data._read_snapshot_cache(version).table.get(variables)),
+            Case("load_data.cache.full_frame", lambda: data._read_snapshot_cache(version).gdf_merged),
+        ]
+    return cases
+
+
+def legacy_cases():
+    cases = []
     if os.path.exists(EXCEL_PATH) and os.path.exists(GEO_ORIGINAL):
-        t_old = test_load(EXCEL_PATH, GEO_ORIGINAL, "Excel + GeoJSON original (Avant)")
-    else:
-        t_old = None
-        print("⚠️ Anciens fichiers non trouvés pour test.")
-        
-    # Test 2 : Nouveau format (Parquet + GeoJSON simplifié)
+        cases.append(Case("legacy.excel_original", legacy_load, lambda: (EXCEL_PATH, GEO_ORIGINAL)))
     if os.path.exists(PARQUET_PATH) and os.path.exists(GEO_SIMPLIFIED):
-        t_new = test_load(PARQUET_PATH, GEO_SIMPLIFIED, "Parquet + GeoJSON simplifié (Après)")
-    else:
-        t_new = None
-        print("⚠️ Nouveaux fichiers non trouvés pour test.")
-        
-    if t_old and t_new:
-        gain = (t_old - t_new) / t_old * 100
-        factor = t_old / t_new
-        print("-" * 60)
-        print(f"🚀 Gain de performance : +{gain:.1f}%")
-        print(f"⚡ Le chargement est {factor:.1f}x plus rapide !")
-    print("=" * 60)
+        cases.append(Case("legacy.parquet_simplified", legacy_load, lambda: (PARQUET_PATH, GEO_SIMPLIFIED)))
+    return cases
+
+
+def _callback_json_size(outputs):
+    """Taille de la réponse JSON qu'enverrait Dash (composants, figures et Patch compris)."""
+    from plotly.io.json import to_json_plotly
+    return len(to_json_plotly(list(outputs) if isinstance(outputs, tuple) else outputs).encode("utf-8"))
+
+
+def callback_cases():
+    """
+    Callbacks interactifs appelés directement (fonction d'origine, sans le routage Dash) sur le
+    dataset régional : combinaisons de sliders, 1 à 6 EPCI sélectionnés, 3 à 25 variables radar.
+    """
+    from src.pages import exploration
+    from src.datasets import get_dataset
+    from src.filters import filter_matrix
+    from src.analytics import stats_table
+    from src.utils.pdf_generator import calculate_twins, generate_territory_pdf
+    from src.twins import twin_index
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict
+
+    def raw(callback_fn):
+        # @callback enveloppe la fonction (functools.wraps) : __wrapped__ est le code du callback
+        return getattr(callback_fn, "__wrapped__", callback_fn)
+
+    update_sliders, update_map, update_radar = raw(exploration.update_sliders), raw(exploration.update_map), raw(exploration.update_radar)
+    ds = get_dataset('default')
+    g = ds.table
+    matrix = filter_matrix(ds)
+    codes = g['EPCI_CODE'].astype(str).tolist()
+
+    # Variables filtrables par thème de la barre latérale
+    themes = {'socioéco': [], 'offre de soins': [], 'environnement': []}
+    for col in matrix.columns:
+        cat = str(ds.category_dict.get(col, '')).lower()
+        if cat in themes:
+            themes[cat].append(col)
+    ordered = [c for group in zip(*themes.values()) for c in group]
+
+    def theme_split(variables):
+        return tuple([v for v in variables if v in themes[cat]] for cat in themes)
+
+    def slider_state(n):
+        """n sliders réglés sur l'intervalle interdéciles de leur variable."""
+        ids = [{'type': 'exploration-slider', 'index': col} for col in ordered[:n]]
+        vals = []
+        for col in ordered[:n]:
+            values = matrix.values[matrix.position[col]]
+            lo, hi = np.nanpercentile(values, [10, 90])
+            vals.append([float(lo), float(hi)])
+        return vals, ids
+
+    cases = []
+    for per_theme in (1, 3, 5):
+        variables = [c for group in themes.values() for c in group[:per_theme]]
+        cases.append(Case(f"callbacks.update_sliders.vars{len(variables)}", update_sliders,
+                          lambda v=variables: (*theme_split(v), [], [], 'default', None),
+                          _callback_json_size))
+
+    def fired(callback_fn, prop_id):
+        """callback_fn appelé comme une requête Dash déclenchée par l'entrée `prop_id`."""
+        def call(*args):
+            token = context_value.set(AttributeDict(triggered_inputs=[{'prop_id': prop_id, 'value': None}]))
+            try:
+                return callback_fn(*args)
+            finally:
+                context_value.reset(token)
+        return call
+
+    for n_sliders, n_epci, patch in ((0, 0, False), (3, 1, False), (8, 6, False), (3, 1, True), (8, 6, True)):
+        vals, ids = slider_state(n_sliders)
+        highlight = ids[0]['index'] if ids else None
+        # map-base-key renvoyé par le premier rendu complet de la même vue
+        base_key = update_map('INCI', 'AVC', vals, codes[:n_epci], highlight, False, '/exploration', 'default',
+                              ids, None, None)[5] if patch else None
+        cases.append(Case(
+            f"callbacks.update_map.sliders{n_sliders}.epci{n_epci}.{'patch' if patch else 'full'}", update_map,
+            lambda vals=vals, ids=ids, sel=codes[:n_epci], hl=highlight, key=base_key:
+                ('INCI', 'AVC', vals, sel, hl, False, '/exploration', 'default', ids, None, key),
+            _callback_json_size))
+        if not patch:
+            continue
+        # Patch limité à la couche que l'entrée déclenchée modifie (sélection EPCI, variable mise en évidence)
+        cases.append(Case(
+            f"callbacks.update_map.sliders{n_sliders}.epci{n_epci}.patch.selection",
+            fired(update_map, 'sidebar-epci-radar.value'),
+            lambda vals=vals, ids=ids, sel=codes[:n_epci + 1], hl=highlight, key=base_key:
+                ('INCI', 'AVC', vals, sel, hl, False, '/exploration', 'default', ids, None, key),
+            _callback_json_size))
+        cases.append(Case(
+            f"callbacks.update_map.sliders{n_sliders}.epci{n_epci}.patch.highlight",
+            fired(update_map, 'highlight-variable-select.value'),
+            lambda vals=vals, ids=ids, sel=codes[:n_epci], hl=ids[-1]['index'], key=base_key:
+                ('INCI', 'AVC', vals, sel, hl, False, '/exploration', 'default', ids, None, key),
+            _callback_json_size))
+
+    for n_epci in (1, 6):
+        for n_vars in (3, 10, 25):
+            variables = ordered[:n_vars]
+            cases.append(Case(
+                f"callbacks.update_radar.epci{n_epci}.vars{len(variables)}", update_radar,
+                lambda v=variables, sel=codes[:n_epci]: (*theme_split(v), sel, 'INCI', 'AVC', 'default', '/exploration', None),
+                _callback_json_size))
+
+    for n_vars in (3, 10, 25):
+        variables = ordered[:n_vars]
+        cases.append(Case(f"callbacks.calculate_twins.vars{len(variables)}", calculate_twins,
+                          lambda v=variables: (g, codes[0], v),
+                          lambda twins: len(json.dumps(twins, ensure_ascii=False).encode("utf-8"))))
+        # Index mis en cache par jeu de variables : 1 EPCI (panneau radar) puis tous les EPCI d'un coup
+        for n_targets in (1, len(codes)):
+            cases.append(Case(f"callbacks.twins.cached.vars{len(variables)}.epci{n_targets}",
+                              lambda v, sel: twin_index(ds, v).twins(sel),
+                              lambda v=variables, sel=codes[:n_targets]: (v, sel)))
+
+    stats = stats_table(ds)
+    for n_epci in (1, 6):
+        variables = ordered[:6]
+        cases.append(Case(
+            f"callbacks.generate_territory_pdf.epci{n_epci}", generate_territory_pdf,
+            lambda v=variables, sel=codes[:n_epci]: (sel, v, g, ds.variable_dict, ds.unit_dict, ds.sens_dict,
+                                                     ds.category_dict, stats, ds.geometry, None, None, ds.version),
+            lambda buffer: len(buffer.getvalue())))
+    # Carte de fond redessinée à chaque rapport (sans version du jeu, donc sans cache)
+    cases.append(Case(
+        "callbacks.generate_territory_pdf.epci6.map_uncached", generate_territory_pdf,
+        lambda v=ordered[:6], sel=codes[:6]: (sel, v, g, ds.variable_dict, ds.unit_dict, ds.sens_dict,
+                                              ds.category_dict, stats, ds.geometry),
+        lambda buffer: len(buffer.getvalue())))
+    # Rapport de 3 pages : pages construites en séquence, puis par 4 processus
+    for processes in (1, 4):
+        cases.append(Case(
+            f"callbacks.generate_territory_pdf.epci18.processes{processes}", generate_territory_pdf,
+            lambda v=ordered[:6], sel=codes[:18], p=processes: (sel, v, g, ds.variable_dict, ds.unit_dict, ds.sens_dict,
+                                                                 ds.category_dict, stats, ds.geometry, None, p, ds.version),
+            lambda buffer: len(buffer.getvalue()), forks=processes > 1))
+    return cases
+
+
+def query_cases():
+    """
+    Couche de requêtes DuckDB (src/query.py) : jointure d'un import, avec en regard les filtres et
+    bornes des sliders, calculés en mémoire (src/filters.py).
+    """
+    from src import query
+    from src.datasets import get_dataset
+    from src.filters import column_ranges, evaluate_filters, filter_matrix
+
+    if not query.available():
+        print("DuckDB indisponible : suite `query` ignorée.")
+        return []
+    ds = get_dataset('default')
+    g = ds.table
+    matrix = filter_matrix(ds)
+    codes = g['EPCI_CODE'].astype(str).tolist()
+
+    def ranges(n):
+        out = []
+        for col in matrix.columns[:n]:
+            lo, hi = np.nanpercentile(matrix.values[matrix.position[col]], [10, 90])
+            out.append((col, float(lo), float(hi)))
+        return out
+
+    cases = []
+    for n in (1, 8, 25):
+        cases.append(Case(f"query.filters.numpy.ranges{n}", evaluate_filters, lambda r=ranges(n): (matrix, r)))
+    for n in (3, 25):
+        variables = list(matrix.columns[:n])
+        cases.append(Case(f"query.column_ranges.numpy.vars{n}", column_ranges, lambda v=variables: (ds, v)))
+    upload = pd.DataFrame({'CODE_EPCI': codes, 'valeur': np.arange(len(codes), dtype=float)})
+    cases.append(Case("query.join_user_table", query.join_user_table, lambda: (ds, upload)))
+    return cases
+
+
+# Groupes de cas, construits à la demande (leurs entrées peuvent être coûteuses à préparer)
+SUITES = {
+    "load_data": load_cases,
+    "legacy": legacy_cases,
+    "callbacks": callback_cases,
+    "query": query_cases,
+}
+
+
+# --- Rapport & comparaison ---
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Rows (name, baseline p50, p50, relative change, status) and the names of the regressions."""
+    rows, regressions = [], []
+    for name, res in results.items():
+        ref = baseline.get(name)
+        if ref is None:
+            rows.append((name, None, res["p50_ms"], None, "nouveau"))
+            continue
+        change = res["p50_ms"] / ref["p50_ms"] - 1 if ref["p50_ms"] else 0.0
+        if change > threshold:
+            status = "RÉGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "amélioré"
+        else:
+            status = "stable"
+        rows.append((name, ref["p50_ms"], res["p50_ms"], change, status))
+    return rows, regressions
+
+
+# Cas parallèles qui doivent battre leur équivalent séquentiel : (cas rapide, cas de référence, CPU requis)
+SPEEDUPS = (
+    ("callbacks.generate_territory_pdf.epci18.processes4", "callbacks.generate_territory_pdf.epci18.processes1", 4),
+)
+
+
+def check_speedups(results, cpus=None):
+    """Rows (rapide, référence, gain, statut) and the names of the parallel cases that are not faster."""
+    cpus = cpus or os.cpu_count() or 1
+    rows, failures = [], []
+    for fast, slow, required in SPEEDUPS:
+        if fast not in results or slow not in results:
+            continue
+        gain = results[slow]["p50_ms"] / results[fast]["p50_ms"] if results[fast]["p50_ms"] else float("inf")
+        if cpus < required:
+            status = f"ignoré ({cpus} CPU < {required})"
+        elif gain > 1:
+            status = "ok"
+        else:
+            status = "ÉCHEC"
+            failures.append(fast)
+        rows.append((fast, slow, gain, status))
+    return rows, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du chargement des données CardiAURA")
+    parser.add_argument("--suites", nargs="+", choices=list(SUITES), default=list(SUITES),
+                        help="Groupes de cas à exécuter (par défaut : tous)")
+    parser.add_argument("--only", help="Ne garder que les cas dont le nom commence par ce préfixe")
+    parser.add_argument("--warmup", type=int, default=1, help="Exécutions de chauffe non mesurées")
+    parser.add_argument("--repeat", type=int, default=5, help="Exécutions mesurées par cas")
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Référence à laquelle comparer")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistre les résultats comme référence")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Hausse relative du p50 considérée comme une régression (0.10 = +10 %%)")
+    args = parser.parse_args(argv)
+
+    print("=" * 72)
+    print("📊 BENCHMARK DE PERFORMANCE DE CHARGEMENT")
+    print(f"   chauffe = {args.warmup}, répétitions = {args.repeat}")
+    print("=" * 72)
+
+    results = {}
+    for suite in args.suites:
+        for case in SUITES[suite]():
+            if args.only and not case.name.startswith(args.only):
+                continue
+            res = measure(case, warmup=args.warmup, repeat=args.repeat)
+            results[case.name] = res
+            size = f" | sortie {res['output_bytes'] / 1024:>8.1f} Ko" if "output_bytes" in res else ""
+            peak = f"{res['peak_kib'] / 1024:>7.1f} Mo" if res["peak_kib"] is not None else "      ? Mo"
+            if case.forks:
+                # tracemalloc ne voit que le processus principal : pic RSS du plus gros processus enfant en regard
+                rss = res["children_peak_rss_kib"]
+                peak += f" (parent ; enfant RSS {rss / 1024:.1f} Mo)" if rss is not None else " (parent seul)"
+            print(f"⏱️ {case.name:<48} p50 {res['p50_ms']:>9.2f} ms | p95 {res['p95_ms']:>9.2f} ms | "
+                  f"min {res['min_ms']:>9.2f} ms | pic {peak}{size}")
+
+    report = {
+        "format": BENCHMARK_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Résultats écrits dans {args.output}")
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline.get("results", {}), args.threshold)
+        print("-" * 72)
+        print(f"🔍 Comparaison à la référence {args.baseline} (commit {baseline.get('commit')}, "
+              f"seuil ±{args.threshold:.0%})")
+        for name, ref, p50, change, status in rows:
+            ref_txt = f"{ref:9.2f} ms" if ref is not None else "        —   "
+            change_txt = f"{change:+7.1%}" if change is not None else "      —"
+            print(f"   {name:<48} {ref_txt} → {p50:9.2f} ms  {change_txt}  {status}")
+
+    speedup_rows, slow_parallel = check_speedups(results)
+    if speedup_rows:
+        print("-" * 72)
+        print("⚡ Cas parallèles (doivent être plus rapides que le cas séquentiel)")
+        for fast, slow, gain, status in speedup_rows:
+            print(f"   {fast:<48} ×{gain:5.2f} face à {slow}  {status}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📌 Référence enregistrée : {args.baseline}")
+
+    print("=" * 72)
+    if slow_parallel:
+        print(f"❌ Parallélisme sans gain : {', '.join(slow_parallel)}")
+    if regressions:
+        print(f"❌ {len(regressions)} régression(s) : {', '.join(regressions)}")
+    return 1 if regressions or slow_parallel else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
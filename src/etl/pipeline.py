@@ -12,10 +12,29 @@ Il effectue les opérations suivantes :
    - Sauvegarde au format optimisé Parquet (chargement instantané en <50ms).
    - Sauvegarde du GeoJSON simplifié.
    - Sauvegarde du dictionnaire nettoyé.
+4. Modèles : ajustement hors-ligne du K-Means global (data/artifacts/cluster_global.json).
+5. Territoires : contours départementaux, centroïdes, emprises et surfaces des EPCI
+   (data/artifacts/departments.parquet, epci_metrics.parquet, territories.json).
+6. Contours cartographiques : niveaux de détail en topologie à arcs partagés, EPCI et départements
+   (data/artifacts/epci-ara-<niveau>.topo.json + manifeste data/artifacts/geometry_tiers.json).
+7. Fichiers statiques : contours, feuilles de style et polices nommés par hash de contenu, avec
+   variantes gzip / brotli (data/artifacts/static/ + manifeste static_manifest.json).
+8. Similarité : 32 plus proches voisins de chaque EPCI par thème (variables Cluster_Global et
+   profils thématiques), recalculés pour les seuls thèmes dont les colonnes ont changé
+   (data/artifacts/similarity-<thème>.arrow + manifeste similarity.json).
+
+Les étapes peuvent être lancées séparément :
+    python src/etl/pipeline.py --stages clustering
+    python src/etl/pipeline.py --stages contours assets
+    python src/etl/pipeline.py --stages similarite
 """
 
 import os
+import sys
 import time
+import argparse
+import gzip
+import json
 import pandas as pd
 import geopandas as gpd
 import numpy as np
@@ -23,7 +42,8 @@ import numpy as np
 # Chemins relatifs à la racine de SeniAura-main
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # src/
 PROJECT_ROOT = os.path.dirname(BASE_DIR) # SeniAura-main/
-DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+# SENIAURA_DATA_DIR : autre jeu de données (ex. jeu synthétique de src/etl/synthetic.py)
+DATA_DIR = os.environ.get("SENIAURA_DATA_DIR", os.path.join(PROJECT_ROOT, "data"))
 
 # Fichiers sources
 EXCEL_PATH = os.path.join(DATA_DIR, "FINAL-DATASET-epci-11.xlsx")
@@ -34,12 +54,11 @@ DICT_PATH = os.path.join(DATA_DIR, "dictionnaire_variables.csv")
 PARQUET_PATH = os.path.join(DATA_DIR, "FINAL-DATASET-epci-11.parquet")
 GEOJSON_SIMPLIFIED_PATH = os.path.join(DATA_DIR, "epci-ara-simplified.geojson")
 
-def run_etl():
-    print("=" * 60)
-    print("🚀 DÉMARRAGE DU PIPELINE ETL AUTOMATISÉ - CardiAURA")
-    print("=" * 60)
-    start_time = time.time()
+# Les étapes « modèles » réutilisent le code de chargement de l'application (src.data)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
+def run_etl():
     # ----------------------------------------------------
     # 1. EXTRACTION
     # ----------------------------------------------------
@@ -115,8 +134,9 @@ def run_etl():
     if 'EPCI_CODE' in gdf.columns:
         gdf['EPCI_CODE'] = gdf['EPCI_CODE'].astype(str).str.strip()
     
-    # Mesure de taille avant simplification
-    initial_vertices = sum(len(geom.exterior.coords) for geom in gdf.geometry if geom is not None and hasattr(geom, 'exterior'))
+    # Mesure de taille avant simplification (tous les anneaux, Polygon et MultiPolygon)
+    from src.geometry import count_vertices
+    initial_vertices = count_vertices(gdf.geometry.values)
     print(f"  -> Nombre total initial de sommets géométriques : {initial_vertices}")
 
     # Simplification géométrique (seuil 0.0015 degrés ~150 mètres)
@@ -124,7 +144,7 @@ def run_etl():
     gdf['geometry'] = gdf['geometry'].simplify(tolerance=0.0015, preserve_topology=True)
     
     # Mesure après simplification
-    final_vertices = sum(len(geom.exterior.coords) for geom in gdf.geometry if geom is not None and hasattr(geom, 'exterior'))
+    final_vertices = count_vertices(gdf.geometry.values)
     reduction = (1 - (final_vertices / initial_vertices)) * 100
     print(f"     ✅ Géométrie simplifiée ! Nombre de sommets réduit à {final_vertices} (Gain de {reduction:.1f}%).")
 
@@ -194,6 +214,210 @@ def run_etl():
     df_dict.to_csv(DICT_PATH, index=False)
     print("     ✅ Fictionnaire CSV mis à jour.")
 
+def build_cluster_model():
+    # ----------------------------------------------------
+    # 6. MODÈLE K-MEANS GLOBAL (ARTEFACT FIGÉ)
+    # ----------------------------------------------------
+    print("\n🧮 ÉTAPE 6 : AJUSTEMENT DU K-MEANS GLOBAL (TYPOLOGIE Cluster_Global)...")
+    from src.artifacts import write_json_artifact
+    from src.clustering import CLUSTER_MODEL_ARTIFACT, fit_global_model
+    from src.data import build_merged_table
+
+    _, gdf_merged, dicts = build_merged_table()
+    sens_dict = dicts[2]
+    model = fit_global_model(gdf_merged, sens_dict)
+    path = write_json_artifact(CLUSTER_MODEL_ARTIFACT, model)
+
+    counts = pd.Series(list(model["labels"].values())).value_counts().sort_index()
+    print(f"  -> {len(model['labels'])} EPCI classés sur {len(model['variables'])} variables (K={model['n_clusters']}).")
+    print(f"     Effectifs par cluster : {counts.to_dict()}")
+    print(f"     ✅ Modèle sauvegardé : {path}")
+
+def build_territories():
+    # ----------------------------------------------------
+    # 7. DÉPARTEMENTS, CENTROÏDES, EMPRISES & SURFACES
+    # ----------------------------------------------------
+    print("\n🧭 ÉTAPE 7 : CONTOURS DÉPARTEMENTAUX ET MESURES DES TERRITOIRES...")
+    from src.data import build_merged_table, geometry_source_path
+    from src.territories import build_territory_artifacts, file_hash
+
+    # Mêmes contours EPCI que ceux lus par l'application (fichier simplifié en priorité)
+    source_path = geometry_source_path()
+    gdf_epci, _, _ = build_merged_table()
+    deps, metrics = build_territory_artifacts(gdf_epci, file_hash(source_path))
+    print(f"  -> Source : {os.path.basename(source_path)} ({len(metrics)} EPCI)")
+    print(f"     ✅ {len(deps)} départements fusionnés, surfaces de {deps['area_km2'].min():.0f} "
+          f"à {deps['area_km2'].max():.0f} km²")
+    print(f"     ✅ Centroïdes, emprises et surfaces de {len(metrics)} EPCI sauvegardés")
+
+    # Couche départements de repli servie par la carte (écrite ici, plus au démarrage de l'application)
+    if "SENIAURA_DATA_DIR" in os.environ:
+        print("     ⏭️ Jeu de données alternatif : assets/departments-ara.geojson laissé inchangé")
+        return
+    assets_dep_path = os.path.join(PROJECT_ROOT, "assets", "departments-ara.geojson")
+    tmp_path = f"{assets_dep_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(deps[[deps.geometry.name]].reset_index().__geo_interface__, f)
+    os.replace(tmp_path, assets_dep_path)
+    print(f"     ✅ {assets_dep_path} mis à jour")
+
+def build_geometry_tiers():
+    # ----------------------------------------------------
+    # 8. NIVEAUX DE DÉTAIL DES CONTOURS (CARTE)
+    # ----------------------------------------------------
+    print("\n🗺️ ÉTAPE 8 : NIVEAUX DE DÉTAIL DES CONTOURS EPCI (CARTE)...")
+    from src.artifacts import write_json_artifact
+    from src.geometry import (GEOMETRY_TIERS, GEOMETRY_TIERS_ARTIFACT, GEOMETRY_TIER_URL,
+                              count_vertices, simplify_coverage)
+    from src.topology import TOPOLOGY_ARTIFACT, encode_topology, merge_object, shapely_rings, topology_to_geojson
+
+    if not os.path.exists(GEOJSON_PATH):
+        raise FileNotFoundError(f"❌ Erreur : Fichier GeoJSON source introuvable à {GEOJSON_PATH}")
+    gdf = gpd.read_file(GEOJSON_PATH)
+    gdf = gdf.set_crs(epsg=4326) if gdf.crs is None else gdf.to_crs(epsg=4326)
+    # La carte ne lit que les clés de jointure EPCI et département
+    properties = [{'EPCI_CODE': str(code).strip(), 'DEPARTEMEN': dep}
+                  for code, dep in zip(gdf['EPCI_CODE'], gdf['DEPARTEMEN'])]
+    source_vertices = count_vertices(gdf.geometry.values)
+    print(f"  -> {len(gdf)} contours source, {source_vertices} sommets")
+
+    tiers = []
+    for name, tolerance in GEOMETRY_TIERS:
+        geometries = simplify_coverage(gdf.geometry.values, tolerance)
+        # Arcs partagés : chaque frontière n'est stockée qu'une fois, les départements réutilisent les arcs EPCI
+        topology = encode_topology("epci", [(props, shapely_rings(geom)) for props, geom in zip(properties, geometries)])
+        merge_object(topology, "epci", "departements", "DEPARTEMEN")
+        write_json_artifact(TOPOLOGY_ARTIFACT.format(tier=name), topology)
+
+        topology_bytes = len(json.dumps(topology, separators=(",", ":")).encode("utf-8"))
+        served = [json.dumps(topology_to_geojson(topology, layer), separators=(",", ":")).encode("utf-8")
+                  for layer in ("epci", "departements")]
+        tier = {
+            "name": name,
+            "url": GEOMETRY_TIER_URL.format(tier=name, layer="epci"),
+            "departments_url": GEOMETRY_TIER_URL.format(tier=name, layer="departements"),
+            "tolerance": tolerance,
+            "vertices": count_vertices(geometries),
+            "arcs": len(topology["arcs"]),
+            "topology_bytes": topology_bytes,
+            "geojson_bytes": sum(len(b) for b in served),
+            "gzip_bytes": sum(len(gzip.compress(b, 6)) for b in served),
+        }
+        tiers.append(tier)
+        print(f"     ✅ {name:<9} (tolérance {tolerance}) : {tier['vertices']} sommets "
+              f"({tier['vertices'] / max(source_vertices, 1):.0%}), {tier['arcs']} arcs, "
+              f"topologie {topology_bytes / 1024:.1f} Ko, GeoJSON servi {tier['geojson_bytes'] / 1024:.1f} Ko "
+              f"({tier['gzip_bytes'] / 1024:.1f} Ko gzip, EPCI + départements)")
+
+    path = write_json_artifact(GEOMETRY_TIERS_ARTIFACT, {"source_vertices": source_vertices, "tiers": tiers})
+    print(f"     ✅ Manifeste sauvegardé : {path}")
+
+def build_static_assets():
+    # ----------------------------------------------------
+    # 9. FICHIERS STATIQUES HACHÉS & PRÉ-COMPRESSÉS
+    # ----------------------------------------------------
+    print("\n📦 ÉTAPE 9 : FICHIERS STATIQUES HACHÉS (CONTOURS, CSS & POLICES)...")
+    import requests
+    from urllib.parse import urlparse
+    from src.artifacts import artifact_path, read_json_artifact, write_json_artifact
+    from src.geometry import GEOMETRY_FALLBACK_TIER, GEOMETRY_TIERS_ARTIFACT
+    from src.static_assets import CDN_STYLESHEETS, STATIC_MANIFEST, vendor_stylesheet, write_static_file
+    from src.topology import TOPOLOGY_ARTIFACT, topology_to_geojson
+
+    files, resources = {}, {}
+
+    def report(url, entry):
+        sizes = ", ".join(f"{enc} {size / 1024:.1f} Ko" for enc, size in entry["encodings"].items())
+        print(f"     ✅ {url} -> {entry['file']} ({entry['bytes'] / 1024:.1f} Ko ; {sizes})")
+
+    # A. Contours de la carte : fichiers de repli et couches de chaque niveau de détail
+    print("  -> Contours de la carte...")
+    for url in (GEOMETRY_FALLBACK_TIER["url"], GEOMETRY_FALLBACK_TIER["departments_url"]):
+        path = os.path.join(PROJECT_ROOT, url.lstrip("/"))
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                files[url] = write_static_file(os.path.basename(path), f.read())
+            report(url, files[url])
+
+    manifest = read_json_artifact(GEOMETRY_TIERS_ARTIFACT) or {}
+    for tier in manifest.get("tiers", []):
+        with open(artifact_path(TOPOLOGY_ARTIFACT.format(tier=tier["name"])), "r", encoding="utf-8") as f:
+            topology = json.load(f)
+        for url, layer in ((tier["url"], "epci"), (tier["departments_url"], "departements")):
+            data = json.dumps(topology_to_geojson(topology, layer), separators=(",", ":")).encode("utf-8")
+            files[url] = write_static_file(f"{layer}-{tier['name']}.geojson", data)
+            report(url, files[url])
+
+    # B. Feuilles de style des CDN, avec les polices et images qu'elles référencent
+    print("  -> Feuilles de style et polices (auparavant chargées depuis les CDN)...")
+    # Google Fonts ne renvoie des polices woff2 qu'aux navigateurs récents
+    headers = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"}
+
+    def fetch(url):
+        res = requests.get(url, headers=headers, timeout=30)
+        res.raise_for_status()
+        return res.content
+
+    for css_url in CDN_STYLESHEETS:
+        try:
+            css = requests.get(css_url, headers=headers, timeout=30)
+            css.raise_for_status()
+            text, referenced = vendor_stylesheet(css.text, css.url, fetch)
+            name = os.path.basename(urlparse(css_url).path)
+            if not name.endswith(".css"):
+                name = f"{name or 'fonts'}.css"
+            files[css_url] = write_static_file(name, text.encode("utf-8"))
+            # Les polices et images sont servies elles aussi : elles figurent dans le manifeste
+            resources.update(referenced)
+            report(css_url, files[css_url])
+            print(f"        ({len(referenced)} fichiers référencés copiés localement)")
+        except Exception as e:
+            print(f"     ⚠️ {css_url} non téléchargeable, le CDN reste utilisé : {e}")
+
+    path = write_json_artifact(STATIC_MANIFEST, {"files": files, "resources": resources})
+    print(f"     ✅ Manifeste sauvegardé : {path}")
+
+def build_similarity():
+    # ----------------------------------------------------
+    # 10. VOISINS LES PLUS PROCHES PAR THÈME (JUMEAUX)
+    # ----------------------------------------------------
+    print("\n🔗 ÉTAPE 10 : TERRITOIRES JUMEAUX PRÉCALCULÉS PAR THÈME...")
+    from src.data import build_merged_table
+    from src.twins import SIMILARITY_ARTIFACT, SIMILARITY_THEMES, SIMILARITY_TOP_K, build_similarity_artifacts
+
+    _, gdf_merged, _ = build_merged_table()
+    status = build_similarity_artifacts(gdf_merged)
+    labels = {'built': "✅ recalculé", 'unchanged': "⏭️ colonnes inchangées, conservé",
+              'skipped': "⚠️ moins de 2 variables présentes, ignoré"}
+    for theme, state in status.items():
+        print(f"  -> {theme:<7} ({len(SIMILARITY_THEMES[theme])} variables) : {labels[state]}")
+    print(f"     ✅ {SIMILARITY_TOP_K} voisins par EPCI ({len(gdf_merged)} EPCI), manifeste : {SIMILARITY_ARTIFACT}")
+
+# Étapes disponibles, dans leur ordre d'exécution
+STAGES = {
+    "donnees": run_etl,
+    "clustering": build_cluster_model,
+    "territoires": build_territories,
+    "contours": build_geometry_tiers,
+    "assets": build_static_assets,
+    "similarite": build_similarity,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline ETL CardiAURA")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="Étapes à exécuter (par défaut : toutes)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("🚀 DÉMARRAGE DU PIPELINE ETL AUTOMATISÉ - CardiAURA")
+    print("=" * 60)
+    start_time = time.time()
+
+    for name, stage in STAGES.items():
+        if name in args.stages:
+            stage()
+
     end_time = time.time()
     elapsed = end_time - start_time
     print("\n" + "=" * 60)
@@ -201,4 +425,4 @@ def run_etl():
     print("=" * 60)
 
 if __name__ == "__main__":
-    run_etl()
+    main()
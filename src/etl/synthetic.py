@@ -0,0 +1,298 @@
+"""
+Générateur de jeux de données synthétiques à l'échelle nationale (tests de montée en charge).
+
+Le jeu régional (172 EPCI) ne permet pas de voir où l'application cesse de passer à l'échelle.
+Ce script fabrique, à partir du schéma réel, un jeu cohérent de la taille de la France
+(~1 250 EPCI, ~35 000 communes, ~96 départements, 13 régions) :
+- Géométrie : les communes sont les cellules d'un diagramme de Voronoï de points tirés dans un
+  contour simplifié de la France métropolitaine (plus denses autour de pôles urbains). Chaque EPCI
+  est l'union des communes les plus proches de sa commune-siège, chaque département regroupe des
+  EPCI voisins : les contours s'emboîtent exactement, sans trou ni chevauchement.
+- Table : chaque EPCI synthétique recopie une ligne réelle « donneuse » (de préférence du même
+  département réel pour tout un département synthétique, ce qui conserve une structure spatiale),
+  puis chaque variable numérique reçoit un bruit multiplicatif borné par le min / max observés.
+  Les corrélations entre variables, les taux de valeurs manquantes et les types sont conservés.
+- Dictionnaire : copie du dictionnaire réel (les variables sont les mêmes).
+
+Les fichiers portent les noms attendus par l'application, qui les lit via SENIAURA_DATA_DIR :
+    python src/etl/synthetic.py --output data/synthetic/france
+    SENIAURA_DATA_DIR=data/synthetic/france python src/etl/pipeline.py --stages clustering territoires contours
+    SENIAURA_DATA_DIR=data/synthetic/france python src/etl/benchmark.py --save-baseline
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # SeniAura-main
+SOURCE_DIR = os.path.join(BASE_DIR, "data")
+DEFAULT_OUTPUT_DIR = os.path.join(SOURCE_DIR, "synthetic", "france")
+
+DATASET_NAME = "FINAL-DATASET-epci-11"
+GEOJSON_NAME = "epci-ara.geojson"
+GEOJSON_SIMPLIFIED_NAME = "epci-ara-simplified.geojson"
+DICT_NAME = "dictionnaire_variables.csv"
+COMMUNES_NAME = "communes.geojson"
+MAPPING_NAME = "commune_epci_mapping.csv"
+
+# Contour grossier de la France métropolitaine (lon, lat), suffisant pour des emprises plausibles
+FRANCE_OUTLINE = [
+    (-1.79, 43.37), (-1.25, 44.60), (-1.20, 46.20), (-2.55, 47.30), (-4.75, 47.95),
+    (-4.70, 48.60), (-1.95, 48.70), (-1.60, 49.65), (0.10, 49.50), (1.60, 50.20),
+    (2.55, 51.08), (4.20, 49.95), (5.90, 49.50), (8.20, 48.95), (7.55, 47.60),
+    (6.05, 46.20), (7.00, 45.90), (6.65, 45.10), (7.65, 43.80), (6.20, 43.05),
+    (4.65, 43.35), (3.10, 43.10), (3.15, 42.45), (1.70, 42.50), (-0.30, 42.85),
+    (-1.79, 43.37),
+]
+
+DEFAULT_EPCI = 1250
+DEFAULT_COMMUNES = 35000
+DEFAULT_DEPARTMENTS = 96
+DEFAULT_REGIONS = 13
+
+# Densité des communes : une part des points est tirée autour de pôles urbains
+URBAN_CENTERS = 40
+URBAN_SHARE = 0.35
+URBAN_SPREAD = 0.25 # degrés
+
+# Bruit multiplicatif (écart-type relatif) appliqué aux variables numériques des lignes donneuses
+DEFAULT_JITTER = 0.08
+# Part des EPCI d'un département synthétique tirés dans le département réel qui lui est associé
+SAME_DEPARTMENT_SHARE = 0.8
+# Tolérance de simplification du GeoJSON « simplifié » (comme l'étape `donnees` du pipeline)
+SIMPLIFY_TOLERANCE = 0.0015
+
+# Colonnes d'identification, réécrites d'après la géographie synthétique
+IDENTITY_COLUMNS = ['CODE_EPCI', 'LIBEPCI', 'nom_EPCI', 'Nb_Communes', 'Département', 'Département_code']
+
+# Les distances sont calculées avec la longitude corrigée de la latitude moyenne
+LON_SCALE = np.cos(np.radians(46.5))
+
+
+def _sample_points(rng, outline, centers, n, urban_share=URBAN_SHARE):
+    """`n` points tirés dans `outline` : uniformes, ou gaussiens autour d'un des `centers`."""
+    minx, miny, maxx, maxy = outline.bounds
+    batches = []
+    found = 0
+    while found < n:
+        size = max(2 * (n - found), 1024)
+        points = np.column_stack([rng.uniform(minx, maxx, size), rng.uniform(miny, maxy, size)])
+        urban = rng.random(size) < (urban_share if len(centers) else 0.0)
+        if urban.any():
+            picked = centers[rng.integers(0, len(centers), urban.sum())]
+            points[urban] = picked + rng.normal(0.0, URBAN_SPREAD, picked.shape) * [1 / LON_SCALE, 1.0]
+        points = points[shapely.contains_xy(outline, points[:, 0], points[:, 1])]
+        batches.append(points)
+        found += len(points)
+    return np.concatenate(batches)[:n]
+
+
+def _nearest(points, seeds, chunk=2048):
+    """Indice de la graine la plus proche de chaque point (calcul par blocs pour borner la mémoire)."""
+    scale = np.array([LON_SCALE, 1.0])
+    points, seeds = points * scale, seeds * scale
+    out = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk]
+        d2 = ((block[:, None, :] - seeds[None, :, :]) ** 2).sum(axis=2)
+        out[start:start + chunk] = d2.argmin(axis=1)
+    return out
+
+
+def _voronoi_cells(points, outline):
+    """Cellule de Voronoï de chaque point (dans l'ordre des points), découpée par `outline`."""
+    extent = shapely.box(*outline.buffer(1.0).bounds)
+    cells = shapely.get_parts(shapely.voronoi_polygons(shapely.multipoints(points), extend_to=extent))
+    point_idx, cell_idx = shapely.STRtree(cells).query(shapely.points(points), predicate="intersects")
+    first = np.unique(point_idx, return_index=True)[1]
+    order = np.full(len(points), -1, dtype=np.int64)
+    order[point_idx[first]] = cell_idx[first]
+    if (order < 0).any():
+        raise ValueError("Points en double : le diagramme de Voronoï n'a pas de cellule pour chacun.")
+    return shapely.intersection(cells[order], outline)
+
+
+def build_geography(rng, n_epci, n_communes, n_departments, n_regions):
+    """
+    (communes, epci) GeoDataFrames en EPSG:4326. Les communes portent CODE_COMMUNE, CODE_EPCI et
+    leur département ; les EPCI portent les propriétés du GeoJSON réel (EPCI_CODE, DEPARTEMEN, ...).
+    """
+    outline = shapely.Polygon(FRANCE_OUTLINE)
+    centers = _sample_points(rng, outline, np.empty((0, 2)), URBAN_CENTERS, urban_share=0.0)
+    points = _sample_points(rng, outline, centers, n_communes)
+    cells = _voronoi_cells(points, outline)
+
+    # Les sièges d'EPCI sont des communes : aucun EPCI n'est vide
+    seats = rng.choice(n_communes, n_epci, replace=False)
+    epci_of = _nearest(points, points[seats])
+    # Départements et régions : regroupement des sièges autour de graines uniformes
+    dep_seeds = _sample_points(rng, outline, centers, n_departments, urban_share=0.0)
+    dep_of_epci = _nearest(points[seats], dep_seeds)
+    region_of_dep = _nearest(dep_seeds, dep_seeds[rng.choice(n_departments, n_regions, replace=False)])
+
+    # Codes numérotés dans l'ordre d'apparition, seuls les départements effectivement utilisés
+    used_deps = np.unique(dep_of_epci)
+    dep_codes = {d: f"{i + 1:02d}" for i, d in enumerate(used_deps)}
+    region_codes = {r: f"{11 + i}" for i, r in enumerate(np.unique(region_of_dep[used_deps]))}
+    epci_codes = np.array([f"2{i + 1:08d}" for i in range(n_epci)], dtype=object)
+    commune_codes = np.array([f"{i + 1:05d}" for i in range(n_communes)], dtype=object)
+
+    communes = gpd.GeoDataFrame({
+        'CODE_COMMUNE': commune_codes,
+        'NOM_COMMUNE': [f"Commune {code}" for code in commune_codes],
+        'CODE_EPCI': epci_codes[epci_of],
+        'DDEP_C_COD': [dep_codes[d] for d in dep_of_epci[epci_of]],
+    }, geometry=cells, crs="EPSG:4326")
+
+    order = np.argsort(epci_of, kind="stable")
+    groups = np.split(order, np.cumsum(np.bincount(epci_of, minlength=n_epci))[:-1])
+    shapes = [shapely.union_all(cells[idx]) for idx in groups]
+
+    dep_col = [dep_codes[d] for d in dep_of_epci]
+    region_col = [region_codes[region_of_dep[d]] for d in dep_of_epci]
+    epci = gpd.GeoDataFrame({
+        'EPCI_CODE': epci_codes,
+        'EPCI': [f"Communauté de communes synthétique {code}" for code in epci_codes],
+        'DCOE_C_COD': commune_codes[seats],
+        'DDEP_C_COD': dep_col,
+        'DCOE_L_LIB': communes['NOM_COMMUNE'].to_numpy()[seats],
+        'REGION': [f"Région synthétique {code}" for code in region_col],
+        'REGION_COD': region_col,
+        'DEPARTEMEN': [f"Département synthétique {code}" for code in dep_col],
+        'Nb_Communes': np.bincount(epci_of, minlength=n_epci),
+    }, geometry=shapes, crs="EPSG:4326")
+    return communes, epci
+
+
+def _like(reference, values):
+    """`values` convertis vers le type de la colonne réelle (numérique ou texte)."""
+    if not pd.api.types.is_numeric_dtype(reference):
+        return np.asarray(values, dtype=object)
+    values = pd.to_numeric(pd.Series(values), errors='coerce')
+    try:
+        return values.astype(reference.dtype).to_numpy()
+    except (TypeError, ValueError):
+        # Entiers avec valeurs manquantes : on garde des flottants
+        return values.to_numpy()
+
+
+def synthesize_table(real, epci, rng, jitter=DEFAULT_JITTER):
+    """Une ligne par EPCI synthétique, tirée d'une ligne réelle puis bruitée variable par variable."""
+    n = len(epci)
+    deps = epci['DEPARTEMEN'].to_numpy()
+
+    # Lignes donneuses : un département réel par département synthétique, plus une part de tirages libres
+    real_groups = real.groupby('Département').indices if 'Département' in real.columns else {}
+    donors = rng.integers(0, len(real), n)
+    if real_groups:
+        real_deps = real['Département'].to_numpy()
+        for dep in np.unique(deps):
+            rows = np.flatnonzero(deps == dep)
+            # Département réel d'une ligne tirée au hasard : les petits départements restent rares
+            anchor = real_deps[rng.integers(0, len(real))]
+            group = real_groups[anchor] if anchor in real_groups else np.arange(len(real))
+            local = rng.random(len(rows)) < SAME_DEPARTMENT_SHARE
+            donors[rows[local]] = rng.choice(group, local.sum())
+    table = real.iloc[donors].reset_index(drop=True)
+
+    columns = {}
+    for col in table.columns:
+        if col in IDENTITY_COLUMNS or not pd.api.types.is_numeric_dtype(real[col]) or pd.api.types.is_bool_dtype(real[col]):
+            continue
+        observed = real[col].dropna()
+        if observed.empty or observed.min() == observed.max():
+            continue
+        noisy = (table[col].astype(float) * rng.normal(1.0, jitter, n)).clip(observed.min(), observed.max())
+        if pd.api.types.is_integer_dtype(real[col]) or (observed % 1 == 0).all():
+            noisy = noisy.round()
+        columns[col] = _like(real[col], noisy)
+
+    nom = epci['EPCI'].to_numpy()
+    identity = {
+        'CODE_EPCI': epci['EPCI_CODE'].to_numpy(),
+        'LIBEPCI': nom,
+        'nom_EPCI': nom,
+        'Nb_Communes': epci['Nb_Communes'].to_numpy(),
+        'Département': deps,
+        'Département_code': epci['DDEP_C_COD'].to_numpy(),
+    }
+    for col, values in identity.items():
+        if col in table.columns:
+            columns[col] = _like(real[col], values)
+    return table.assign(**columns)
+
+
+def generate(output_dir=DEFAULT_OUTPUT_DIR, n_epci=DEFAULT_EPCI, n_communes=DEFAULT_COMMUNES,
+             n_departments=DEFAULT_DEPARTMENTS, n_regions=DEFAULT_REGIONS, seed=42,
+             jitter=DEFAULT_JITTER, excel=True):
+    """Écrit un jeu synthétique complet dans `output_dir` et renvoie (communes, epci, table)."""
+    if n_communes < n_epci:
+        raise ValueError("Il faut au moins autant de communes que d'EPCI.")
+    rng = np.random.default_rng(seed)
+
+    print(f"  -> Lecture du schéma réel ({SOURCE_DIR})...")
+    real = pd.read_parquet(os.path.join(SOURCE_DIR, f"{DATASET_NAME}.parquet"))
+    real_geo = gpd.read_file(os.path.join(SOURCE_DIR, GEOJSON_NAME))
+    print(f"     ✅ {real.shape[0]} EPCI x {real.shape[1]} colonnes, {len(real_geo)} contours")
+
+    print(f"  -> Géographie : {n_communes} communes, {n_epci} EPCI, {n_departments} départements...")
+    t0 = time.perf_counter()
+    communes, epci = build_geography(rng, n_epci, n_communes, n_departments, n_regions)
+    n_vertices = int(shapely.get_num_coordinates(epci.geometry.values).sum())
+    print(f"     ✅ {epci['DEPARTEMEN'].nunique()} départements, {n_vertices} sommets EPCI "
+          f"({time.perf_counter() - t0:.1f} s)")
+
+    print("  -> Table attributaire (lignes donneuses bruitées)...")
+    table = synthesize_table(real, epci, rng, jitter)
+    print(f"     ✅ {table.shape[0]} lignes x {table.shape[1]} colonnes, "
+          f"{table.isna().mean().mean():.1%} de valeurs manquantes (réel : {real.isna().mean().mean():.1%})")
+
+    os.makedirs(output_dir, exist_ok=True)
+    geo_columns = [c for c in real_geo.columns if c != real_geo.geometry.name]
+    epci_out = epci[geo_columns + ['geometry']]
+    epci_out.to_file(os.path.join(output_dir, GEOJSON_NAME), driver="GeoJSON")
+    simplified = epci_out.copy()
+    simplified['geometry'] = simplified['geometry'].simplify(tolerance=SIMPLIFY_TOLERANCE, preserve_topology=True)
+    simplified.to_file(os.path.join(output_dir, GEOJSON_SIMPLIFIED_NAME), driver="GeoJSON")
+    communes.to_file(os.path.join(output_dir, COMMUNES_NAME), driver="GeoJSON")
+    communes[['CODE_COMMUNE', 'CODE_EPCI']].to_csv(os.path.join(output_dir, MAPPING_NAME), index=False)
+    table.to_parquet(os.path.join(output_dir, f"{DATASET_NAME}.parquet"), index=False, engine='pyarrow')
+    if excel:
+        # Source de l'étape `donnees` du pipeline
+        table.to_excel(os.path.join(output_dir, f"{DATASET_NAME}.xlsx"), index=False)
+    shutil.copyfile(os.path.join(SOURCE_DIR, DICT_NAME), os.path.join(output_dir, DICT_NAME))
+    print(f"     ✅ Fichiers écrits dans {output_dir}")
+    return communes, epci, table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jeu de données synthétique à l'échelle nationale")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Dossier de sortie (utilisable comme SENIAURA_DATA_DIR)")
+    parser.add_argument("--epci", type=int, default=DEFAULT_EPCI, help="Nombre d'EPCI")
+    parser.add_argument("--communes", type=int, default=DEFAULT_COMMUNES, help="Nombre de communes")
+    parser.add_argument("--departements", type=int, default=DEFAULT_DEPARTMENTS, help="Nombre de départements")
+    parser.add_argument("--regions", type=int, default=DEFAULT_REGIONS, help="Nombre de régions")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire (jeu reproductible)")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER, help="Bruit relatif des variables numériques")
+    parser.add_argument("--sans-excel", action="store_true", help="Ne pas écrire la copie Excel (source de l'étape `donnees`)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("🧪 GÉNÉRATION D'UN JEU DE DONNÉES SYNTHÉTIQUE")
+    print("=" * 60)
+    start = time.time()
+    generate(args.output, args.epci, args.communes, args.departements, args.regions,
+             args.seed, args.jitter, excel=not args.sans_excel)
+    print(f"\n🎉 Jeu synthétique généré en {time.time() - start:.2f} secondes.")
+    print(f"   Utilisation : SENIAURA_DATA_DIR={args.output} python app_v2.py")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
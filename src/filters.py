@@ -0,0 +1,125 @@
+"""
+Range-filter engine used by the exploration map sliders.
+
+Each dataset's filterable columns are stored as float64 rows, one contiguous row per variable,
+converted once per snapshot: `filter_matrix(ds, columns)` stacks the rows of the active sliders
+(only those columns are loaded), `filter_matrix(ds)` holds every variable (browser-side filters). `evaluate_filters` checks every active
+range in one vectorized pass and stores the failures as a packed bitmask
+(bit j of territory i set = excluded by filter j). Exclusion reasons are decoded from the bitmask
+only for the rows that need them.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+TECHNICAL_COLUMNS = {'CODE_EPCI', 'EPCI_CODE', 'nom_EPCI', 'LIBEPCI', 'Département', 'NATURE_EPCI', 'geometry'}
+
+
+@dataclass(frozen=True)
+class FilterMatrix:
+    """Filterable columns of one dataset: `values[position[col]]` is the column as contiguous floats."""
+    columns: tuple
+    position: dict
+    values: np.ndarray
+
+
+@dataclass(frozen=True)
+class FilterResult:
+    """Outcome of one filter evaluation, in the order of the ranges passed to `evaluate_filters`."""
+    columns: tuple
+    mask: np.ndarray            # (n,) bool, True = kept by every filter
+    exclusion_bits: np.ndarray  # (ceil(k / 8), n) uint8, little bit order
+    nan_counts: np.ndarray      # (k,) missing values per filter
+    out_counts: np.ndarray      # (k,) out-of-range (non missing) values per filter
+
+    def excluded_by(self, j):
+        """(n,) bool mask of the territories excluded by filter `j`."""
+        return ((self.exclusion_bits[j >> 3] >> (j & 7)) & 1).astype(bool)
+
+    def reasons(self, labels, rows):
+        """'<br>- label' lines of the filters excluding each territory of `rows` (object array)."""
+        rows = np.asarray(rows)
+        out = np.full(len(rows), "", dtype=object)
+        if not self.columns or len(rows) == 0:
+            return out
+        bits = np.unpackbits(self.exclusion_bits[:, rows], axis=0, count=len(self.columns), bitorder='little').astype(bool)
+        for j, label in enumerate(labels):
+            out[bits[j]] += f"<br>- {label}"
+        return out
+
+
+def filterable_columns(ds):
+    """Dictionary variables of the dataset that can carry a range filter, in table order."""
+    return tuple(c for c in ds.table.columns if c in ds.variable_dict and c not in TECHNICAL_COLUMNS)
+
+
+def build_filter_matrix(table, columns):
+    """FilterMatrix of `columns` of an attribute table (only those columns are loaded)."""
+    columns = tuple(dict.fromkeys(columns))
+    frame = table.get(columns)
+    values = np.empty((len(columns), len(frame)), dtype=np.float64)
+    for i, col in enumerate(columns):
+        values[i] = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64)
+    values.setflags(write=False)
+    return FilterMatrix(columns=columns, position={c: i for i, c in enumerate(columns)}, values=values)
+
+
+def filter_matrix(ds, columns=None):
+    """
+    FilterMatrix of `columns` (their rows are converted once per snapshot), or of every dictionary
+    variable present in the dataset, built once per snapshot. The full matrix loads every filterable
+    column: only the browser-side map filters need all of them at once.
+    """
+    if columns is None:
+        return ds.memo('filters.matrix', lambda: build_filter_matrix(ds.table, filterable_columns(ds)))
+    rows = ds.memo('filters.rows', dict)
+    columns = tuple(dict.fromkeys(columns))
+    missing = [c for c in columns if c not in rows]
+    if missing:
+        built = build_filter_matrix(ds.table, missing)
+        rows.update(zip(built.columns, built.values))
+    values = np.stack([rows[c] for c in columns]) if columns else np.empty((0, len(ds.table)))
+    values.setflags(write=False)
+    return FilterMatrix(columns=columns, position={c: i for i, c in enumerate(columns)}, values=values)
+
+
+def filter_result(columns, failed, nan_counts):
+    """FilterResult from the (k, n) failure matrix of `columns` and their missing-value counts."""
+    return FilterResult(
+        columns=tuple(columns),
+        mask=~failed.any(axis=0),
+        exclusion_bits=np.packbits(failed, axis=0, bitorder='little'),
+        nan_counts=nan_counts,
+        out_counts=failed.sum(axis=1) - nan_counts,
+    )
+
+
+def column_ranges(ds, columns):
+    """
+    {column: (min, max)} of `columns` as plain floats (slider bounds; NaN for a column without any
+    value), from the rows of `filter_matrix(ds, columns)`.
+    """
+    matrix = filter_matrix(ds, columns)
+    low, high = np.fmin.reduce(matrix.values, axis=1), np.fmax.reduce(matrix.values, axis=1)
+    return {col: (float(low[i]), float(high[i])) for i, col in enumerate(matrix.columns)}
+
+
+def evaluate_filters(matrix, ranges):
+    """
+    Evaluates `ranges` = [(column, low, high), ...] (inclusive bounds) in one pass.
+    Missing values never satisfy a range, so they count as excluded.
+    """
+    n = matrix.values.shape[1]
+    columns = tuple(col for col, _, _ in ranges)
+    if not ranges:
+        return filter_result((), np.zeros((0, n), dtype=bool), np.zeros(0, dtype=np.int64))
+
+    rows = np.fromiter((matrix.position[col] for col in columns), dtype=np.intp, count=len(columns))
+    low = np.array([r[1] for r in ranges], dtype=np.float64)[:, None]
+    high = np.array([r[2] for r in ranges], dtype=np.float64)[:, None]
+
+    values = matrix.values[rows]
+    failed = ~((values >= low) & (values <= high))
+    return filter_result(columns, failed, np.isnan(values).sum(axis=1))
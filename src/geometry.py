@@ -0,0 +1,156 @@
+"""
+Territory geometries, kept apart from the analytic attribute table.
+
+`DataSnapshot.geometry` holds the EPCI outlines once per process as a shapely array in EPSG:4326,
+aligned by position with the attribute table `DataSnapshot.table` and keyed by EPCI_CODE. A store
+read from the snapshot cache keeps the WKB column of the memory-mapped Arrow file and only decodes
+it the first time `geometries` is used (PDF map, metrics fallback).
+Nothing on the request path reprojects or converts geometries to GeoJSON dicts; a GeoDataFrame is
+only assembled on demand (PDF map) through `to_geodataframe`.
+
+The map itself loads GeoJSON outlines by URL. The ETL encodes them at several simplification tiers
+(`GEOMETRY_TIERS`, one shared-arc topology per tier, manifest `data/artifacts/geometry_tiers.json`)
+and `select_geometry_tier` picks the coarsest tier whose tolerance stays under one screen pixel for
+the current view.
+"""
+
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from .artifacts import read_json_artifact
+from .static_assets import static_url
+
+GEOMETRY_CRS = "EPSG:4326"
+
+# Map outline tiers (name, tolerance in degrees), coarsest first. 0.001° ≈ 100 m.
+GEOMETRY_TIERS = (
+    ("overview", 0.01),
+    ("regional", 0.003),
+    ("detailed", 0.001),
+)
+GEOMETRY_TIERS_ARTIFACT = "geometry_tiers.json"
+# Layers decoded from the tier topology (src/topology.py), served by app_v2.py
+GEOMETRY_TIER_URL = "/geometry/{tier}/{layer}.geojson"
+# Outline files used when the ETL has not produced the tiers yet
+GEOMETRY_FALLBACK_TIER = {
+    "name": "simplified",
+    "url": "/assets/epci-ara-simplified.geojson",
+    "departments_url": "/assets/departments-ara.geojson",
+    "tolerance": 0.0,
+}
+
+
+@dataclass(frozen=True)
+class GeometryStore:
+    """
+    Shapely geometries (EPSG:4326) of a dataset's rows; `position[code]` is the row of an EPCI.
+    `source` is either the geometry array or the WKB it is decoded from on first use.
+    """
+    codes: np.ndarray
+    source: object = field(repr=False)
+    position: dict
+    _decoded: list = field(default_factory=list, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_geodataframe(cls, gdf, code_column='EPCI_CODE'):
+        """Extracts the geometry column of `gdf` (reprojected to EPSG:4326 once if needed)."""
+        if gdf.crs is None:
+            gdf = gdf.set_crs(GEOMETRY_CRS)
+        elif gdf.crs.to_string() != GEOMETRY_CRS:
+            gdf = gdf.to_crs(GEOMETRY_CRS)
+        codes = gdf[code_column].astype(str).to_numpy(dtype=object)
+        return cls.from_arrays(codes, np.asarray(gdf.geometry.array, dtype=object))
+
+    @classmethod
+    def from_wkb(cls, codes, wkb):
+        """Store over WKB values (e.g. a pyarrow binary array), decoded on first access to `geometries`."""
+        return cls._build(np.asarray(codes, dtype=object), wkb)
+
+    @classmethod
+    def from_arrays(cls, codes, geometries):
+        geometries.setflags(write=False)
+        return cls._build(codes, geometries)
+
+    @classmethod
+    def _build(cls, codes, source):
+        position = {}
+        for i, code in enumerate(codes):
+            position.setdefault(code, i)
+        codes.setflags(write=False)
+        return cls(codes=codes, source=source, position=position)
+
+    @property
+    def geometries(self):
+        if isinstance(self.source, np.ndarray):
+            return self.source
+        if not self._decoded:
+            with self._lock:
+                if not self._decoded:
+                    geometries = shapely.from_wkb(np.asarray(self.source, dtype=object))
+                    geometries.setflags(write=False)
+                    self._decoded.append(geometries)
+        return self._decoded[0]
+
+    def to_wkb(self):
+        """WKB bytes of every geometry (row order), for the on-disk snapshot cache."""
+        if not isinstance(self.source, np.ndarray):
+            return np.asarray(self.source, dtype=object)
+        return shapely.to_wkb(self.geometries)
+
+    def take(self, epci_codes):
+        """Geometries of `epci_codes` (None for unknown codes)."""
+        return np.array([self.geometries[self.position[c]] if c in self.position else None for c in epci_codes],
+                        dtype=object)
+
+    def to_geodataframe(self, frame, columns=None):
+        """
+        GeoDataFrame of `frame` (row-aligned with this store, e.g. a snapshot's gdf_merged),
+        restricted to `columns` when given.
+        """
+        if len(frame) != len(self.geometries):
+            raise ValueError("Le tableau d'attributs n'est pas aligné sur le stockage des géométries.")
+        attrs = frame if columns is None else frame[list(columns)]
+        return gpd.GeoDataFrame(pd.DataFrame(attrs).copy(), geometry=gpd.GeoSeries(self.geometries, index=attrs.index),
+                                crs=GEOMETRY_CRS)
+
+
+def count_vertices(geometries):
+    """Total number of coordinates of `geometries` (every ring of Polygons and MultiPolygons)."""
+    return int(shapely.get_num_coordinates(np.asarray(geometries, dtype=object)).sum())
+
+
+def simplify_coverage(geometries, tolerance):
+    """
+    Simplifies a set of adjacent polygons without opening gaps or overlaps between neighbours:
+    shared edges are simplified once (shapely >= 2.1 `coverage_simplify`). Older shapely versions
+    fall back to a per-polygon topology-preserving simplification.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    if hasattr(shapely, "coverage_simplify"):
+        return shapely.coverage_simplify(geometries, tolerance)
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+
+def load_geometry_tiers():
+    """
+    Map outline tiers written by the ETL (coarsest first), or the single simplified file.
+    URLs point to the content-hashed copies when the `assets` stage has built them.
+    """
+    manifest = read_json_artifact(GEOMETRY_TIERS_ARTIFACT)
+    tiers = manifest["tiers"] if manifest and manifest.get("tiers") else [GEOMETRY_FALLBACK_TIER]
+    tiers = [dict(t, url=static_url(t["url"]), departments_url=static_url(t["departments_url"])) for t in tiers]
+    return sorted(tiers, key=lambda t: t["tolerance"], reverse=True)
+
+
+def select_geometry_tier(tiers, degrees_per_pixel):
+    """Coarsest tier whose tolerance is below one screen pixel (the finest tier when none qualifies)."""
+    for tier in tiers:
+        if tier["tolerance"] <= degrees_per_pixel:
+            return tier
+    return tiers[-1]
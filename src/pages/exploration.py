@@ -1,5 +1,5 @@
 import dash
-from dash import dcc, html, Input, Output, callback, ALL, State, no_update, clientside_callback, ClientsideFunction
+from dash import dcc, html, Input, Output, callback, ALL, State, no_update, clientside_callback, ClientsideFunction, Patch
 import dash_mantine_components as dmc
 from dash_iconify import DashIconify
 import plotly.graph_objects as go
@@ -7,7 +7,14 @@ import numpy as np
 import pandas as pd
 import random
 from sklearn.preprocessing import StandardScaler
-from src.data import load_data
+from src.data import get_snapshot, load_metadata
+from src.datasets import get_dataset
+from src.filters import column_ranges, evaluate_filters, filter_matrix, filterable_columns
+from src.geometry import load_geometry_tiers, select_geometry_tier
+from src.territories import epci_metrics
+from src.analytics import stats_table, STATUS_ALERT, STATUS_WATCH, STATUS_BALANCED, STATUS_ASSET, STATUS_STRENGTH
+from src.twins import twin_index
+from src.clustering import THEME_VARIABLES
 
 try:
     df_hosp = pd.read_csv("data/hospitals_ara.csv")
@@ -20,33 +27,14 @@ CONNECTORS = [
     " lié à ", " accompagné de ", " doublé d'un(e) "
 ]
 
-# Load shared data
-gdf_merged, variable_dict, category_dict, sens_dict, description_dict, unit_dict, gdf_deps, source_dict, classement_dict = load_data()
+# Load shared data (dictionaries only: indicator columns are read on demand through `ds.table`)
+variable_dict, category_dict, sens_dict, description_dict, unit_dict, gdf_deps, source_dict, classement_dict = load_metadata()
+epci_labels = get_snapshot().table.get(['nom_EPCI', 'EPCI_CODE'])
 
-# Ensure consistent projection and index for robust mapping
-if gdf_merged.crs is None:
-    gdf_merged.set_crs(epsg=4326, inplace=True)
-
-gdf_4326 = gdf_merged.to_crs(epsg=4326)
-# IMPORTANT: Create a clean ID for Plotly Choropleth mapping
-gdf_4326['id'] = gdf_4326.index.astype(str)
-geojson_data = gdf_4326.__geo_interface__
-
-# Prepare departments
-gdf_deps_4326 = gdf_deps.to_crs(epsg=4326).reset_index()
-gdf_deps_4326['id'] = gdf_deps_4326.index.astype(str)
-geojson_deps = gdf_deps_4326.__geo_interface__
-
-# Save department boundaries to assets once at startup to optimize transfer
-import json
 import os
-assets_dep_path = "assets/departments-ara.geojson"
-if not os.path.exists(assets_dep_path):
-    try:
-        with open(assets_dep_path, "w", encoding="utf-8") as f:
-            json.dump(geojson_deps, f)
-    except Exception as e:
-        print(f"Error saving departments geojson: {e}")
+import base64
+import hashlib
+import json
 
 MARKER_COLORS = ['#e03131', '#1971c2', '#2b8a3e', '#e67700', '#9c36b5', '#0b7285', '#5c940d', '#d9480f']
 
@@ -54,22 +42,22 @@ THEME_METADATA = {
     'sante': {
         'label': "Profil Épidémiologique & Santé",
         'badge_color': "red",
-        'vars': ['INCI_AVC', 'INCI_CardIsch', 'INCI_InsuCard', 'MORT_AVC', 'MORT_CardIsch', 'MORT_InsuCard', 'PREV_AVC', 'PREV_CardIsch', 'PREV_InsuCard']
+        'vars': THEME_VARIABLES['sante']
     },
     'socio': {
         'label': "Déterminants Socio-Économiques",
         'badge_color': "teal",
-        'vars': ['FDep_2021', 'MED_SL', 'PR_MD60', 'Part de personnes isolées 60 ans et plus', 'Taux de chomeurs_2022']
+        'vars': THEME_VARIABLES['socio']
     },
     'offre': {
         'label': "Offre de Soins & Accessibilité",
         'badge_color': "blue",
-        'vars': ['APL-med_general_2023', 'APL_Cardio_EPCI', 'Officines_2025', 'Centres_Sante_2025', 'Maisons_Sante_2025']
+        'vars': THEME_VARIABLES['offre']
     },
     'env': {
         'label': "Exposition Environnementale",
         'badge_color': "green",
-        'vars': ['AIR01', 'AIR02', 'BRUIT01', 'BRUIT02']
+        'vars': THEME_VARIABLES['env']
     }
 }
 
@@ -235,7 +223,7 @@ layout = dmc.Container(
                                 ),
                                 dmc.MultiSelect(
                                     id='sidebar-epci-radar',
-                                    data=[{'label': n, 'value': c} for n, c in zip(gdf_merged['nom_EPCI'], gdf_merged['EPCI_CODE']) if pd.notnull(n)],
+                                    data=[{'label': n, 'value': c} for n, c in zip(epci_labels['nom_EPCI'], epci_labels['EPCI_CODE']) if pd.notnull(n)],
                                     placeholder="Choisir EPCI...",
                                     searchable=True,
                                     clearable=True,
@@ -269,6 +257,10 @@ layout = dmc.Container(
                                                 style={"display": "none"} # Hide the switch
                                             ),
                                         ]),
+                                        # Dataset version, exclusion state and outline tier of the figure held by the browser (Patch updates)
+                                        dcc.Store(id='map-base-key'),
+                                        # Filterable columns of the active dataset, for clientside filtering
+                                        dcc.Store(id='map-filter-payload'),
                                         dcc.Graph(
                                             id='map-graph',
                                             style={'height': "550px", "width": "100%", "borderRadius": "inherit"}, 
@@ -461,18 +453,25 @@ def update_aside_content(pathname):
      Input('sidebar-filter-offre', 'value'),
      Input('sidebar-filter-env', 'value')],
     [State({'type': 'exploration-slider', 'index': ALL}, 'value'),
-     State({'type': 'exploration-slider', 'index': ALL}, 'id')]
+     State({'type': 'exploration-slider', 'index': ALL}, 'id'),
+     State('dataset-select', 'value'),
+     State('available-datasets-store', 'data')]
 )
-def update_sliders(social, offre, env, current_vals, current_ids):
+def update_sliders(social, offre, env, current_vals, current_ids, dataset_value, available_datasets):
+    ds = get_dataset(dataset_value, available_datasets)
+    table, variable_dict, unit_dict = ds.table, ds.variable_dict, ds.unit_dict
+    category_dict, description_dict, sens_dict = ds.category_dict, ds.description_dict, ds.sens_dict
     val_map = {id_dict['index']: val for val, id_dict in zip(current_vals, current_ids)}
+    # Bounds of every displayed slider (only the displayed columns are loaded)
+    ranges = column_ranges(ds, [v for v in (social or []) + (offre or []) + (env or []) if v in table])
     
     def make_category_item(vars, label_cat):
         if not vars: return []
         
         sliders = []
         for var in vars:
-            if var not in gdf_merged.columns: continue
-            mn, mx = gdf_merged[var].min(), gdf_merged[var].max()
+            if var not in table: continue
+            mn, mx = ranges[var]
             initial_val = val_map.get(var, [mn, mx])
             fmt = lambda val: f"{val:.0f}" if abs(val) >= 10 else f"{val:.2f}"
             label_var = variable_dict.get(var, var)
@@ -566,11 +565,16 @@ def select_epci_on_click(clickData, current_selection):
     [Input('sidebar-filter-social', 'value'),
      Input('sidebar-filter-offre', 'value'),
      Input('sidebar-filter-env', 'value')],
-    [State('url', 'pathname')]
+    [State('url', 'pathname'),
+     State('dataset-select', 'value'),
+     State('available-datasets-store', 'data')]
 )
-def update_highlight_options(social, offre, env, pathname):
+def update_highlight_options(social, offre, env, pathname, dataset_value, available_datasets):
     if pathname not in ['/exploration', '/carte', '/radar']:
         raise dash.exceptions.PreventUpdate
+    ds = get_dataset(dataset_value, available_datasets)
+    variable_dict, category_dict = ds.variable_dict, ds.category_dict
+    description_dict, sens_dict = ds.description_dict, ds.sens_dict
     all_vars = (social or []) + (offre or []) + (env or [])
     if not all_vars: return []
     
@@ -598,34 +602,344 @@ def update_highlight_options(social, offre, env, pathname):
         options.append({'label': label, 'value': v, 'tooltip': tooltip_text})
     return options
 
+# --- Map hover text ---
+MAP_CLICK_INSTRUCTION = "<i>Cliquez sur cet EPCI pour l'ajouter au radar chart et au profiler</i><br><br>"
+MAP_EXCLUSION_HEADER = "<br><span style='font-size: 11px; color: #e03131'>Grisé par :</span>"
+
+def _format_pct(series):
+    """'12.3%' / 'N/A' for a whole column at once."""
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+    return np.where(np.isnan(values), "N/A", np.char.mod("%.1f%%", values)).astype(object)
+
+def _map_tooltips(ds):
+    """
+    Static hover-text parts of every territory, built once per dataset and reused by every map update:
+    codes, background text (click hint + name + 65+ context) and focus text (name + 65+ context).
+    """
+    def build():
+        g = ds.table
+        names = g['nom_EPCI'].fillna("").astype(str).to_numpy(dtype=object)
+        demo = np.full(len(g), "", dtype=object)
+        if 'H_65_plus' in g.columns and 'F_65_plus' in g.columns:
+            demo = ("<br><span style='font-size: 11.5px;'>👨 Hommes 65+ : <b>" + _format_pct(g['H_65_plus'])
+                    + "</b>  |  👩 Femmes 65+ : <b>" + _format_pct(g['F_65_plus']) + "</b></span>")
+        return {
+            'codes': g['EPCI_CODE'].astype(str).to_numpy(dtype=object),
+            'background': MAP_CLICK_INSTRUCTION + "<b>" + names + "</b>" + demo,
+            'focus': names + demo,
+        }
+    return ds.memo('exploration.map_tooltips', build)
+
+# --- Map figure ---
+# Send the full figure once per dataset, then only the changed trace arrays (dash.Patch). SENIAURA_MAP_PATCH=0 disables it.
+MAP_PATCH_UPDATES = os.environ.get("SENIAURA_MAP_PATCH", "1") != "0"
+# Optional: slider filtering recomputed in the browser (assets/map_filters.js) from a typed-array payload
+MAP_CLIENTSIDE_FILTERS = os.environ.get("SENIAURA_MAP_CLIENTSIDE", "0") == "1"
+
+# Fixed trace order of the exploration map, so Patch updates can address traces by index
+MAP_TRACE_BACKGROUND, MAP_TRACE_FOCUS, MAP_TRACE_DEPARTMENTS, MAP_TRACE_HIGHLIGHT, MAP_TRACE_SELECTION, MAP_TRACE_CITIES = range(6)
+
+# Outline tiers (ETL stage 'contours'); the EPCI layers share the selected file, departments use the same arcs
+MAP_GEOMETRY_TIERS = load_geometry_tiers()
+MAP_EPCI_TRACES = (MAP_TRACE_BACKGROUND, MAP_TRACE_FOCUS, MAP_TRACE_HIGHLIGHT, MAP_TRACE_SELECTION)
+# Layers a Patch can rewrite, the layers each update_map input changes (any other input, e.g. the
+# dataset or the page, rewrites all of them) and the layers drawn from the slider exclusions, which
+# are only resent when the exclusions differ from the ones the browser shows (see _map_exclusions_key)
+MAP_PATCH_LAYERS = (MAP_TRACE_BACKGROUND, MAP_TRACE_FOCUS, MAP_TRACE_HIGHLIGHT, MAP_TRACE_SELECTION)
+MAP_TRIGGER_LAYERS = {
+    'map-indic-select': {MAP_TRACE_FOCUS},
+    'map-patho-select': {MAP_TRACE_FOCUS},
+    'highlight-variable-select': {MAP_TRACE_HIGHLIGHT},
+    'sidebar-epci-radar': {MAP_TRACE_SELECTION},
+    'exploration-slider': set(),
+    'show-hospitals-switch': set(),
+}
+MAP_EXCLUSION_LAYERS = {MAP_TRACE_BACKGROUND, MAP_TRACE_FOCUS, MAP_TRACE_HIGHLIGHT}
+# Approximate drawing area of map-graph (px), used to convert the viewport into degrees per pixel
+MAP_VIEWPORT_PX = (800, 550)
+
+MAP_CITIES = [
+    {"name": "Lyon", "lat": 45.7640, "lon": 4.8357},
+    {"name": "Saint-Étienne", "lat": 45.4397, "lon": 4.3873},
+    {"name": "Grenoble", "lat": 45.1885, "lon": 5.7248},
+    {"name": "Clermont-Ferrand", "lat": 45.7772, "lon": 3.0870},
+    {"name": "Valence", "lat": 44.9333, "lon": 4.8917},
+    {"name": "Annecy", "lat": 45.8992, "lon": 6.1293},
+    {"name": "Chambéry", "lat": 45.5646, "lon": 5.9238},
+    {"name": "Bourg-en-Bresse", "lat": 46.2052, "lon": 5.2258},
+    {"name": "Montluçon", "lat": 46.3401, "lon": 2.6020},
+    {"name": "Aurillac", "lat": 44.9264, "lon": 2.4418},
+    {"name": "Le Puy-en-Velay", "lat": 45.0428, "lon": 3.8829},
+    {"name": "Moulins", "lat": 46.5667, "lon": 3.3333},
+    {"name": "Privas", "lat": 44.7333, "lon": 4.6000},
+]
+
+def _map_geometry_tier(ds, scale=1.0):
+    """
+    Outline tier for the current view: the figure fits the dataset's territories, so one pixel
+    covers extent / viewport degrees, divided by the zoom `scale` (geo.projection.scale).
+    """
+    metrics = epci_metrics(ds)
+    minx, miny, maxx, maxy = metrics['minx'].min(), metrics['miny'].min(), metrics['maxx'].max(), metrics['maxy'].max()
+    degrees_per_pixel = max((maxx - minx) / MAP_VIEWPORT_PX[0], (maxy - miny) / MAP_VIEWPORT_PX[1])
+    return select_geometry_tier(MAP_GEOMETRY_TIERS, degrees_per_pixel / max(scale or 1.0, 1.0))
+
+def _build_map_figure(ds, trace_updates):
+    """Full map figure: the six layers in MAP_TRACE_* order, with `trace_updates` applied on top."""
+    tooltips = _map_tooltips(ds)
+    dep_locations = ds.gdf_deps.index.astype(str).tolist()
+    tier = _map_geometry_tier(ds)
+    epci_geojson = tier["url"]
+    fig = go.Figure()
+
+    # 1. Background layer (All territories) - Using ID for robust mapping
+    fig.add_trace(go.Choropleth(
+        geojson=epci_geojson,
+        featureidkey="properties.EPCI_CODE",
+        locations=tooltips['codes'].tolist(),
+        z=[0] * len(tooltips['codes']),
+        colorscale=[[0, '#f1f3f5'], [1, '#f1f3f5']],
+        showscale=False,
+        marker_line_width=0.5,
+        marker_line_color='rgba(0,0,0,0.1)',
+        hovertemplate="%{text}<extra></extra>",
+        customdata=tooltips['codes'].tolist(),
+        name="Région"
+    ))
+
+    # 2. Focus layer
+    fig.add_trace(go.Choropleth(
+        geojson=epci_geojson,
+        featureidkey="properties.EPCI_CODE",
+        colorscale="Blues",
+        marker_line_width=0.5,
+        marker_line_color="rgba(255,255,255,0.8)",
+        colorbar=dict(thickness=15, len=0.8, y=0.5, x=0.01, xanchor="left"),
+    ))
+
+    # 3. Department outlines
+    fig.add_trace(go.Choropleth(
+        geojson=tier["departments_url"],
+        featureidkey="properties.DEPARTEMEN",
+        locations=dep_locations,
+        z=[0] * len(dep_locations),
+        colorscale=[[0, 'rgba(0,0,0,0)'], [1, 'rgba(0,0,0,0)']],
+        showscale=False,
+        marker_line_width=1.5,
+        marker_line_color='rgba(0,0,0,0.6)',
+        hoverinfo='skip'
+    ))
+
+    # 4. Highlight Exclusion (Specific Variable)
+    fig.add_trace(go.Choropleth(
+        geojson=epci_geojson,
+        featureidkey="properties.EPCI_CODE",
+        colorscale=[[0, '#adb5bd'], [1, '#adb5bd']],
+        showscale=False,
+        marker_line_width=1,
+        marker_line_color='rgba(0,0,0,0.3)',
+    ))
+
+    # 5. Highlight selection
+    fig.add_trace(go.Choropleth(
+        geojson=epci_geojson,
+        featureidkey="properties.EPCI_CODE",
+        colorscale=[[0, 'rgba(224, 49, 49, 0.05)'], [1, 'rgba(224, 49, 49, 0.05)']],
+        showscale=False,
+        marker_line_width=2.5,
+        marker_line_color='#e03131',
+        hoverinfo='skip',
+        name="Sélection"
+    ))
+
+    # 6. Major Cities
+    fig.add_trace(go.Scattergeo(
+        lat=[c["lat"] for c in MAP_CITIES],
+        lon=[c["lon"] for c in MAP_CITIES],
+        text=[c["name"] for c in MAP_CITIES],
+        mode="markers+text",
+        marker=dict(size=4, color="black", opacity=0.7),
+        textposition="top center",
+        textfont=dict(family="Inter, sans-serif", size=9, color="black"),
+        hoverinfo="text",
+        showlegend=False
+    ))
+
+    for trace_idx, props in trace_updates.items():
+        for prop, value in props.items():
+            fig.data[trace_idx][prop] = value
+
+    fig.update_geos(fitbounds="locations", visible=False)
+    fig.update_layout(
+        margin={"r":0, "t":0, "l":0, "b":0},
+        paper_bgcolor='white', 
+        clickmode='event+select',
+        dragmode=False,
+        meta=ds.version
+    )
+    return fig
+
+def _map_trace_updates(ds, target, filters, labels, slider_ids, highlight_var, epci_selection,
+                       layers=MAP_PATCH_LAYERS, exclusions_changed=True):
+    """
+    Per-request values of the fixed map traces (see MAP_TRACE_*) in `layers`; empty layers keep
+    their slot. With `exclusions_changed` False the focus layer only carries what depends on the
+    indicator (its territories are the ones the browser already shows).
+    """
+    table, variable_dict, unit_dict = ds.table, ds.variable_dict, ds.unit_dict
+    tooltips = _map_tooltips(ds)
+    click_instruction = MAP_CLICK_INSTRUCTION
+    mask = filters.mask
+    codes = tooltips['codes']
+    trace_updates = {}
+
+    if MAP_TRACE_BACKGROUND in layers:
+        # Build text for background layer: reasons are decoded from the bitmask for excluded territories only
+        excluded_rows = np.flatnonzero(~mask)
+        bg_text_with_reasons = tooltips['background'].copy()
+        bg_text_with_reasons[excluded_rows] += MAP_EXCLUSION_HEADER + filters.reasons(labels, excluded_rows)
+        trace_updates[MAP_TRACE_BACKGROUND] = {'text': bg_text_with_reasons.tolist()}
+
+    if MAP_TRACE_FOCUS in layers:
+        focus = {
+            'z': table[target][mask].tolist(),
+            'hovertemplate': click_instruction + "<b>%{text}</b><br><br>" + variable_dict.get(target, target) + " : <b>%{z:.2f}</b><extra></extra>",
+            'colorbar.title.text': unit_dict.get(target, ""),
+            'meta': target,
+        }
+        if exclusions_changed:
+            focus.update({
+                'locations': codes[mask].tolist(),
+                'text': tooltips['focus'][mask].tolist(),
+                'customdata': codes[mask].tolist(),
+            })
+        trace_updates[MAP_TRACE_FOCUS] = focus
+
+    if MAP_TRACE_HIGHLIGHT in layers:
+        trace_updates[MAP_TRACE_HIGHLIGHT] = {'locations': [], 'z': [], 'text': [], 'hovertemplate': None, 'name': None}
+    if MAP_TRACE_SELECTION in layers:
+        trace_updates[MAP_TRACE_SELECTION] = {'locations': [], 'z': []}
+
+    # 4. Highlight Exclusion (Specific Variable)
+    if MAP_TRACE_HIGHLIGHT in layers and highlight_var:
+        slider_indices = [i for i, d in enumerate(slider_ids) if d['index'] == highlight_var]
+        if slider_indices:
+            excluded_by_var = filters.excluded_by(slider_indices[0])
+            trace_updates[MAP_TRACE_HIGHLIGHT] = {
+                'locations': codes[excluded_by_var].tolist(),
+                'z': [1] * int(excluded_by_var.sum()),
+                'text': table['nom_EPCI'][excluded_by_var].tolist(),
+                'hovertemplate': click_instruction + "<b>%{text}</b><br>Grisé par : " + variable_dict.get(highlight_var, highlight_var) + "<extra></extra>",
+                'name': f"Exclu par {highlight_var}",
+            }
+
+    # 5. Highlight selection
+    if MAP_TRACE_SELECTION in layers and epci_selection:
+        sel = epci_selection if isinstance(epci_selection, list) else [epci_selection]
+        hl_codes = codes[np.isin(codes, [str(c) for c in sel])].tolist()
+        trace_updates[MAP_TRACE_SELECTION] = {'locations': hl_codes, 'z': [1] * len(hl_codes)}
+
+    return trace_updates
+
+def _map_patch(trace_updates):
+    """dash.Patch applying `trace_updates` to the figure the browser already holds."""
+    fig = Patch()
+    for trace_idx, props in trace_updates.items():
+        for prop, value in props.items():
+            node = fig['data'][trace_idx]
+            *parents, leaf = prop.split('.')
+            for key in parents:
+                node = node[key]
+            node[leaf] = value
+    return fig
+
+def _triggered_by_sliders_only():
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    return bool(triggered) and all('exploration-slider' in prop_id for prop_id in triggered)
+
+def _triggered_components():
+    """Component ids (pattern ids as dicts) of the inputs that fired; empty on the initial call or outside a request."""
+    try:
+        return list(dash.callback_context.triggered_prop_ids.values())
+    except dash.exceptions.MissingCallbackContextException:
+        return []
+
+def _map_exclusions_key(filters):
+    """Digest of which slider excludes which territory: what the background tooltips, focus and highlight layers show."""
+    digest = hashlib.blake2b(json.dumps(filters.columns).encode('utf-8'), digest_size=16)
+    digest.update(filters.exclusion_bits.tobytes())
+    return digest.hexdigest()
+
+def _map_patch_layers(triggers, exclusions_changed):
+    """MAP_TRACE_* layers a Patch has to rewrite for the inputs that fired (all of them when unknown)."""
+    if not triggers:
+        return set(MAP_PATCH_LAYERS)
+    layers = set(MAP_EXCLUSION_LAYERS) if exclusions_changed else set()
+    for component in triggers:
+        key = component.get('type') if isinstance(component, dict) else component
+        if key not in MAP_TRIGGER_LAYERS:
+            return set(MAP_PATCH_LAYERS)
+        layers |= MAP_TRIGGER_LAYERS[key]
+    return layers
+
+def _map_filter_payload(ds):
+    """
+    Browser-side copy of the filter matrix, built once per dataset: each column as base64 little-endian
+    float64 (NaN kept), the values `evaluate_filters` compares, so the browser excludes the same
+    territories as the server's counts; plus the static tooltip parts needed to redraw the
+    background, focus and highlight layers.
+    """
+    def build():
+        matrix = filter_matrix(ds)
+        tooltips = _map_tooltips(ds)
+        return {
+            'version': ds.version,
+            'n': int(matrix.values.shape[1]),
+            'columns': {
+                col: base64.b64encode(matrix.values[i].astype('<f8').tobytes()).decode('ascii')
+                for i, col in enumerate(matrix.columns)
+            },
+            'labels': {col: ds.variable_dict.get(col, col) for col in matrix.columns},
+            'codes': tooltips['codes'].tolist(),
+            'names': ds.table['nom_EPCI'].fillna("").astype(str).tolist(),
+            'background': tooltips['background'].tolist(),
+            'focus': tooltips['focus'].tolist(),
+            'header': MAP_EXCLUSION_HEADER,
+        }
+    return ds.memo('exploration.map_filter_payload', build)
+
 # --- Map Callback ---
 @callback(
     [Output('map-graph', 'figure'),
      Output('map-stats-header-content', 'children'),
      Output('map-narrative-content', 'children'),
      Output('map-reading-guide', 'children'),
-     Output('map-dynamic-title', 'children')],
+     Output('map-dynamic-title', 'children'),
+     Output('map-base-key', 'data')],
     [Input('map-indic-select', 'value'), Input('map-patho-select', 'value'),
      Input({'type': 'exploration-slider', 'index': ALL}, 'value'),
      Input('sidebar-epci-radar', 'value'),
      Input('highlight-variable-select', 'value'),
      Input('show-hospitals-switch', 'checked'),
-     Input('url', 'pathname')],
-    [State({'type': 'exploration-slider', 'index': ALL}, 'id')]
+     Input('url', 'pathname'),
+     Input('dataset-select', 'value')],
+    [State({'type': 'exploration-slider', 'index': ALL}, 'id'),
+     State('available-datasets-store', 'data'),
+     State('map-base-key', 'data')]
 )
-def update_map(ind, patho, slider_vals, epci_selection, highlight_var, show_hospitals, pathname, slider_ids):
+def update_map(ind, patho, slider_vals, epci_selection, highlight_var, show_hospitals, pathname, dataset_value, slider_ids, available_datasets, map_base_key):
     if pathname not in ['/exploration', '/carte', '/radar']:
         raise dash.exceptions.PreventUpdate
     try:
-        click_instruction = "<i>Cliquez sur cet EPCI pour l'ajouter au radar chart et au profiler</i><br><br>"
-        total_epci = len(gdf_merged)
-        
-        # Demographic Context for Tooltips
-        demo_text_series = pd.Series([""] * total_epci, index=gdf_merged.index)
-        if 'H_65_plus' in gdf_merged.columns and 'F_65_plus' in gdf_merged.columns:
-             demo_h = gdf_merged['H_65_plus'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A")
-             demo_f = gdf_merged['F_65_plus'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A")
-             demo_text_series = "<br><span style='font-size: 11.5px;'>👨 Hommes 65+ : <b>" + demo_h + "</b>  |  👩 Femmes 65+ : <b>" + demo_f + "</b></span>"
+        ds = get_dataset(dataset_value, available_datasets)
+        table, variable_dict, unit_dict = ds.table, ds.variable_dict, ds.unit_dict
+        filterable = set(filterable_columns(ds))
+        # Slider values left over from another dataset may reference columns this one lacks
+        slider_pairs = [(val, id_dict) for val, id_dict in zip(slider_vals or [], slider_ids or []) if id_dict['index'] in filterable]
+        slider_vals = [p[0] for p in slider_pairs]
+        slider_ids = [p[1] for p in slider_pairs]
+
+        total_epci = len(table)
 
         # ----------------------------------------------------
         # STANDARD DISEASE CHLOROPLETH MAP MODE
@@ -634,7 +948,7 @@ def update_map(ind, patho, slider_vals, epci_selection, highlight_var, show_hosp
         patho_map = {'AVC': "de l'AVC", 'CardIsch': "de la Cardiopathie Ischémique", 'InsuCard': "de l'insuffisance cardiaque"}
         
         # Vérification si l'indicateur sélectionné est un indicateur utilisateur direct
-        if ind in gdf_merged.columns:
+        if ind in table:
             target = ind
             dynamic_title = f"Carte de l'indicateur : {variable_dict.get(ind, ind)}"
         else:
@@ -642,178 +956,44 @@ def update_map(ind, patho, slider_vals, epci_selection, highlight_var, show_hosp
             p_str = patho_map.get(patho, patho)
             dynamic_title = f"Carte de {i_str} {p_str} en Auvergne-Rhône-Alpes"
             target = f"{ind}_{patho}"
-            if target not in gdf_merged.columns and target == 'INCI_CNR': target = 'Taux_CNR'
+            if target not in table and target == 'INCI_CNR': target = 'Taux_CNR'
 
-        if target not in gdf_merged.columns: return go.Figure(), "Indicateur non trouvé", "", "", dynamic_title
+        if target not in table: return go.Figure(), "Indicateur non trouvé", "", "", dynamic_title, None
 
-        mask = pd.Series([True] * total_epci, index=gdf_merged.index)
-        exclusion_reasons = pd.Series([""] * total_epci, index=gdf_merged.index)
-        summaries = []
-        
-        if slider_vals:
-            for i, (val, id_dict) in enumerate(zip(slider_vals, slider_ids)):
-                col = id_dict['index']
-                col_mask = gdf_merged[col].between(val[0], val[1])
-                mask &= col_mask
-                
-                # Update exclusion reasons
-                fail_mask = ~col_mask
-                var_name = variable_dict.get(col, col)
-                exclusion_reasons.loc[fail_mask] += f"<br>- {var_name}"
-                
-                # Stats
-                nan_n = gdf_merged[col].isna().sum()
-                bad_n = (~col_mask).sum() - nan_n
-                summaries.append({
-                    'id': col,
-                    'label': variable_dict.get(col, col),
-                    'color': MARKER_COLORS[i % len(MARKER_COLORS)],
-                    'nan': int(nan_n),
-                    'out': int(bad_n),
-                    'val': val # [min, max]
-                })
-
-        df_focus = gdf_merged[mask].copy()
-        fig = go.Figure()
-
-        # Build text for background layer
-        bg_text = click_instruction + "<b>" + gdf_merged['nom_EPCI'] + "</b>" + demo_text_series
-        has_exclusion = exclusion_reasons != ""
-        bg_text_with_reasons = bg_text.copy()
-        bg_text_with_reasons.loc[has_exclusion] += "<br><span style='font-size: 11px; color: #e03131'>Grisé par :</span>" + exclusion_reasons.loc[has_exclusion]
-
-        # 1. Background layer (All territories) - Using ID for robust mapping
-        fig.add_trace(go.Choropleth(
-            geojson="/assets/epci-ara-simplified.geojson",
-            featureidkey="properties.EPCI_CODE",
-            locations=gdf_merged['EPCI_CODE'].astype(str),
-            z=[0] * total_epci,
-            colorscale=[[0, '#f1f3f5'], [1, '#f1f3f5']],
-            showscale=False,
-            marker_line_width=0.5,
-            marker_line_color='rgba(0,0,0,0.1)',
-            hovertemplate="%{text}<extra></extra>",
-            text=bg_text_with_reasons,
-            customdata=gdf_merged['EPCI_CODE'],
-            name="Région"
-        ))
-
-        # 2. Focus layer
-        if not df_focus.empty:
-            focus_text = df_focus['nom_EPCI'] + demo_text_series.loc[df_focus.index]
-            fig.add_trace(go.Choropleth(
-                geojson="/assets/epci-ara-simplified.geojson",
-                featureidkey="properties.EPCI_CODE",
-                locations=df_focus['EPCI_CODE'].astype(str),
-                z=df_focus[target],
-                colorscale="Blues",
-                marker_line_width=0.5,
-                marker_line_color="rgba(255,255,255,0.8)",
-                colorbar=dict(thickness=15, len=0.8, y=0.5, x=0.01, xanchor="left", title=unit_dict.get(target, "")),
-                hovertemplate=click_instruction + "<b>%{text}</b><br><br>" + variable_dict.get(target, target) + " : <b>%{z:.2f}</b><extra></extra>",
-                text=focus_text,
-                customdata=df_focus['EPCI_CODE']
-            ))
+        matrix = filter_matrix(ds, [id_dict['index'] for id_dict in slider_ids])
+        filters = evaluate_filters(matrix, [(id_dict['index'], val[0], val[1]) for val, id_dict in zip(slider_vals, slider_ids)])
+        mask = filters.mask
+        summaries = [{
+            'id': col,
+            'label': variable_dict.get(col, col),
+            'color': MARKER_COLORS[i % len(MARKER_COLORS)],
+            'nan': int(filters.nan_counts[i]),
+            'out': int(filters.out_counts[i]),
+            'val': val # [min, max]
+        } for i, (col, val) in enumerate(zip(filters.columns, slider_vals))]
 
-        # 3. Department outlines
-        dep_locations = (
-            gdf_deps_4326['DEPARTEMEN'].astype(str) 
-            if 'DEPARTEMEN' in gdf_deps_4326.columns 
-            else gdf_deps_4326.index.astype(str)
-        )
-        fig.add_trace(go.Choropleth(
-            geojson="/assets/departments-ara.geojson",
-            featureidkey="properties.DEPARTEMEN",
-            locations=dep_locations,
-            z=[0] * len(gdf_deps_4326),
-            colorscale=[[0, 'rgba(0,0,0,0)'], [1, 'rgba(0,0,0,0)']],
-            showscale=False,
-            marker_line_width=1.5,
-            marker_line_color='rgba(0,0,0,0.6)',
-            hoverinfo='skip'
-        ))
-
-        # 4. Highlight Exclusion (Specific Variable)
-        if highlight_var:
-            slider_indices = [i for i, d in enumerate(slider_ids) if d['index'] == highlight_var]
-            if slider_indices:
-                idx = slider_indices[0]
-                val = slider_vals[idx]
-                excluded_by_var = ~gdf_merged[highlight_var].between(val[0], val[1])
-                df_excl_highlight = gdf_merged[excluded_by_var].copy()
-                
-                if not df_excl_highlight.empty:
-                    fig.add_trace(go.Choropleth(
-                        geojson="/assets/epci-ara-simplified.geojson",
-                        featureidkey="properties.EPCI_CODE",
-                        locations=df_excl_highlight['EPCI_CODE'].astype(str),
-                        z=[1] * len(df_excl_highlight),
-                        colorscale=[[0, '#adb5bd'], [1, '#adb5bd']],
-                        showscale=False,
-                        marker_line_width=1,
-                        marker_line_color='rgba(0,0,0,0.3)',
-                        hovertemplate=click_instruction + "<b>%{text}</b><br>Grisé par : " + variable_dict.get(highlight_var, highlight_var) + "<extra></extra>",
-                        text=df_excl_highlight['nom_EPCI'],
-                        name=f"Exclu par {highlight_var}"
-                    ))
-
-        # 5. Highlight selection
-        if epci_selection:
-            sel = epci_selection if isinstance(epci_selection, list) else [epci_selection]
-            hl = gdf_merged[gdf_merged['EPCI_CODE'].isin(sel)]
-            if not hl.empty:
-                fig.add_trace(go.Choropleth(
-                    geojson="/assets/epci-ara-simplified.geojson",
-                    featureidkey="properties.EPCI_CODE",
-                    locations=hl['EPCI_CODE'].astype(str),
-                    z=[1] * len(hl),
-                    colorscale=[[0, 'rgba(224, 49, 49, 0.05)'], [1, 'rgba(224, 49, 49, 0.05)']],
-                    showscale=False,
-                    marker_line_width=2.5,
-                    marker_line_color='#e03131',
-                    hoverinfo='skip',
-                    name="Sélection"
-                ))
-        
-        # 6. Major Cities
-        cities = [
-            {"name": "Lyon", "lat": 45.7640, "lon": 4.8357},
-            {"name": "Saint-Étienne", "lat": 45.4397, "lon": 4.3873},
-            {"name": "Grenoble", "lat": 45.1885, "lon": 5.7248},
-            {"name": "Clermont-Ferrand", "lat": 45.7772, "lon": 3.0870},
-            {"name": "Valence", "lat": 44.9333, "lon": 4.8917},
-            {"name": "Annecy", "lat": 45.8992, "lon": 6.1293},
-            {"name": "Chambéry", "lat": 45.5646, "lon": 5.9238},
-            {"name": "Bourg-en-Bresse", "lat": 46.2052, "lon": 5.2258},
-            {"name": "Montluçon", "lat": 46.3401, "lon": 2.6020},
-            {"name": "Aurillac", "lat": 44.9264, "lon": 2.4418},
-            {"name": "Le Puy-en-Velay", "lat": 45.0428, "lon": 3.8829},
-            {"name": "Moulins", "lat": 46.5667, "lon": 3.3333},
-            {"name": "Privas", "lat": 44.7333, "lon": 4.6000},
-        ]
-        
-        fig.add_trace(go.Scattergeo(
-            lat=[c["lat"] for c in cities],
-            lon=[c["lon"] for c in cities],
-            text=[c["name"] for c in cities],
-            mode="markers+text",
-            marker=dict(size=4, color="black", opacity=0.7),
-            textposition="top center",
-            textfont=dict(family="Inter, sans-serif", size=9, color="black"),
-            hoverinfo="text",
-            showlegend=False
-        ))
-
-        fig.update_geos(fitbounds="locations", visible=False)
-        fig.update_layout(
-            margin={"r":0, "t":0, "l":0, "b":0},
-            paper_bgcolor='white', 
-            clickmode='event+select',
-            dragmode=False
-        )
+        labels = [s['label'] for s in summaries]
+        base_key = {'version': ds.version, 'exclusions': _map_exclusions_key(filters)}
+        shown = map_base_key if isinstance(map_base_key, dict) and map_base_key.get('version') == ds.version else None
+        # Patches never touch the outlines: the tier the zoom selected stays the one shown
+        base_key['tier'] = shown.get('tier') if shown else _map_geometry_tier(ds)["url"]
+        if MAP_CLIENTSIDE_FILTERS and shown and _triggered_by_sliders_only():
+            # The browser already re-filtered the map (map.filterMap): only the stats are refreshed here
+            fig = no_update
+        elif MAP_PATCH_UPDATES and shown:
+            # The client already holds this dataset's figure: only send the layers the inputs changed
+            exclusions_changed = shown.get('exclusions') != base_key['exclusions']
+            layers = _map_patch_layers(_triggered_components(), exclusions_changed)
+            if layers:
+                fig = _map_patch(_map_trace_updates(ds, target, filters, labels, slider_ids, highlight_var, epci_selection,
+                                                    layers, exclusions_changed))
+            else:
+                fig = no_update
+        else:
+            fig = _build_map_figure(ds, _map_trace_updates(ds, target, filters, labels, slider_ids, highlight_var, epci_selection))
         
         # Stats UI
-        inclus = len(df_focus)
+        inclus = int(mask.sum())
         exclus = total_epci - inclus
         
         # Build a list of how many EPCIs each variable suppresses
@@ -912,14 +1092,88 @@ def update_map(ind, patho, slider_vals, epci_selection, highlight_var, show_hosp
                 desc_paper
             ])
         
-        return fig, content, "", "", dynamic_title
+        return fig, content, "", "", dynamic_title, base_key
         
     except Exception as e:
         import traceback
         err = f"Crash Traceback:\n{traceback.format_exc()}"
         print(err)
         # Return a visible error in the stats area for debugging if needed
-        return go.Figure(), dmc.Alert(f"Erreur de rendu : {str(e)}", color="red"), "Erreur technique", "Erreur", "Carte"
+        return go.Figure(), dmc.Alert(f"Erreur de rendu : {str(e)}", color="red"), "Erreur technique", "Erreur", "Carte", None
+
+# --- Map outline tier (zoom) ---
+@callback(
+    [Output('map-graph', 'figure', allow_duplicate=True),
+     Output('map-base-key', 'data', allow_duplicate=True)],
+    Input('map-graph', 'relayoutData'),
+    [State('dataset-select', 'value'),
+     State('available-datasets-store', 'data'),
+     State('map-base-key', 'data')],
+    prevent_initial_call=True
+)
+def update_map_geometry_tier(relayout_data, dataset_value, available_datasets, map_base_key):
+    """
+    Swaps the outline files when the zoom level calls for another tier (a few bytes via Patch);
+    a zoom that stays within the tier shown (map-base-key) sends nothing, so Plotly does not
+    fetch and redraw the same outlines.
+    """
+    if not relayout_data or 'geo.projection.scale' not in relayout_data:
+        raise dash.exceptions.PreventUpdate
+    tier = _map_geometry_tier(get_dataset(dataset_value, available_datasets), relayout_data['geo.projection.scale'])
+    if isinstance(map_base_key, dict) and map_base_key.get('tier') == tier["url"]:
+        raise dash.exceptions.PreventUpdate
+    patched = Patch()
+    for trace_idx in MAP_EPCI_TRACES:
+        patched['data'][trace_idx]['geojson'] = tier["url"]
+    patched['data'][MAP_TRACE_DEPARTMENTS]['geojson'] = tier["departments_url"]
+    return patched, {**map_base_key, 'tier': tier["url"]} if isinstance(map_base_key, dict) else no_update
+
+# --- Clientside map filtering (optional) ---
+
+if MAP_CLIENTSIDE_FILTERS:
+    @callback(
+        Output('map-filter-payload', 'data'),
+        [Input('dataset-select', 'value'), Input('url', 'pathname')],
+        [State('available-datasets-store', 'data'),
+         State('map-filter-payload', 'data')]
+    )
+    def update_map_filter_payload(dataset_value, pathname, available_datasets, current_payload):
+        if pathname not in ['/exploration', '/carte', '/radar']:
+            raise dash.exceptions.PreventUpdate
+        ds = get_dataset(dataset_value, available_datasets)
+        # Shipped once per dataset: later navigations keep the payload already in the browser
+        if current_payload and current_payload.get('version') == ds.version:
+            return no_update
+        return _map_filter_payload(ds)
+
+    clientside_callback(
+        ClientsideFunction(
+            namespace='map',
+            function_name='filterMap'
+        ),
+        Output('map-graph', 'figure', allow_duplicate=True),
+        Input({'type': 'exploration-slider', 'index': ALL}, 'drag_value'),
+        Input({'type': 'exploration-slider', 'index': ALL}, 'value'),
+        State({'type': 'exploration-slider', 'index': ALL}, 'id'),
+        State('map-filter-payload', 'data'),
+        State('map-graph', 'figure'),
+        State('highlight-variable-select', 'value'),
+        prevent_initial_call=True
+    )
+
+# Quantile panel badge for (higher value is better, STATUS_*)
+QUANTILE_BADGES = {
+    (True, STATUS_ALERT): ("red", "Alerte : Plus bas que 90% des territoires"),
+    (True, STATUS_WATCH): ("orange", "Attention : Dans les 25% les plus bas"),
+    (True, STATUS_STRENGTH): ("teal", "Point fort : Top 10% régional"),
+    (True, STATUS_ASSET): ("cyan", "Atout : Top 25% régional"),
+    (True, STATUS_BALANCED): ("gray", "Équilibré : Moyenne régionale"),
+    (False, STATUS_ALERT): ("red", "Alerte : Plus élevé que 90% des territoires"),
+    (False, STATUS_WATCH): ("orange", "Attention : Dans les 25% les plus élevés"),
+    (False, STATUS_STRENGTH): ("teal", "Point fort : Top 10% régional"),
+    (False, STATUS_ASSET): ("cyan", "Atout : Top 25% régional"),
+    (False, STATUS_BALANCED): ("gray", "Équilibré : Moyenne régionale"),
+}
 
 # --- Radar Callback ---
 @callback(
@@ -934,15 +1188,20 @@ def update_map(ind, patho, slider_vals, epci_selection, highlight_var, show_hosp
      Input('sidebar-filter-offre', 'value'), 
      Input('sidebar-filter-env', 'value'),
      Input('sidebar-epci-radar', 'value'),
-     Input('map-indic-select', 'value'), Input('map-patho-select', 'value')],
-    [State('url', 'pathname')]
+     Input('map-indic-select', 'value'), Input('map-patho-select', 'value'),
+     Input('dataset-select', 'value')],
+    [State('url', 'pathname'),
+     State('available-datasets-store', 'data')]
 )
-def update_radar(social, offre, env, epci_codes, ind, patho, pathname):
+def update_radar(social, offre, env, epci_codes, ind, patho, dataset_value, pathname, available_datasets):
     if pathname not in ['/exploration', '/carte', '/radar']:
         raise dash.exceptions.PreventUpdate
+    ds = get_dataset(dataset_value, available_datasets)
+    table, variable_dict, unit_dict = ds.table, ds.variable_dict, ds.unit_dict
+    sens_dict, category_dict = ds.sens_dict, ds.category_dict
     target = f"{ind}_{patho}"
     # Consistency with map logic for CNR
-    if target not in gdf_merged.columns and target == 'INCI_CNR' and 'Taux_CNR' in gdf_merged.columns: target = 'Taux_CNR'
+    if target not in table and target == 'INCI_CNR' and 'Taux_CNR' in table: target = 'Taux_CNR'
     
     # Always include health indicator as first axis
     selected_vars = [target] + (social or []) + (offre or []) + (env or [])
@@ -955,10 +1214,16 @@ def update_radar(social, offre, env, epci_codes, ind, patho, pathname):
     
     selected_vars = selected_vars_unique
     
+    # Per-column statistics of the selected variables only: min/max/mean/std and percentile ranks
+    # are computed once per column and dataset, then looked up
+    st = stats_table(ds, selected_vars)
+    var_cols = st.cols(selected_vars)
+    epci_rows = st.rows(epci_codes)
+
     names_str = ""
     if epci_codes:
         # Get names from EPCI codes
-        names = gdf_merged[gdf_merged['EPCI_CODE'].isin(epci_codes)]['nom_EPCI'].tolist()
+        names = st.names[np.sort(epci_rows)].tolist()
         names_str = f" des territoires ({', '.join(names)})"
     
     dynamic_title = f"Radar comparatif{names_str} par rapport à la moyenne régionale des variables sélectionnées"
@@ -969,24 +1234,17 @@ def update_radar(social, offre, env, epci_codes, ind, patho, pathname):
     fig = go.Figure()
     
     # Pre-calculate ranges and normalized stats
-    norm_means = []
-    norm_plus_std = []
-    norm_minus_std = []
+    mn, mx = st.minimum[var_cols], st.maximum[var_cols]
+    denom = np.where(mx != mn, mx - mn, 1)
+    means = st.mean[var_cols]
+    norm_m = (means - mn) / denom
+    norm_s = st.std[var_cols] / denom # ratio of std to range
+    norm_means = norm_m.tolist()
+    norm_plus_std = np.fmin(1, norm_m + norm_s).tolist()
+    norm_minus_std = np.fmax(0, norm_m - norm_s).tolist()
+
     labels = []
-    for i, v in enumerate(selected_vars):
-        mn, mx = gdf_merged[v].min(), gdf_merged[v].max()
-        denom = mx - mn if mx != mn else 1
-        
-        m = gdf_merged[v].mean()
-        s = gdf_merged[v].std()
-        
-        norm_m = (m - mn) / denom
-        norm_s = s / denom # ratio of std to range
-        
-        norm_means.append(norm_m)
-        norm_plus_std.append(min(1, norm_m + norm_s))
-        norm_minus_std.append(max(0, norm_m - norm_s))
-        
+    for v in selected_vars:
         unit = unit_dict.get(v, "")
         label = variable_dict.get(v, v)
         base_label = f"{label} ({unit})" if unit else label
@@ -1021,33 +1279,28 @@ def update_radar(social, offre, env, epci_codes, ind, patho, pathname):
         theta=labels + [labels[0]], 
         name="Moyenne Région", 
         line=dict(dash='solid', color='#868e96'),
-        customdata=[gdf_merged[v].mean() for v in selected_vars] + [gdf_merged[selected_vars[0]].mean()],
+        customdata=means.tolist() + [means[0]],
         hovertemplate="Moyenne régionale: %{customdata:.2f}<extra></extra>"
     ))
 
     if epci_codes:
         C = ['#339af0', '#51cf66', '#fcc419', '#ff922b', '#ae3ec9', '#15aabf']
-        for i, code in enumerate(epci_codes):
-            row = gdf_merged[gdf_merged['EPCI_CODE'] == code]
-            if not row.empty:
-                r_vals_norm = []
-                r_vals_raw = []
-                for v in selected_vars:
-                    val = row[v].values[0]
-                    mn, mx = gdf_merged[v].min(), gdf_merged[v].max()
-                    denom = mx - mn if mx != mn else 1
-                    r_vals_norm.append((val - mn) / denom)
-                    r_vals_raw.append(val)
-                
-                fig.add_trace(go.Scatterpolar(
-                    r=r_vals_norm + [r_vals_norm[0]], 
-                    theta=labels + [labels[0]], 
-                    fill=None, 
-                    name=row['nom_EPCI'].values[0], 
-                    line=dict(color=C[i%len(C)], width=2.5),
-                    customdata=r_vals_raw + [r_vals_raw[0]],
-                    hovertemplate="Valeur: %{customdata:.2f}<extra></extra>"
-                ))
+        # All selected territories normalised in one operation: (n_selected, n_vars)
+        raw = st.values[np.ix_(epci_rows, var_cols)]
+        norm = (raw - mn) / denom
+        for i, row_pos in enumerate(epci_rows):
+            r_vals_norm = norm[i].tolist()
+            r_vals_raw = raw[i].tolist()
+            
+            fig.add_trace(go.Scatterpolar(
+                r=r_vals_norm + [r_vals_norm[0]], 
+                theta=labels + [labels[0]], 
+                fill=None, 
+                name=st.names[row_pos], 
+                line=dict(color=C[i%len(C)], width=2.5),
+                customdata=r_vals_raw + [r_vals_raw[0]],
+                hovertemplate="Valeur: %{customdata:.2f}<extra></extra>"
+            ))
     
     fig.update_layout(
         dragmode=False,
@@ -1069,76 +1322,37 @@ def update_radar(social, offre, env, epci_codes, ind, patho, pathname):
     # --- NEW: Quantile & Relative Ranking Analysis ---
     quantile_paper = None
     if epci_codes and selected_vars:
-        # Pre-calculate ranks for all selected variables across the region
-        ranks_df = gdf_merged[selected_vars].rank(pct=True)
+        # Regional classification of the selected territories, precomputed per dataset (int8 STATUS_*)
+        status_matrix = st.status[np.ix_(epci_rows, var_cols)]
         C_radar = ['#339af0', '#51cf66', '#fcc419', '#ff922b', '#ae3ec9', '#15aabf']
+        # Closest profiles on the radar variables, for every selected territory in one search
+        twins_by_code = twin_index(ds, selected_vars).twins(st.codes[epci_rows])
         
         quantile_content = []
-        for i, code in enumerate(epci_codes):
-            row = gdf_merged[gdf_merged['EPCI_CODE'] == code]
-            if row.empty: continue
-            
-            idx = row.index[0]
-            epci_name = row['nom_EPCI'].values[0]
+        for i, row_pos in enumerate(epci_rows):
+            epci_name = st.names[row_pos]
             
             epci_quantiles = []
             suggested_levers = []
-            for v in selected_vars:
-                pct = ranks_df.loc[idx, v] * 100
+            for j, v in enumerate(selected_vars):
                 label_name = variable_dict.get(v, v)
                 
-                sens = sens_dict.get(v, -1)
-                is_vuln = False
+                # sens == 1 => highest is best ; sens == -1 (or 0 fallback) => lowest is best
+                high_is_good = bool(st.high_is_good[var_cols[j]])
+                status = int(status_matrix[i, j])
+                col, phrase = QUANTILE_BADGES[(high_is_good, status)]
+                is_vuln = status < STATUS_BALANCED
                 
-                # sens == 1 => highest is best
-                if sens == 1:
-                    if pct <= 10: 
-                        col = "red"
-                        phrase = f"Alerte : Plus bas que 90% des territoires"
-                        is_vuln = True
-                    elif pct <= 25: 
-                        col = "orange"
-                        phrase = f"Attention : Dans les 25% les plus bas"
-                        is_vuln = True
-                    elif pct >= 90: 
-                        col = "teal"
-                        phrase = f"Point fort : Top 10% régional"
-                    elif pct >= 75: 
-                        col = "cyan"
-                        phrase = f"Atout : Top 25% régional"
-                    else: 
-                        col = "gray"
-                        phrase = f"Équilibré : Moyenne régionale"
-                # sens == -1 (or 0 fallback) => lowest is best
-                else:
-                    if pct >= 90: 
-                        col = "red"
-                        phrase = f"Alerte : Plus élevé que 90% des territoires"
-                        is_vuln = True
-                    elif pct >= 75: 
-                        col = "orange"
-                        phrase = f"Attention : Dans les 25% les plus élevés"
-                        is_vuln = True
-                    elif pct <= 10: 
-                        col = "teal"
-                        phrase = f"Point fort : Top 10% régional"
-                    elif pct <= 25: 
-                        col = "cyan"
-                        phrase = f"Atout : Top 25% régional"
-                    else: 
-                        col = "gray"
-                        phrase = f"Équilibré : Moyenne régionale"
-                        
-                    if is_vuln:
-                        cat = category_dict.get(v, "autre").lower()
-                        if "socio" in cat: cat_str = "Socio-économique"; hash_val = "#socio"
-                        elif "env" in cat: cat_str = "Environnement"; hash_val = "#env"
-                        elif "offre" in cat or "soins" in cat or "santé" in cat or "demog" in cat or "prev" in cat: 
-                            cat_str = "Santé"; hash_val = "#sante"
-                        else: cat_str = "Généraux"; hash_val = ""
-                        
-                        if (cat_str, hash_val) not in suggested_levers:
-                            suggested_levers.append((cat_str, hash_val))
+                if is_vuln and not high_is_good:
+                    cat = category_dict.get(v, "autre").lower()
+                    if "socio" in cat: cat_str = "Socio-économique"; hash_val = "#socio"
+                    elif "env" in cat: cat_str = "Environnement"; hash_val = "#env"
+                    elif "offre" in cat or "soins" in cat or "santé" in cat or "demog" in cat or "prev" in cat: 
+                        cat_str = "Santé"; hash_val = "#sante"
+                    else: cat_str = "Généraux"; hash_val = ""
+                    
+                    if (cat_str, hash_val) not in suggested_levers:
+                        suggested_levers.append((cat_str, hash_val))
                 
                 epci_quantiles.append(dmc.Grid(align="center", mb=8, children=[
                     dmc.GridCol(span=4, children=[dmc.Text(label_name, size="sm", fw=700)]),
@@ -1184,10 +1398,24 @@ def update_radar(social, offre, env, epci_codes, ind, patho, pathname):
             else:
                  lever_elements.append(dmc.Text("Aucune vulnérabilité majeure identifiée nécessitant une action prioritaire urgente.", size="sm", fs="italic", c="gray", mt="sm"))
 
+            twin_elements = []
+            twins = twins_by_code.get(str(st.codes[row_pos]), [])
+            if twins:
+                twin_elements.append(dmc.Text("Territoires jumeaux (profils les plus proches sur ces variables) :", size="sm", fw=600, c="teal"))
+                for rank, t in enumerate(twins, 1):
+                    res = t['resemblance']
+                    twin_elements.append(dmc.Group(justify="space-between", gap="xs", wrap="nowrap", children=[
+                        dmc.Text(f"#{rank}  {t['nom']}", size="sm", fw=700),
+                        dmc.Badge(f"{res:.0f} % de ressemblance", variant="light", size="sm", radius="xs",
+                                  color="teal" if res >= 80 else ("blue" if res >= 65 else "orange"),
+                                  style={"textTransform": "none", "flexShrink": 0})
+                    ]))
+
             quantile_content.append(dmc.Stack(gap=2, children=[
                 dmc.Text(epci_name, size="lg", fw=900, c="#2c3e50", style={"fontSize": "19px", "letterSpacing": "0.5px", "marginTop": "12px", "marginBottom": "2px"}),
                 dmc.Divider(size="md", color="#adb5bd", mb="xs"),
                 dmc.Stack(gap=2, children=epci_quantiles),
+                *([dmc.Paper(p="xs", radius="sm", bg="teal.0", mt="xs", children=dmc.Stack(gap=4, children=twin_elements))] if twin_elements else []),
                 dmc.Paper(p="xs", radius="sm", bg="indigo.0", mt="xs", children=dmc.Stack(gap=0, children=lever_elements))
             ]))
 
@@ -4,11 +4,12 @@ import dash_mantine_components as dmc
 from dash_iconify import DashIconify
 import pandas as pd
 import os
-from ..data import load_data, PROJECT_ROOT
+from ..data import load_metadata, PROJECT_ROOT
 
 # Load data
-from ..data import load_data, PROJECT_ROOT, DATA_DIR_DASH, BASE_DIR
-gdf_merged, variable_dict, category_dict, sens_dict, description_dict, unit_dict, _, source_dict, classement_dict = load_data()
+from ..data import load_metadata, PROJECT_ROOT, DATA_DIR_DASH, BASE_DIR
+from ..datasets import get_dataset
+variable_dict, category_dict, sens_dict, description_dict, unit_dict, _, source_dict, classement_dict = load_metadata()
 
 # Load Action Levers (Leviers d'action)
 LEVIERS_PATH = os.path.join(BASE_DIR, "Leviers d'action.md")
@@ -465,49 +466,9 @@ def get_vars_by_category_dynamic(target_cat, v_dict, c_dict, cl_dict, d_dict, u_
 def update_methodology_tables(dataset_value, available_datasets, pathname):
     if pathname != '/methodologie':
         raise dash.exceptions.PreventUpdate
-    if not dataset_value or dataset_value == 'default':
-        g, v, c, s, d, u, gd, sd, cl = load_data()
-    else:
-        dataset_meta = None
-        for d_item in available_datasets:
-            if d_item['file_path'] == dataset_value:
-                dataset_meta = d_item
-                break
-        
-        if not dataset_meta:
-            g, v, c, s, d, u, gd, sd, cl = load_data()
-        else:
-            scale = dataset_meta.get("scale", "epci")
-            columns_metadata = dataset_meta.get("columns_metadata", {})
-            local_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", dataset_value)
-            try:
-                import pandas as pd
-                df_user = pd.read_csv(local_path)
-                g_base, v_base, c_base, s_base, d_base, u_base, gd_base, sd_base, cl_base = load_data()
-                if "CODE_EPCI" in df_user.columns:
-                    df_user['CODE_EPCI'] = df_user['CODE_EPCI'].astype(str).str.replace('.0', '', regex=False).str.strip()
-                    cols_to_add = [col for col in df_user.columns if col == 'CODE_EPCI' or col not in g_base.columns]
-                    df_user_filtered = df_user[cols_to_add]
-                    g_new = g_base.merge(df_user_filtered, left_on='EPCI_CODE', right_on='CODE_EPCI', how='left')
-                    if 'CODE_EPCI_y' in g_new.columns: g_new = g_new.drop(columns=['CODE_EPCI_y'])
-                    if 'CODE_EPCI_x' in g_new.columns: g_new = g_new.rename(columns={'CODE_EPCI_x': 'CODE_EPCI'})
-                    new_vars = [col for col in df_user.columns if col not in ['CODE_EPCI', 'EPCI_CODE', 'CODE_COMMUNE']]
-                    for var in new_vars:
-                        meta = columns_metadata.get(var, {})
-                        custom_label = meta.get("label", str(var).replace('_', ' ').strip().capitalize())
-                        v_base[var] = f"⭐ {custom_label}"
-                        c_base[var] = meta.get("category", "environnement")
-                        s_base[var] = 0
-                        d_base[var] = f"Indicateur importé : {custom_label}"
-                        u_base[var] = "valeur"
-                        sd_base[var] = "Import local"
-                        cl_base[var] = "99"
-                    g, v, c, s, d, u, gd, sd, cl = g_new, v_base, c_base, s_base, d_base, u_base, gd_base, sd_base, cl_base
-                else:
-                    g, v, c, s, d, u, gd, sd, cl = g_base, v_base, c_base, s_base, d_base, u_base, gd_base, sd_base, cl_base
-            except Exception:
-                g, v, c, s, d, u, gd, sd, cl = load_data()
-                    
+    ds = get_dataset(dataset_value, available_datasets)
+    g, v, c, s, d, u, sd, cl = ds.table, ds.variable_dict, ds.category_dict, ds.sens_dict, ds.description_dict, ds.unit_dict, ds.source_dict, ds.classement_dict
+
     socio_list = get_vars_by_category_dynamic('Socioéco', v, c, cl, d, u, sd, s, g)
     offre_list = get_vars_by_category_dynamic('Offre de soins', v, c, cl, d, u, sd, s, g)
     env_list = get_vars_by_category_dynamic('Environnement', v, c, cl, d, u, sd, s, g)
@@ -8,6 +8,7 @@ import pandas as pd
 import time
 import json
 import os
+from src.data import UPLOADS_DIR
 from src.services.databricks_service import trigger_databricks_run
 
 # Déclarer l'interface utilisateur de la page d'import
@@ -459,9 +460,8 @@ def process_local_upload(n_clicks, dataset_name, file_contents, filename, col_la
     local_id = f"local_{uuid.uuid4().hex}"
     local_filename = f"{local_id}.csv"
     
-    # Résoudre le dossier local
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    local_dir = os.path.join(base_dir, "data", "local")
+    # Résoudre le dossier local (relu par src.datasets via le même UPLOADS_DIR)
+    local_dir = os.path.join(UPLOADS_DIR, "local")
     os.makedirs(local_dir, exist_ok=True)
     
     local_path = os.path.join(local_dir, local_filename)
@@ -0,0 +1,121 @@
+"""
+DuckDB query layer over the snapshot attribute tables.
+
+Each worker process holds one DuckDB connection (`connection()`), opened on first use and only
+used to read; every thread queries it through its own cursor (`cursor()`), so concurrent callbacks
+of a threaded server run their queries side by side. Queries run on the Arrow table behind the snapshot's ColumnTable (`table.arrow()`:
+the memory-mapped cache file data/cache/snapshot-v*.arrow written by `src.data`, plus the columns
+of an uploaded dataset), which DuckDB scans in place. Each query registers only the columns it
+names (`_scan`): binding the full table would cost more than the query itself. The join of an
+uploaded dataset onto the base territories runs inside DuckDB instead of on copies of the pandas
+frame. The map's range filters and slider bounds stay on the in-memory filter matrix
+(`src.filters`), which answers them in well under a millisecond; percentile ranks are computed
+once per snapshot by `src.analytics` and department aggregates by the ETL.
+
+Every scan carries `file_row_number`, the row position in `ds.table`: joined columns are
+returned in that order so they stay aligned with the geometry store. DuckDB is optional at
+runtime: without it (`available()` is False) uploaded datasets are joined with pandas.
+"""
+
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ROW = "file_row_number"
+
+_connection = None
+_connection_pid = None
+# Only guards opening the process connection: queries run on per-thread cursors
+_lock = threading.Lock()
+_local = threading.local()
+_names = itertools.count()
+_available = None
+
+# SENIAURA_DUCKDB=0 keeps every query on the in-memory numpy / pandas paths
+DUCKDB_ENABLED = os.environ.get("SENIAURA_DUCKDB", "1") != "0"
+
+
+def available():
+    """True when DuckDB is enabled and the duckdb package can be imported."""
+    global _available
+    if _available is None:
+        try:
+            import duckdb  # noqa: F401
+            _available = DUCKDB_ENABLED
+        except ImportError:
+            _available = False
+    return _available
+
+
+def connection():
+    """The process-wide connection, re-opened in a forked worker (connections cannot cross a fork)."""
+    global _connection, _connection_pid
+    with _lock:
+        if _connection is None or _connection_pid != os.getpid():
+            import duckdb
+            _connection = duckdb.connect(database=":memory:")
+            _connection_pid = os.getpid()
+        return _connection
+
+
+def cursor():
+    """This thread's cursor on the process connection (DuckDB runs the cursors' queries concurrently)."""
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.cursor, _local.pid = connection().cursor(), os.getpid()
+    return _local.cursor
+
+
+def _ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _arrow(ds):
+    """The snapshot's Arrow table plus the row-number column (zero-copy: only that column is allocated)."""
+    def build():
+        arrow = ds.table.arrow()
+        return arrow.append_column(ROW, pa.array(np.arange(arrow.num_rows, dtype=np.int64)))
+    return ds.memo('query.arrow', build)
+
+
+@contextmanager
+def _scan(ds, columns):
+    """
+    Yields (cursor, name) of `columns` (plus ROW) of the snapshot, registered on this thread's
+    cursor for one query.
+    """
+    arrow = _arrow(ds)
+    name = f"scan_{next(_names)}"
+    cur = cursor()
+    cur.register(name, arrow.select(list(dict.fromkeys(columns)) + [ROW]))
+    try:
+        yield cur, _ident(name)
+    finally:
+        cur.unregister(name)
+
+
+def join_user_table(ds, frame, key='CODE_EPCI'):
+    """
+    Columns of `frame` (one row per `key` value, matched on EPCI_CODE) aligned with the rows of
+    `ds.table`: a left join computed by DuckDB, which reads only EPCI_CODE from the base table.
+    """
+    extra = [c for c in frame.columns if c != key]
+    if not extra:
+        return pd.DataFrame(index=ds.table.index)
+    name = f"user_{next(_names)}"
+    select = ", ".join(f"u.{_ident(c)}" for c in extra)
+    with _scan(ds, ['EPCI_CODE']) as (cur, source):
+        cur.register(name, frame)
+        try:
+            joined = cur.execute(
+                f"SELECT {select} FROM {source} b LEFT JOIN {_ident(name)} u "
+                f"ON CAST(b.EPCI_CODE AS VARCHAR) = CAST(u.{_ident(key)} AS VARCHAR) ORDER BY b.{ROW}").df()
+        finally:
+            cur.unregister(name)
+    joined.columns = extra
+    joined.index = ds.table.index
+    return joined
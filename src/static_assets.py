@@ -0,0 +1,150 @@
+"""
+Content-hashed static files (map outlines, vendored stylesheets and fonts).
+
+The ETL stage `assets` writes every file once under `data/artifacts/static/` as
+`<name>.<hash>.<ext>`, with gzip and brotli variants next to it, and records them in
+`static_manifest.json` keyed by the URL they replace (`files`), plus the fonts and images the
+vendored stylesheets point to (`resources`). The app rewrites those URLs with
+`static_url` and serves the files from `/static-assets/` with an ETag and a one-year
+`Cache-Control: immutable`: a new build changes the name, never the content behind a name.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import urljoin, urlparse
+
+from .artifacts import artifact_path, read_json_artifact
+
+STATIC_DIR = artifact_path("static")
+STATIC_MANIFEST = "static_manifest.json"
+STATIC_URL_PREFIX = "/static-assets/"
+STATIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Stylesheets historically loaded from CDNs; the ETL vendors them with the files they reference
+CDN_STYLESHEETS = [
+    'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap',
+    'https://use.fontawesome.com/releases/v5.15.4/css/all.css',
+    'https://unpkg.com/@mantine/core@7/styles.css',
+    'https://unpkg.com/@mantine/dates@7/styles.css',
+    'https://unpkg.com/@mantine/charts@7/styles.css',
+]
+
+# url(...) tokens of a stylesheet: (quote, reference)
+CSS_URL = re.compile(r"url\((['\"]?)([^'\")]+)\1\)")
+
+# Pre-compressed variants, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+mimetypes.add_type("application/json", ".geojson")
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("font/woff", ".woff")
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def write_static_file(name, data):
+    """
+    Writes `data` as `<stem>.<hash><ext>` plus its .gz / .br variants (build side only).
+    Brotli is optional: without the `brotli` package only gzip is produced.
+    """
+    digest = content_hash(data)
+    stem, ext = os.path.splitext(os.path.basename(name))
+    filename = f"{stem}.{digest}{ext}"
+    os.makedirs(STATIC_DIR, exist_ok=True)
+
+    variants = {"identity": data, "gzip": gzip.compress(data, 9)}
+    try:
+        import brotli
+        variants["br"] = brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+
+    suffixes = {"identity": "", **dict(ENCODINGS)}
+    for encoding, payload in variants.items():
+        path = os.path.join(STATIC_DIR, filename + suffixes[encoding])
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    return {
+        "file": filename,
+        "etag": digest,
+        "bytes": len(data),
+        "encodings": {encoding: len(payload) for encoding, payload in variants.items() if encoding != "identity"},
+    }
+
+
+def vendor_stylesheet(text, base_url, fetch):
+    """
+    (`text` with each url(...) pointing to a local content-hashed copy, {absolute URL: entry} of
+    the copies). `fetch(absolute_url)` returns the bytes of a referenced file (build side only).
+    Each token is rewritten on its own, so a reference that is a prefix of another one
+    (`fa-solid-900.woff` / `fa-solid-900.woff2`) cannot corrupt it.
+    """
+    resources = {}
+
+    def rewrite(match):
+        quote, ref = match.groups()
+        if ref.startswith("data:"):
+            return match.group(0)
+        absolute = urljoin(base_url, ref.split("#")[0].split("?")[0])
+        if absolute not in resources:
+            resources[absolute] = write_static_file(os.path.basename(urlparse(absolute).path), fetch(absolute))
+        fragment = "#" + ref.split("#", 1)[1] if "#" in ref else ""
+        return f"url({quote}{STATIC_URL_PREFIX}{resources[absolute]['file']}{fragment}{quote})"
+
+    return CSS_URL.sub(rewrite, text), resources
+
+
+_manifest = None
+_by_file = None
+
+
+def load_static_manifest():
+    """{original URL: entry} of the last `assets` build ({} if it has not run). Read once per process."""
+    global _manifest
+    if _manifest is None:
+        _manifest = (read_json_artifact(STATIC_MANIFEST) or {}).get("files", {})
+    return _manifest
+
+
+def _static_files():
+    """{hashed file name: entry} of every built file, stylesheet resources included."""
+    global _by_file
+    if _by_file is None:
+        resources = (read_json_artifact(STATIC_MANIFEST) or {}).get("resources", {})
+        _by_file = {e["file"]: e for e in [*load_static_manifest().values(), *resources.values()]}
+    return _by_file
+
+
+def static_url(url):
+    """Content-hashed URL replacing `url`, or `url` itself when it was not built."""
+    entry = load_static_manifest().get(url)
+    return STATIC_URL_PREFIX + entry["file"] if entry else url
+
+
+def stylesheet_urls():
+    return [static_url(url) for url in CDN_STYLESHEETS]
+
+
+def resolve_static_file(filename, accept_encoding):
+    """
+    (path, content encoding or None, mimetype, etag) of a built file for a request accepting
+    `accept_encoding`, or None if `filename` is not part of the manifest.
+    """
+    entry = _static_files().get(filename)
+    if entry is None:
+        return None
+    accepted = {token.split(";")[0].strip() for token in (accept_encoding or "").split(",")}
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    for encoding, suffix in ENCODINGS:
+        path = os.path.join(STATIC_DIR, filename + suffix)
+        if encoding in accepted and encoding in entry["encodings"] and os.path.exists(path):
+            return path, encoding, mimetype, entry["etag"]
+    return os.path.join(STATIC_DIR, filename), None, mimetype, entry["etag"]
@@ -0,0 +1,141 @@
+"""
+Build-time territory artifacts: department outlines and per-territory centroids, bounding boxes
+and areas.
+
+The ETL stage `territoires` dissolves the EPCI outlines into departments and measures every
+territory once (data/artifacts/departments.parquet, epci_metrics.parquet). The manifest records
+the hash of the EPCI GeoJSON they were built from: at runtime they are only used for that exact
+file, otherwise the app falls back to computing them in-process (historical behaviour).
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from .artifacts import artifact_path, read_json_artifact, write_json_artifact
+
+TERRITORIES_ARTIFACT = "territories.json"
+TERRITORIES_FORMAT = 1
+DEPARTMENTS_ARTIFACT = "departments.parquet"
+EPCI_METRICS_ARTIFACT = "epci_metrics.parquet"
+TERRITORIES_PATH = artifact_path(TERRITORIES_ARTIFACT)
+
+# Areas are measured in Lambert-93 (metres), everything else stays in EPSG:4326
+AREA_CRS = "EPSG:2154"
+METRIC_COLUMNS = ['centroid_lon', 'centroid_lat', 'minx', 'miny', 'maxx', 'maxy', 'area_km2']
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def territory_metrics(gdf):
+    """Centroid (lon/lat), bounding box (degrees) and area (km²) of each row of an EPSG:4326 GeoDataFrame."""
+    geometries = np.asarray(gdf.geometry.array, dtype=object)
+    # Centroids are taken in the metric CRS, then brought back to degrees
+    projected = gdf.geometry.to_crs(AREA_CRS)
+    centroids = gpd.GeoSeries(projected.centroid, crs=AREA_CRS).to_crs("EPSG:4326")
+    bounds = shapely.bounds(geometries)
+    return pd.DataFrame({
+        'centroid_lon': centroids.x.to_numpy(),
+        'centroid_lat': centroids.y.to_numpy(),
+        'minx': bounds[:, 0],
+        'miny': bounds[:, 1],
+        'maxx': bounds[:, 2],
+        'maxy': bounds[:, 3],
+        'area_km2': projected.area.to_numpy() / 1e6,
+    }, index=gdf.index)
+
+
+def _to_4326(gdf):
+    return gdf.set_crs("EPSG:4326") if gdf.crs is None else gdf.to_crs("EPSG:4326")
+
+
+def department_layer(gdf_epci):
+    """Department outlines (index DEPARTEMEN, EPSG:4326) of the EPCI outlines, with their metrics."""
+    gdf_epci = _to_4326(gdf_epci)
+    deps = gdf_epci[['DEPARTEMEN', gdf_epci.geometry.name]].dissolve(by='DEPARTEMEN')
+    return deps.join(territory_metrics(deps))
+
+
+def _write_parquet(frame, name):
+    path = artifact_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    frame.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_territory_artifacts(gdf_epci, source_hash):
+    """Writes the department layer, the EPCI metrics and their manifest (build side only)."""
+    gdf_epci = _to_4326(gdf_epci)
+    deps = department_layer(gdf_epci)
+
+    metrics = territory_metrics(gdf_epci)
+    metrics.insert(0, 'EPCI_CODE', gdf_epci['EPCI_CODE'].astype(str).to_numpy())
+    metrics.insert(1, 'DEPARTEMEN', gdf_epci['DEPARTEMEN'].to_numpy())
+
+    _write_parquet(deps, DEPARTMENTS_ARTIFACT)
+    _write_parquet(metrics.reset_index(drop=True), EPCI_METRICS_ARTIFACT)
+    # Written last: its presence means both tables are complete
+    write_json_artifact(TERRITORIES_ARTIFACT, {
+        "format": TERRITORIES_FORMAT,
+        "source_hash": source_hash,
+        "departments": len(deps),
+        "epci": len(metrics),
+    })
+    return deps, metrics
+
+
+def _manifest_matches(source_hash):
+    manifest = read_json_artifact(TERRITORIES_ARTIFACT)
+    return bool(manifest) and manifest.get("format") == TERRITORIES_FORMAT and manifest.get("source_hash") == source_hash
+
+
+def load_departments(gdf_epci, source_hash):
+    """Department outlines built by the ETL for this GeoJSON, dissolved in-process otherwise."""
+    if _manifest_matches(source_hash):
+        try:
+            return gpd.read_parquet(artifact_path(DEPARTMENTS_ARTIFACT))
+        except Exception as e:
+            print(f"Artefact illisible ({DEPARTMENTS_ARTIFACT}) : {e}")
+    else:
+        print("Contours départementaux absents ou périmés (lancer `pipeline.py --stages territoires`) : "
+              "calcul en mémoire.")
+    return department_layer(gdf_epci)
+
+
+def load_epci_metrics(geometry, source_hash):
+    """
+    EPCI metrics aligned with the rows of `geometry` (a GeometryStore): the ETL table when it
+    matches the GeoJSON, computed from the store otherwise.
+    """
+    metrics = None
+    if _manifest_matches(source_hash):
+        try:
+            metrics = pd.read_parquet(artifact_path(EPCI_METRICS_ARTIFACT)).drop_duplicates('EPCI_CODE')
+        except Exception as e:
+            print(f"Artefact illisible ({EPCI_METRICS_ARTIFACT}) : {e}")
+    if metrics is None:
+        gdf = gpd.GeoDataFrame({'EPCI_CODE': geometry.codes}, geometry=gpd.GeoSeries(geometry.geometries), crs="EPSG:4326")
+        metrics = territory_metrics(gdf)
+        metrics.insert(0, 'EPCI_CODE', geometry.codes)
+    table = metrics.set_index('EPCI_CODE').reindex(pd.Index(geometry.codes, name='EPCI_CODE'))[METRIC_COLUMNS]
+    return table.reset_index()
+
+
+def epci_metrics(ds):
+    """EPCI metrics of a snapshot (row-aligned with `ds.table`), loaded once per snapshot."""
+    def build():
+        from .data import geometry_source_path
+        return load_epci_metrics(ds.geometry, file_hash(geometry_source_path()))
+    return ds.memo('territories.epci_metrics', build)
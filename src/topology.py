@@ -0,0 +1,319 @@
+"""
+Quantized shared-arc topology (TopoJSON) for the map outlines.
+
+The ETL encodes the EPCI polygons once: coordinates are snapped to an integer grid, every border
+shared by two territories is stored as a single arc, and arcs are delta-encoded. The department
+layer is derived from the same arcs (`merge_object`), so EPCI and department borders are exactly
+aligned. The Flask route `/geometry/<tier>/<layer>.geojson` serves the layers decoded back to
+GeoJSON (`geojson_layer`), built once per process and kept gzip-compressed.
+"""
+
+import gzip
+import json
+import os
+import threading
+
+from .artifacts import artifact_path
+
+TOPOLOGY_QUANTIZATION = 100_000
+TOPOLOGY_ARTIFACT = "epci-ara-{tier}.topo.json"
+TOPOLOGY_LAYERS = ("epci", "departements")
+# Decimals of the decoded coordinates (the grid step is ~1e-5 degree for the region)
+GEOJSON_DECIMALS = 5
+
+
+# --- Encoding (ETL side) ---
+
+def shapely_rings(geometry):
+    """[[exterior, hole, ...], ...] coordinate lists of a (Multi)Polygon; [] for empty geometries."""
+    if geometry is None or geometry.is_empty:
+        return []
+    parts = geometry.geoms if geometry.geom_type == "MultiPolygon" else [geometry]
+    return [[list(p.exterior.coords)] + [list(r.coords) for r in p.interiors] for p in parts]
+
+
+def _quantize_ring(ring, x0, y0, kx, ky, exterior):
+    """
+    Closed ring of integer grid points, without consecutive duplicates (None if degenerate).
+    Exteriors are wound clockwise and holes counter-clockwise (d3 / Plotly convention), so a
+    border shared by two territories is always walked in opposite directions.
+    """
+    out = []
+    for x, y in ring:
+        p = (int(round((x - x0) / kx)), int(round((y - y0) / ky)))
+        if not out or out[-1] != p:
+            out.append(p)
+    if out[0] != out[-1]:
+        out.append(out[0])
+    if len(out) < 4:
+        return None
+    if (_signed_area(out) > 0) == exterior:
+        out.reverse()
+    return out
+
+
+def _junctions(rings):
+    """Points where the neighbourhood changes: a shared border starts or ends there."""
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring) - 1
+        for i in range(n):
+            a, b = ring[i - 1], ring[i + 1]
+            pair = (a, b) if a <= b else (b, a)
+            seen = neighbours.setdefault(ring[i], pair)
+            if seen != pair:
+                junctions.add(ring[i])
+    return junctions
+
+
+class _ArcIndex:
+    """Deduplicates arcs: a border already stored in the other direction is referenced as ~index."""
+
+    def __init__(self):
+        self.arcs = []
+        self._index = {}
+
+    def add(self, points):
+        key = tuple(points)
+        if key in self._index:
+            return self._index[key]
+        reverse = key[::-1]
+        if reverse in self._index:
+            return ~self._index[reverse]
+        self._index[key] = len(self.arcs)
+        self.arcs.append(points)
+        return len(self.arcs) - 1
+
+    def add_closed(self, ring):
+        """Ring without junction: rotated to a canonical start so the same ring is found again."""
+        body = ring[:-1]
+        start = body.index(min(body))
+        rotated = body[start:] + body[:start]
+        return self.add(rotated + [rotated[0]])
+
+
+def _cut_ring(ring, junctions, index):
+    """Arc references of a ring, cut at its junction points."""
+    body = ring[:-1]
+    cuts = [i for i, p in enumerate(body) if p in junctions]
+    if not cuts:
+        return [index.add_closed(ring)]
+    rotated = body[cuts[0]:] + body[:cuts[0]]
+    rotated.append(rotated[0])
+    cuts = [i - cuts[0] for i in cuts] + [len(rotated) - 1]
+    return [index.add(rotated[a:b + 1]) for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def _delta_encode(arc):
+    out = [list(arc[0])]
+    for (x0, y0), (x1, y1) in zip(arc[:-1], arc[1:]):
+        out.append([x1 - x0, y1 - y0])
+    return out
+
+
+def encode_topology(name, features, quantization=TOPOLOGY_QUANTIZATION):
+    """
+    Topology of one layer. `features` is [(properties, [[exterior, hole, ...], ...]), ...]
+    (see `shapely_rings`); rings are coordinate lists in degrees.
+    """
+    xs = [x for _, polygons in features for rings in polygons for ring in rings for x, _ in ring]
+    ys = [y for _, polygons in features for rings in polygons for ring in rings for _, y in ring]
+    x0, y0 = min(xs), min(ys)
+    kx = (max(xs) - x0) / (quantization - 1) or 1.0
+    ky = (max(ys) - y0) / (quantization - 1) or 1.0
+
+    quantized = []
+    for properties, polygons in features:
+        parts = []
+        for rings in polygons:
+            q = [_quantize_ring(r, x0, y0, kx, ky, exterior=(i == 0)) for i, r in enumerate(rings)]
+            # A collapsed exterior drops the part; collapsed holes are dropped alone
+            if q and q[0] is not None:
+                parts.append([r for r in q if r is not None])
+        quantized.append((properties, parts))
+
+    junctions = _junctions([ring for _, parts in quantized for rings in parts for ring in rings])
+    index = _ArcIndex()
+    geometries = []
+    for properties, parts in quantized:
+        arcs = [[_cut_ring(ring, junctions, index) for ring in rings] for rings in parts]
+        if not arcs:
+            geometries.append({"type": None, "properties": properties})
+        elif len(arcs) == 1:
+            geometries.append({"type": "Polygon", "arcs": arcs[0], "properties": properties})
+        else:
+            geometries.append({"type": "MultiPolygon", "arcs": arcs, "properties": properties})
+
+    return {
+        "type": "Topology",
+        "transform": {"scale": [kx, ky], "translate": [x0, y0]},
+        "arcs": [_delta_encode(arc) for arc in index.arcs],
+        "objects": {name: {"type": "GeometryCollection", "geometries": geometries}},
+    }
+
+
+# --- Shared helpers on encoded topologies ---
+
+def _absolute_arcs(topology):
+    """Arcs as integer grid points (delta decoding only)."""
+    arcs = []
+    for arc in topology["arcs"]:
+        x = y = 0
+        points = []
+        for dx, dy in arc:
+            x += dx
+            y += dy
+            points.append((x, y))
+        arcs.append(points)
+    return arcs
+
+
+def _ring_points(ring_arcs, arcs):
+    points = []
+    for ref in ring_arcs:
+        arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+        points.extend(arc if not points else arc[1:])
+    return points
+
+
+def _polygons_of(geometry):
+    if geometry.get("type") == "Polygon":
+        return [geometry["arcs"]]
+    if geometry.get("type") == "MultiPolygon":
+        return geometry["arcs"]
+    return []
+
+
+def _signed_area(points):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points[:-1], points[1:])) / 2
+
+
+def _contains(ring, point):
+    """Even-odd test of `point` against a closed ring of grid points."""
+    x, y = point
+    inside = False
+    for (x0, y0), (x1, y1) in zip(ring[:-1], ring[1:]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+def merge_object(topology, source, target, key):
+    """
+    Adds object `target` to `topology`: the geometries of `source` grouped by property `key`.
+    Arcs used once inside a group are its outline; they are stitched back into rings, so the
+    merged outlines reuse the source arcs exactly.
+    """
+    arcs = _absolute_arcs(topology)
+
+    def endpoints(ref):
+        arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+        return arc[0], arc[-1]
+
+    groups = {}
+    for geometry in topology["objects"][source]["geometries"]:
+        value = (geometry.get("properties") or {}).get(key)
+        if value is None:
+            continue
+        groups.setdefault(value, []).extend(
+            ref for polygon in _polygons_of(geometry) for ring in polygon for ref in ring)
+
+    geometries = []
+    for value, refs in groups.items():
+        counts = {}
+        for ref in refs:
+            counts[ref if ref >= 0 else ~ref] = counts.get(ref if ref >= 0 else ~ref, 0) + 1
+        outline = [ref for ref in refs if counts[ref if ref >= 0 else ~ref] == 1]
+
+        by_start = {}
+        for ref in outline:
+            by_start.setdefault(endpoints(ref)[0], []).append(ref)
+        rings = []
+        used = set()
+        for first in outline:
+            if first in used:
+                continue
+            ring = [first]
+            used.add(first)
+            start, end = endpoints(first)
+            while end != start:
+                nxt = next((r for r in by_start.get(end, []) if r not in used), None)
+                if nxt is None:
+                    break
+                ring.append(nxt)
+                used.add(nxt)
+                end = endpoints(nxt)[1]
+            if end == start:
+                rings.append(ring)
+
+        # Stitched rings keep the source winding: clockwise exteriors, holes go to the exterior containing them
+        points = [_ring_points(ring, arcs) for ring in rings]
+        areas = [_signed_area(p) for p in points]
+        if not rings:
+            geometries.append({"type": None, "properties": {key: value}})
+            continue
+        exteriors = [i for i, a in enumerate(areas) if a < 0]
+        polygons = {i: [rings[i]] for i in exteriors}
+        for i, a in enumerate(areas):
+            if a >= 0:
+                owner = next((e for e in exteriors if _contains(points[e], points[i][0])), None)
+                if owner is not None:
+                    polygons[owner].append(rings[i])
+        polygons = [polygons[i] for i in exteriors]
+        if len(polygons) == 1:
+            geometries.append({"type": "Polygon", "arcs": polygons[0], "properties": {key: value}})
+        else:
+            geometries.append({"type": "MultiPolygon", "arcs": polygons, "properties": {key: value}})
+
+    topology["objects"][target] = {"type": "GeometryCollection", "geometries": geometries}
+    return topology
+
+
+# --- Decoding (app side) ---
+
+def topology_to_geojson(topology, name, decimals=GEOJSON_DECIMALS):
+    """FeatureCollection of object `name`, with coordinates back in degrees."""
+    (kx, ky), (x0, y0) = topology["transform"]["scale"], topology["transform"]["translate"]
+    arcs = [[[round(x * kx + x0, decimals), round(y * ky + y0, decimals)] for x, y in arc]
+            for arc in _absolute_arcs(topology)]
+    features = []
+    for geometry in topology["objects"][name]["geometries"]:
+        polygons = [[_ring_points(ring, arcs) for ring in polygon] for polygon in _polygons_of(geometry)]
+        if not polygons:
+            shape = None
+        elif len(polygons) == 1:
+            shape = {"type": "Polygon", "coordinates": polygons[0]}
+        else:
+            shape = {"type": "MultiPolygon", "coordinates": polygons}
+        features.append({"type": "Feature", "properties": geometry.get("properties") or {}, "geometry": shape})
+    return {"type": "FeatureCollection", "features": features}
+
+
+_decoded = {}
+_decoded_lock = threading.Lock()
+
+
+def geojson_layer(tier, layer):
+    """
+    (raw, gzip) bytes of a decoded layer of the `tier` topology, or None if it was not built.
+    Decoded once per process and topology file version.
+    """
+    if layer not in TOPOLOGY_LAYERS:
+        return None
+    path = artifact_path(TOPOLOGY_ARTIFACT.format(tier=tier))
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    key = (tier, layer)
+    with _decoded_lock:
+        cached = _decoded.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            topology = json.load(f)
+        raw = json.dumps(topology_to_geojson(topology, layer), separators=(",", ":")).encode("utf-8")
+        payload = (raw, gzip.compress(raw, 6))
+        _decoded[key] = (mtime, payload)
+        return payload
@@ -0,0 +1,293 @@
+"""
+Nearest-neighbour search for "territorial twins" (PDF report and exploration radar panel).
+
+The active variables are standardised once per variable set (`build_twin_index`: missing values
+replaced by the column median, then z-scores) and the resulting (territories × variables) matrix
+is kept with its squared row norms (`twin_index(ds, variables)`, a small LRU per snapshot).
+`TwinIndex.nearest` then answers any number of target territories at once: one matrix product
+gives the squared Euclidean distances of every target to every territory, `argpartition` keeps the
+closest candidates per target and only those distances are recomputed exactly for the final ordering.
+
+For the default variable sets (`SIMILARITY_THEMES`: the `Cluster_Global` variables and each
+thematic profile of the exploration page), the ETL stage `similarite` precomputes the
+SIMILARITY_TOP_K nearest neighbours of every territory (data/artifacts/similarity-<theme>.arrow,
+int32 rows and float32 distances, memory-mapped at runtime). An index of such a set answers from
+those lists with a single row read, as long as the manifest's column fingerprints match the
+dataset's columns. The stage only recomputes the themes whose columns changed since its last run.
+"""
+
+import hashlib
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .artifacts import artifact_path, read_json_artifact, write_json_artifact
+from .clustering import GLOBAL_CLUSTER_VARS, THEME_VARIABLES
+
+# Department label columns looked up for the twin cards, in order of preference
+DEPT_COLUMNS = ('nom_dep', 'CODE_DEPT', 'dept_name', 'nom_dept')
+TWIN_COUNT = 3
+
+# Indexes kept per snapshot (one per variable set, most recently used last)
+TWIN_CACHE_SIZE = int(os.environ.get("TWIN_CACHE_SIZE", "32"))
+
+# Precomputed neighbour lists (ETL stage `similarite`)
+SIMILARITY_ARTIFACT = "similarity.json"
+SIMILARITY_FILE = "similarity-{theme}.arrow"
+SIMILARITY_FORMAT = 1
+SIMILARITY_TOP_K = 32
+SIMILARITY_THEMES = {'global': GLOBAL_CLUSTER_VARS, **THEME_VARIABLES}
+
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class TwinIndex:
+    """Standardised variables of one dataset: `z[i]` is the profile of territory `codes[i]`."""
+    variables: tuple
+    codes: np.ndarray     # (n,) str
+    names: np.ndarray     # (n,) object
+    depts: np.ndarray     # (n,) object, '—' without department column
+    z: np.ndarray         # (n, k) float64 z-scores
+    sq_norms: np.ndarray  # (n,) squared norms of the rows of z
+    row_of: dict          # EPCI code (str) -> first row
+    # Precomputed nearest neighbours of every row (`attach_neighbours`), nearest first
+    neighbours: Optional[np.ndarray] = None           # (n, K) int32 rows, -1 when missing
+    neighbour_distances: Optional[np.ndarray] = None  # (n, K) float32
+
+    def nearest(self, epci_codes, k=TWIN_COUNT):
+        """
+        (rows, positions, distances) for the known codes of `epci_codes`: `rows` (t,) are their
+        rows, `positions` / `distances` (t, k) their k closest other territories, nearest first
+        (ties in table order). Missing neighbours (fewer than k other territories) have position -1
+        and an infinite distance.
+        """
+        rows = np.fromiter((self.row_of[str(c)] for c in epci_codes if str(c) in self.row_of), dtype=np.intp)
+        return (rows,) + self._nearest_rows(rows, k)
+
+    def _nearest_rows(self, rows, k):
+        n = len(self.codes)
+        k = max(int(k), 0)
+        if len(rows) == 0 or k == 0:
+            return np.empty((len(rows), 0), dtype=np.intp), np.empty((len(rows), 0))
+        if self.neighbours is not None and k <= self.neighbours.shape[1]:
+            return self.neighbours[rows, :k].astype(np.intp), self.neighbour_distances[rows, :k].astype(np.float64)
+
+        targets = self.z[rows]
+        # ‖a − b‖² = ‖a‖² + ‖b‖² − 2 a·b: one BLAS product for every target
+        sq = self.sq_norms[rows, None] + self.sq_norms[None, :] - 2.0 * (targets @ self.z.T)
+        # A territory is never its own twin (nor are the rows sharing its code)
+        sq[self.codes[rows][:, None] == self.codes[None, :]] = np.inf
+
+        m = min(k, n)
+        # Extra candidates so that ties at the k-th distance still resolve in table order
+        c = min(n, 2 * m + 8)
+        candidates = np.argpartition(sq, c - 1, axis=1)[:, :c] if c < n else np.broadcast_to(np.arange(n), sq.shape)
+        exact = np.sqrt(((self.z[candidates] - targets[:, None, :]) ** 2).sum(axis=2))
+        exact[~np.isfinite(np.take_along_axis(sq, candidates, axis=1))] = np.inf
+        order = np.lexsort((candidates, exact), axis=1)[:, :m]
+        positions = np.take_along_axis(candidates, order, axis=1).astype(np.intp)
+        distances = np.take_along_axis(exact, order, axis=1)
+        positions[np.isinf(distances)] = -1
+        if m < k:
+            positions = np.pad(positions, ((0, 0), (0, k - m)), constant_values=-1)
+            distances = np.pad(distances, ((0, 0), (0, k - m)), constant_values=np.inf)
+        return positions, distances
+
+    def twins(self, epci_codes, k=TWIN_COUNT):
+        """
+        {code: [{'code', 'nom', 'dept', 'distance', 'resemblance'}, ...]} for the known codes of
+        `epci_codes`, nearest first. Resemblance (0-100) is exp(−distance / √variables).
+        """
+        rows, positions, distances = self.nearest(epci_codes, k)
+        scale = np.sqrt(len(self.variables))
+        out = {}
+        for row, pos, dist in zip(rows, positions, distances):
+            out[self.codes[row]] = [
+                {'code': self.codes[p], 'nom': self.names[p], 'dept': self.depts[p], 'distance': float(d),
+                 'resemblance': 100.0 * float(np.exp(-d / scale))}
+                for p, d in zip(pos, dist) if p >= 0]
+        return out
+
+
+def build_twin_index(table, variables):
+    """TwinIndex of `variables` of an attribute table (ColumnTable or DataFrame; only those columns are read)."""
+    variables = tuple(dict.fromkeys(variables))
+    dept_col = next((c for c in DEPT_COLUMNS if c in table.columns), None)
+    frame = table[['EPCI_CODE', 'nom_EPCI'] + list(variables) + ([dept_col] if dept_col else [])]
+    n = len(frame)
+
+    values = np.empty((n, len(variables)), dtype=np.float64)
+    for j, v in enumerate(variables):
+        values[:, j] = pd.to_numeric(frame[v], errors='coerce').to_numpy(dtype=np.float64)
+    if n:
+        missing = np.isnan(values)
+        if missing.any():
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN column: filled with 0
+                median = np.nanmedian(values, axis=0)
+            values = np.where(missing, np.where(np.isnan(median), 0.0, median), values)
+        mean = values.mean(axis=0)
+        std = values.std(axis=0, ddof=1) if n > 1 else np.zeros(len(variables))
+        z = (values - mean) / np.where(std != 0, std, 1.0)
+    else:
+        z = values
+    z = np.ascontiguousarray(z)
+    z.setflags(write=False)
+
+    codes = frame['EPCI_CODE'].astype(str).to_numpy(dtype=object)
+    row_of = {}
+    for i, code in enumerate(codes):
+        row_of.setdefault(code, i)
+    return TwinIndex(
+        variables=variables,
+        codes=codes,
+        names=frame['nom_EPCI'].to_numpy(dtype=object),
+        depts=frame[dept_col].astype(str).to_numpy(dtype=object) if dept_col else np.full(n, '—', dtype=object),
+        z=z,
+        sq_norms=np.einsum('ij,ij->i', z, z),
+        row_of=row_of,
+    )
+
+
+def column_fingerprints(table, variables):
+    """{variable: hash of its values as float64}: detects which columns changed between two builds."""
+    frame = table[list(variables)]
+    return {v: hashlib.sha256(pd.to_numeric(frame[v], errors='coerce').to_numpy(dtype=np.float64).tobytes()).hexdigest()[:16]
+            for v in variables}
+
+
+def codes_fingerprint(codes):
+    """Hash of the EPCI codes in row order (neighbour rows are only valid for that order)."""
+    return hashlib.sha256("\n".join(str(c) for c in codes).encode("utf-8")).hexdigest()[:16]
+
+
+def _write_neighbours(name, codes, positions, distances):
+    path = artifact_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    k = positions.shape[1]
+    table = pa.table({
+        'EPCI_CODE': pa.array([str(c) for c in codes]),
+        'neighbours': pa.FixedSizeListArray.from_arrays(pa.array(positions.astype(np.int32).ravel()), k),
+        'distances': pa.FixedSizeListArray.from_arrays(pa.array(distances.astype(np.float32).ravel()), k),
+    })
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(table.num_rows, 1))
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_similarity_artifacts(table, themes=SIMILARITY_THEMES, top_k=SIMILARITY_TOP_K, block=512):
+    """
+    Writes the `top_k` nearest neighbours of every territory for each theme, then the manifest
+    (build side only). A theme whose columns have the same fingerprints as in the previous
+    manifest, for the same territories, keeps its file. Returns {theme: 'built' | 'unchanged' |
+    'skipped'} ('skipped': fewer than 2 of its variables in the table).
+    """
+    codes = table['EPCI_CODE'].astype(str).to_numpy(dtype=object)
+    codes_hash = codes_fingerprint(codes)
+    manifest = read_json_artifact(SIMILARITY_ARTIFACT) or {}
+    previous = {}
+    if (manifest.get("format") == SIMILARITY_FORMAT and manifest.get("top_k") == top_k
+            and manifest.get("codes_hash") == codes_hash):
+        previous = manifest.get("themes", {})
+
+    entries, status = {}, {}
+    for theme, variables in themes.items():
+        variables = [v for v in dict.fromkeys(variables) if v in table]
+        if len(variables) < 2:
+            status[theme] = 'skipped'
+            continue
+        fingerprints = column_fingerprints(table, variables)
+        old = previous.get(theme)
+        if (old and old.get("variables") == variables and old.get("columns") == fingerprints
+                and os.path.exists(artifact_path(old["file"]))):
+            entries[theme] = old
+            status[theme] = 'unchanged'
+            continue
+
+        index = build_twin_index(table, variables)
+        n = len(codes)
+        positions = np.empty((n, top_k), dtype=np.intp)
+        distances = np.empty((n, top_k))
+        # Blocks of targets bound the (block × n) distance matrix
+        for start in range(0, n, block):
+            rows = np.arange(start, min(start + block, n))
+            positions[rows], distances[rows] = index._nearest_rows(rows, top_k)
+        name = SIMILARITY_FILE.format(theme=theme)
+        _write_neighbours(name, codes, positions, distances)
+        entries[theme] = {"variables": variables, "columns": fingerprints, "file": name, "epci": n}
+        status[theme] = 'built'
+
+    # Written last: every file it lists is complete
+    write_json_artifact(SIMILARITY_ARTIFACT, {
+        "format": SIMILARITY_FORMAT,
+        "top_k": top_k,
+        "codes_hash": codes_hash,
+        "themes": entries,
+    })
+    return status
+
+
+def _similarity_themes(ds):
+    """{sorted variables: manifest entry} of the precomputed themes valid for the dataset's territories."""
+    def build():
+        manifest = read_json_artifact(SIMILARITY_ARTIFACT)
+        if not manifest or manifest.get("format") != SIMILARITY_FORMAT:
+            return {}
+        if manifest.get("codes_hash") != codes_fingerprint(ds.table['EPCI_CODE'].astype(str)):
+            return {}
+        return {tuple(sorted(entry["variables"])): entry for entry in manifest.get("themes", {}).values()}
+    return ds.memo('twins.similarity', build)
+
+
+def attach_neighbours(ds, index):
+    """
+    `index` with the precomputed neighbour lists of its variable set when the ETL built them
+    from the same column values, `index` itself otherwise.
+    """
+    entry = _similarity_themes(ds).get(tuple(sorted(index.variables)))
+    if entry is None or column_fingerprints(ds.table, entry["variables"]) != entry["columns"]:
+        return index
+    try:
+        arrow = pa.ipc.open_file(pa.memory_map(artifact_path(entry["file"]), 'r')).read_all()
+        neighbours = arrow.column('neighbours').chunk(0)
+        k = neighbours.type.list_size
+        positions = neighbours.flatten().to_numpy(zero_copy_only=True).reshape(-1, k)
+        distances = arrow.column('distances').chunk(0).flatten().to_numpy(zero_copy_only=True).reshape(-1, k)
+    except Exception as e:
+        print(f"Artefact illisible ({entry['file']}) : {e}")
+        return index
+    if len(positions) != len(index.codes):
+        return index
+    return replace(index, neighbours=positions, neighbour_distances=distances)
+
+
+def twin_index(ds, variables):
+    """
+    TwinIndex of `variables` for the dataset, kept per snapshot for the last TWIN_CACHE_SIZE
+    variable sets (the distances do not depend on the order of the variables), with the
+    precomputed neighbour lists of a default set.
+    """
+    key = tuple(sorted(dict.fromkeys(variables)))
+    indexes = ds.memo('twins.indexes', OrderedDict)
+    with _lock:
+        index = indexes.get(key)
+        if index is not None:
+            indexes.move_to_end(key)
+            return index
+    index = attach_neighbours(ds, build_twin_index(ds.table, key))
+    with _lock:
+        indexes[key] = index
+        indexes.move_to_end(key)
+        while len(indexes) > TWIN_CACHE_SIZE:
+            indexes.popitem(last=False)
+    return index
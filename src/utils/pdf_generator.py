@@ -7,18 +7,33 @@ Fonts   : Scaled to PHYSICAL axes size → no overlap, no tiny text
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
-import os, re, time, io, math, textwrap
+import os, re, time, io, math, glob, textwrap, hashlib, threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
 import pandas as pd
 import numpy as np
+import shapely
 
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
-from matplotlib.patches import Rectangle, FancyBboxPatch
+from matplotlib.patches import Rectangle, FancyBboxPatch, PathPatch
+from matplotlib.collections import PatchCollection
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+from matplotlib.path import Path
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.backends.backend_pdf import PdfPages
 
-from ..data import BASE_DIR
+from ..data import BASE_DIR, CACHE_DIR, get_snapshot
+from ..analytics import (build_stats_table, STATUS_ALERT, STATUS_WATCH, STATUS_BALANCED,
+                         STATUS_ASSET, STATUS_STRENGTH, PERCENTILE_MISSING)
+from ..twins import build_twin_index
+from .pdf_merge import merge_pdf_pages
 
 # ── Palette ───────────────────────────────────────────────────────────────────
 NAVY    = '#1e3a5f'
@@ -41,6 +56,42 @@ FIG_W    = 23.4
 FIG_H    = 16.5
 DPI      = 150
 
+PDF_METADATA = {'Title': 'Diagnostic Territorial — AuRA', 'Author': 'SeniAura Analytics'}
+
+# Worker processes building the pages of a multi-page report (1 = in-process, 0 = one per CPU)
+PDF_PROCESSES = int(os.environ.get("SENIAURA_PDF_PROCESSES", "1"))
+
+# Regional choropleth of the map panel, rasterized once per (dataset version, variable)
+PDF_MAP_DIR = os.path.join(CACHE_DIR, "pdf-maps")
+PDF_MAP_FORMAT = 1
+MAP_RASTER_WIDTH = 6.5   # inches, about the width of the map panel
+MAP_RASTER_DPI = 200
+MAP_CACHE_SIZE = 8       # rasters kept decoded in memory
+
+_base_maps = OrderedDict()
+_base_maps_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class _Report:
+    """Inputs shared by every page of one report, computed once in `generate_territory_pdf`."""
+    variables: tuple
+    row_of: dict
+    names: np.ndarray
+    values: np.ndarray        # (n_epci, n_vars) values of the selected variables
+    percentile: np.ndarray    # (n_epci, n_vars) float percentiles, NaN when missing (radar)
+    status: np.ndarray        # (n_epci, n_vars) STATUS_*
+    labels: list              # variable names
+    units: list
+    mean_labels: list         # 'Moy. rég.' cells
+    lever_keys: list          # action-lever category of each variable
+    categories: str           # themes of the selection (context line)
+    map_label: Optional[str]
+    base_map: Optional[tuple]  # (RGB image, extent, aspect) of the choropleth, None if unavailable
+    outlines: dict             # EPCI code -> matplotlib Path of its outline
+    twins: dict                # first EPCI code of each page -> its twins
+    all_levers: dict
+
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 def _ax_dims_pts(ax, fig):
@@ -50,20 +101,18 @@ def _ax_dims_pts(ax, fig):
     return bbox.width * fw * 72, bbox.height * fh * 72
 
 
-def _get_status(pct, sens):
-    if sens == 1:
-        if pct <= 10:  return "Alerte",     "⚠", RED,    True
-        if pct <= 25:  return "Attention",  "!", ORANGE, True
-        if pct >= 90:  return "Point fort", "✓", TEAL,   False
-        if pct >= 75:  return "Atout",      "↑", CYAN,   False
-        return "Médian", "─", DGRAY, False
-    else:
-        if pct >= 90:  return "Alerte",     "⚠", RED,    True
-        if pct >= 75:  return "Attention",  "!", ORANGE, True
-        if pct <= 10:  return "Point fort", "✓", TEAL,   False
-        if pct <= 25:  return "Atout",      "↑", CYAN,   False
-        return "Médian", "─", DGRAY, False
+# (label, symbol, colour, is_vulnerability) per precomputed status (see src/analytics.py)
+_STATUS_STYLE = {
+    STATUS_ALERT:    ("Alerte",     "⚠", RED,    True),
+    STATUS_WATCH:    ("Attention",  "!", ORANGE, True),
+    STATUS_STRENGTH: ("Point fort", "✓", TEAL,   False),
+    STATUS_ASSET:    ("Atout",      "↑", CYAN,   False),
+    STATUS_BALANCED: ("Médian",     "─", DGRAY,  False),
+}
+
 
+def _get_status(status):
+    return _STATUS_STYLE[int(status)]
 
 def get_action_levers_by_category():
     md_path = os.path.join(BASE_DIR, "Leviers d'action.md")
@@ -106,38 +155,17 @@ def _strip_md(text):
     return re.sub(r'\[(.*?)\]\((.*?)\)', r'\1', str(text))
 
 
-def calculate_twins(gdf_merged, target_code, active_vars):
+def calculate_twins(gdf_merged, target_code, active_vars, index=None):
+    """
+    The 3 territories closest to `target_code` on `active_vars` (z-scores, missing values at the
+    median). `index` is a prebuilt TwinIndex of those variables (`src.twins.twin_index(ds, ...)`);
+    without it one is built from `gdf_merged` for this call.
+    """
     if not target_code or not active_vars or len(active_vars) < 2:
         return []
-    dept_col = next(
-        (c for c in ['nom_dep', 'CODE_DEPT', 'dept_name', 'nom_dept']
-         if c in gdf_merged.columns), None)
-    cols = ['EPCI_CODE', 'nom_EPCI'] + active_vars + ([dept_col] if dept_col else [])
-    df = gdf_merged[cols].copy()
-    for v in active_vars:
-        df[v] = pd.to_numeric(df[v], errors='coerce')
-        med = df[v].median()
-        df[v] = df[v].fillna(med if pd.notna(med) else 0.0)
-    z = df[active_vars].copy()
-    for v in active_vars:
-        mu, sig = z[v].mean(), z[v].std()
-        z[v] = (z[v] - mu) / (sig if sig != 0 else 1.0)
-    tgt = df[df['EPCI_CODE'] == target_code]
-    if tgt.empty:
-        return []
-    tgt_vec = z.loc[tgt.index[0]].values
-    results = []
-    for idx2, row2 in df.iterrows():
-        if row2['EPCI_CODE'] == target_code:
-            continue
-        dist = float(np.sqrt(np.sum((tgt_vec - z.loc[idx2].values) ** 2)))
-        dept = str(row2[dept_col]) if dept_col else '—'
-        results.append({'nom': row2['nom_EPCI'], 'dept': dept, 'distance': dist})
-    results.sort(key=lambda x: x['distance'])
-    n = len(active_vars)
-    for t in results[:3]:
-        t['resemblance'] = 100.0 * float(np.exp(-t['distance'] / np.sqrt(n)))
-    return results[:3]
+    if index is None:
+        index = build_twin_index(gdf_merged, active_vars)
+    return index.twins([target_code]).get(str(target_code), [])
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -265,10 +293,8 @@ def _draw_table(ax, fig, headers, rows, col_w,
 # ═════════════════════════════════════════════════════════════════════════════
 #   COMPARISON TABLE
 # ═════════════════════════════════════════════════════════════════════════════
-def _draw_comparison_table(ax, fig, epci_codes, epci_names, selected_vars,
-                            gdf_merged, variable_dict, unit_dict, sens_dict,
-                            category_dict, ranks_df):
-    n_epci = len(epci_codes)
+def _draw_comparison_table(ax, fig, rows_pos, epci_names, report):
+    n_epci = len(rows_pos)
     ind_w  = 0.30
     mean_w = 0.08
     epci_w = round((1.0 - ind_w - mean_w) / n_epci, 6)
@@ -287,35 +313,18 @@ def _draw_comparison_table(ax, fig, epci_codes, epci_names, selected_vars,
     ind_col_pts = ind_w * ax_w_pts
     wrap_width = max(15, int(ind_col_pts / (9 * 0.55)))  # assume ~9pt font for wrapping
 
-    for v in selected_vars:
-        label = variable_dict.get(v, v) or v
-        label = textwrap.fill(label, width=wrap_width)
-        unit  = unit_dict.get(v, '')
-        avg   = gdf_merged[v].mean()
-        avg_s = (f"{avg:.1f}{' ' + unit if unit else ''}") if pd.notna(avg) else 'N/D'
-        row_cells = [label]
-        for j, code in enumerate(epci_codes):
-            r = gdf_merged[gdf_merged['EPCI_CODE'] == code]
-            if r.empty:
-                row_cells.append('N/D')
-                status_cols[j + 1].append(DGRAY)
-                continue
-            ri  = r.index[0]
-            val = r[v].values[0]
+    for ci, label in enumerate(report.labels):
+        unit  = report.units[ci]
+        row_cells = [textwrap.fill(label, width=wrap_width)]
+        for j, ri in enumerate(rows_pos):
+            val = report.values[ri, ci]
             val_s = (f"{val:.1f}{' ' + unit if unit else ''}") if pd.notna(val) else 'N/D'
-            pct = ranks_df.loc[ri, v] * 100
-            sens = sens_dict.get(v, -1)
-            _, sym, sc, is_vuln = _get_status(pct, sens)
+            _, sym, sc, is_vuln = _get_status(report.status[ri, ci])
             row_cells.append(f"{val_s} {sym}")
             status_cols[j + 1].append(sc)
-            if is_vuln and j == 0:
-                cat_raw = category_dict.get(v, '').lower()
-                cat_key = ('socio-économique' if 'socio' in cat_raw
-                           else 'environnement' if 'env' in cat_raw
-                           else 'santé')
-                if cat_key not in prim_levers:
-                    prim_levers.append(cat_key)
-        row_cells.append(avg_s)
+            if is_vuln and j == 0 and report.lever_keys[ci] not in prim_levers:
+                prim_levers.append(report.lever_keys[ci])
+        row_cells.append(report.mean_labels[ci])
         rows.append(row_cells)
 
     _draw_table(
@@ -330,9 +339,8 @@ def _draw_comparison_table(ax, fig, epci_codes, epci_names, selected_vars,
 # ═════════════════════════════════════════════════════════════════════════════
 #   RADAR (combined, all EPCIs)
 # ═════════════════════════════════════════════════════════════════════════════
-def _draw_radar(ax, fig, gdf_merged, selected_vars, epci_codes, epci_names,
-                variable_dict, ranks_df):
-    n = len(selected_vars)
+def _draw_radar(ax, fig, report, rows_pos, epci_names):
+    n = len(report.variables)
     _, ax_h_pts = _ax_dims_pts(ax, fig)
     tick_fs = max(6, min(11, ax_h_pts / 55))
     title_fs = max(8, min(14, ax_h_pts / 40))
@@ -352,9 +360,8 @@ def _draw_radar(ax, fig, gdf_merged, selected_vars, epci_codes, epci_names,
     ax.spines['polar'].set_color(MGRAY)
     ax.spines['polar'].set_linewidth(0.5)
 
-    labels = [(variable_dict.get(v, v) or v) for v in selected_vars]
     lbl_max = max(8, int(tick_fs * 1.8))
-    labels_s = [(lb[:lbl_max - 1] + '…') if len(lb) > lbl_max else lb for lb in labels]
+    labels_s = [(lb[:lbl_max - 1] + '…') if len(lb) > lbl_max else lb for lb in report.labels]
     ax.set_xticks(angles[:-1])
     ax.set_xticklabels(labels_s, fontsize=tick_fs, color=SLATE, fontweight='bold')
     ax.set_ylim(0, 100)
@@ -364,12 +371,8 @@ def _draw_radar(ax, fig, gdf_merged, selected_vars, epci_codes, epci_names,
     ax.fill(angles, [50] * (n + 1), color=MGRAY, alpha=0.30, linewidth=0,
             label='Médiane rég.')
 
-    for i, (code, name) in enumerate(zip(epci_codes, epci_names)):
-        row = gdf_merged[gdf_merged['EPCI_CODE'] == code]
-        if row.empty:
-            continue
-        ri   = row.index[0]
-        vals = [ranks_df.loc[ri, v] * 100 for v in selected_vars]
+    for i, (ri, name) in enumerate(zip(rows_pos, epci_names)):
+        vals = report.percentile[ri].tolist()
         vals += vals[:1]
         col  = EPCI_PALETTE[i % len(EPCI_PALETTE)]
         short = (name[:20] + '…') if len(name) > 21 else name
@@ -386,7 +389,121 @@ def _draw_radar(ax, fig, gdf_merged, selected_vars, epci_codes, epci_names,
 # ═════════════════════════════════════════════════════════════════════════════
 #   MAP
 # ═════════════════════════════════════════════════════════════════════════════
-def _draw_map(ax, fig, gdf_merged, target_var, epci_codes, label_name, epci_names):
+def _polygon_path(geom):
+    """matplotlib Path of a Polygon / MultiPolygon (every ring, holes included)."""
+    vertices, codes = [], []
+    for polygon in getattr(geom, 'geoms', [geom]):
+        for ring in [polygon.exterior, *polygon.interiors]:
+            coords = np.asarray(ring.coords)[:, :2]
+            if len(coords) < 3:
+                continue
+            ring_codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+            ring_codes[0], ring_codes[-1] = Path.MOVETO, Path.CLOSEPOLY
+            vertices.append(coords)
+            codes.append(ring_codes)
+    if not vertices:
+        return None
+    return Path(np.concatenate(vertices), np.concatenate(codes))
+
+
+def _map_extent(geometries):
+    """(extent, aspect) of the map: bounds plus a 5 % margin, aspect of a geographic plot (as geopandas)."""
+    minx, miny, maxx, maxy = shapely.total_bounds(geometries)
+    dx, dy = (maxx - minx) * 0.05, (maxy - miny) * 0.05
+    extent = (minx - dx, maxx + dx, miny - dy, maxy + dy)
+    aspect = 1 / math.cos(math.radians((miny + maxy) / 2))
+    return extent, aspect
+
+
+def _render_base_map(geometries, values):
+    """
+    RGB raster (white background) of the regional choropleth (Blues, missing values in light grey) and its
+    (extent, aspect), drawn off-pyplot at MAP_RASTER_DPI.
+    """
+    extent, aspect = _map_extent(geometries)
+    width = extent[1] - extent[0]
+    height = (extent[3] - extent[2]) * aspect
+    fig = Figure(figsize=(MAP_RASTER_WIDTH, MAP_RASTER_WIDTH * height / width), dpi=MAP_RASTER_DPI,
+                 facecolor='white')
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+
+    paths = [_polygon_path(g) if g is not None and not g.is_empty else None for g in geometries]
+    present = np.array([p is not None for p in paths])
+    known = present & ~np.isnan(values)
+    missing = present & np.isnan(values)
+    if known.any():
+        faces = PatchCollection([PathPatch(paths[i]) for i in np.flatnonzero(known)], cmap='Blues',
+                                norm=Normalize(values[known].min(), values[known].max()),
+                                edgecolor='#d1d5db', linewidth=0.12)
+        faces.set_array(values[known])
+        ax.add_collection(faces)
+    if missing.any():
+        ax.add_collection(PatchCollection([PathPatch(paths[i]) for i in np.flatnonzero(missing)],
+                                          facecolor='#f0f4f8', edgecolor='#e2e8f0', linewidth=0.12))
+    fig.canvas.draw()
+    image = np.asarray(fig.canvas.buffer_rgba())[:, :, :3].copy()
+    return image, extent, aspect
+
+
+def _base_map_path(version, target_var):
+    digest = hashlib.sha256(str(target_var).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(PDF_MAP_DIR, f"map-v{PDF_MAP_FORMAT}-{version}-{digest}.npz")
+
+
+def _base_map(geometries, values, version=None, target_var=None):
+    """
+    (image, extent, aspect) of the choropleth of `target_var`. With a dataset `version`, the raster
+    is read from (or written to) data/cache/pdf-maps and kept in memory, so it is drawn once per
+    dataset version and variable for every report and worker; without it, it is drawn for this report.
+    """
+    if version is None:
+        return _render_base_map(geometries, values)
+    key = (version, target_var)
+    with _base_maps_lock:
+        if key in _base_maps:
+            _base_maps.move_to_end(key)
+            return _base_maps[key]
+
+    path = _base_map_path(version, target_var)
+    base = None
+    if os.path.exists(path):
+        try:
+            with np.load(path) as cached:
+                base = (cached['image'], tuple(cached['extent'].tolist()), float(cached['aspect']))
+        except Exception:
+            base = None
+    if base is None:
+        base = _render_base_map(geometries, values)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(PDF_MAP_DIR, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, image=base[0], extent=np.asarray(base[1]), aspect=base[2])
+            os.replace(tmp_path, path)
+            # Rasters of other dataset versions are never read again
+            for stale in glob.glob(os.path.join(PDF_MAP_DIR, "map-v*")):
+                if f"-{version}-" not in os.path.basename(stale) and ".tmp-" not in stale:
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+        except OSError as e:
+            print(f"Impossible d'écrire la carte du rapport dans {PDF_MAP_DIR} : {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    with _base_maps_lock:
+        _base_maps[key] = base
+        while len(_base_maps) > MAP_CACHE_SIZE:
+            _base_maps.popitem(last=False)
+    return base
+
+
+def _draw_map(ax, fig, report, epci_codes, epci_names):
     _, ax_h_pts = _ax_dims_pts(ax, fig)
     fs = max(7, min(12, ax_h_pts / 40))
 
@@ -395,22 +512,25 @@ def _draw_map(ax, fig, gdf_merged, target_var, epci_codes, label_name, epci_name
         sp.set_visible(True)
         sp.set_linewidth(0.5)
         sp.set_edgecolor(MGRAY)
-    try:
-        gdf_merged.plot(
-            column=target_var, cmap='Blues', legend=False, ax=ax,
-            edgecolor='#d1d5db', linewidth=0.12,
-            missing_kwds={'color': '#f0f4f8', 'edgecolor': '#e2e8f0'}
-        )
+    if report.base_map is not None:
+        image, extent, aspect = report.base_map
+        ax.imshow(image, extent=extent, aspect=aspect, interpolation='antialiased')
+        outlines, colors = [], []
         for i, code in enumerate(epci_codes):
-            sel = gdf_merged[gdf_merged['EPCI_CODE'] == code]
-            if not sel.empty:
-                sel.plot(ax=ax, facecolor='none',
-                         edgecolor=EPCI_PALETTE[i % len(EPCI_PALETTE)], linewidth=2.5)
-    except Exception:
+            path = report.outlines.get(str(code))
+            if path is not None:
+                outlines.append(PathPatch(path))
+                colors.append(EPCI_PALETTE[i % len(EPCI_PALETTE)])
+        if outlines:
+            ax.add_collection(PatchCollection(outlines, facecolor='none', edgecolor=colors, linewidth=2.5))
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+    else:
         ax.text(0.5, 0.5, 'Carte indisponible',
                 ha='center', va='center', fontsize=fs, color=DGRAY,
                 transform=ax.transAxes)
     ax.set_axis_off()
+    label_name = report.map_label
     short_lbl = (label_name[:35] + '…') if len(label_name) > 36 else label_name
     ax.set_title(f'Carte régionale — {short_lbl}', fontsize=fs * 1.15,
                  fontweight='bold', color=NAVY, pad=6)
@@ -596,16 +716,10 @@ def _draw_legend(ax, fig):
 # ═════════════════════════════════════════════════════════════════════════════
 #   CONTEXT
 # ═════════════════════════════════════════════════════════════════════════════
-def _draw_context(ax, fig, epci_names, selected_vars, variable_dict, category_dict):
+def _draw_context(ax, fig, epci_names, report):
     ax_w_pts, ax_h_pts = _ax_dims_pts(ax, fig)
     fs = max(8, min(13, ax_h_pts / 5.5))
 
-    cats = set()
-    for v in selected_vars:
-        c = category_dict.get(v, '').lower()
-        cats.add('socio-économique' if 'socio' in c else 'environnementale' if 'env' in c else 'sanitaire')
-    cats_str = ', '.join(sorted(cats)) if cats else 'sanitaire'
-
     n = len(epci_names)
     if n == 1:
         terr = epci_names[0]
@@ -615,7 +729,7 @@ def _draw_context(ax, fig, epci_names, selected_vars, variable_dict, category_di
         terr = f"{n} territoires sélectionnés"
 
     txt = (
-        f"Analyse de {terr}  ·  {len(selected_vars)} indicateurs ({cats_str})  ·  "
+        f"Analyse de {terr}  ·  {len(report.variables)} indicateurs ({report.categories})  ·  "
         f"Positionnement vs. ensemble des EPCI AuRA  ·  "
         f"Jumeaux et leviers calculés pour : {epci_names[0]}"
     )
@@ -682,9 +796,7 @@ def _draw_footer(ax, fig, page_num, total):
 # ═════════════════════════════════════════════════════════════════════════════
 #   PAGE BUILDER
 # ═════════════════════════════════════════════════════════════════════════════
-def _build_page(epci_codes_page, gdf_merged, selected_vars,
-                variable_dict, unit_dict, sens_dict, category_dict,
-                ranks_df, all_levers, page_num, total_pages):
+def _build_page(epci_codes_page, report, page_num, total_pages):
     """
     Layout (height fractions):
       [0] header    5 %
@@ -693,13 +805,14 @@ def _build_page(epci_codes_page, gdf_merged, selected_vars,
       [3] analysis 37 %  ← map 30% | twins 40% | levers 18% | legend 12%
       [4] footer    3 %
     """
-    epci_names, valid_codes = [], []
+    epci_names, valid_codes, rows_pos = [], [], []
     for code in epci_codes_page:
-        r = gdf_merged[gdf_merged['EPCI_CODE'] == code]
-        if r.empty:
+        ri = report.row_of.get(str(code))
+        if ri is None:
             continue
-        epci_names.append(r['nom_EPCI'].values[0])
+        epci_names.append(report.names[ri])
         valid_codes.append(code)
+        rows_pos.append(ri)
     if not valid_codes:
         return None
 
@@ -714,11 +827,11 @@ def _build_page(epci_codes_page, gdf_merged, selected_vars,
 
     # [0] Header
     ax_hdr = fig.add_subplot(gs[0])
-    _draw_header(ax_hdr, fig, epci_names, time.strftime('%d/%m/%Y'), len(selected_vars))
+    _draw_header(ax_hdr, fig, epci_names, time.strftime('%d/%m/%Y'), len(report.variables))
 
     # [1] Context
     ax_ctx = fig.add_subplot(gs[1])
-    _draw_context(ax_ctx, fig, epci_names, selected_vars, variable_dict, category_dict)
+    _draw_context(ax_ctx, fig, epci_names, report)
 
     # [2] Main: table | radar
     gs_main = gridspec.GridSpecFromSubplotSpec(
@@ -727,12 +840,8 @@ def _build_page(epci_codes_page, gdf_merged, selected_vars,
     ax_table = fig.add_subplot(gs_main[0])
     ax_radar = fig.add_subplot(gs_main[1], projection='polar')
 
-    prim_levers = _draw_comparison_table(
-        ax_table, fig, valid_codes, epci_names, selected_vars,
-        gdf_merged, variable_dict, unit_dict, sens_dict,
-        category_dict, ranks_df)
-    _draw_radar(ax_radar, fig, gdf_merged, selected_vars,
-                valid_codes, epci_names, variable_dict, ranks_df)
+    prim_levers = _draw_comparison_table(ax_table, fig, rows_pos, epci_names, report)
+    _draw_radar(ax_radar, fig, report, rows_pos, epci_names)
 
     # [3] Analysis: map | twins | levers | legend
     gs_ana = gridspec.GridSpecFromSubplotSpec(
@@ -743,18 +852,13 @@ def _build_page(epci_codes_page, gdf_merged, selected_vars,
     ax_levers = fig.add_subplot(gs_ana[2])
     ax_legend = fig.add_subplot(gs_ana[3])
 
-    primary_var = selected_vars[0] if selected_vars else None
-    if primary_var:
-        pname = variable_dict.get(primary_var, primary_var)
-        punit = unit_dict.get(primary_var, '')
-        lbl = f'{pname} ({punit})' if punit else pname
-        _draw_map(ax_map, fig, gdf_merged, primary_var, valid_codes, lbl, epci_names)
+    if report.map_label is not None:
+        _draw_map(ax_map, fig, report, valid_codes, epci_names)
     else:
         ax_map.axis('off')
 
-    twins = calculate_twins(gdf_merged, valid_codes[0], selected_vars)
-    _draw_twins(ax_twins, fig, twins, epci_names[0])
-    _draw_levers(ax_levers, fig, prim_levers, all_levers, epci_names[0])
+    _draw_twins(ax_twins, fig, report.twins.get(str(valid_codes[0]), []), epci_names[0])
+    _draw_levers(ax_levers, fig, prim_levers, report.all_levers, epci_names[0])
     _draw_legend(ax_legend, fig)
 
     # [4] Footer
@@ -764,17 +868,160 @@ def _build_page(epci_codes_page, gdf_merged, selected_vars,
     return fig
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+#   PARALLEL PAGES
+# ═════════════════════════════════════════════════════════════════════════════
+_page_args = None
+
+
+def _init_page_worker(page_args):
+    global _page_args
+    _page_args = page_args
+
+
+def _render_page(args):
+    """Single-page PDF document (bytes) of one page, or None for a page without valid territory."""
+    fig = _build_page(*args)
+    if fig is None:
+        return None
+    buffer = io.BytesIO()
+    try:
+        with PdfPages(buffer, metadata=PDF_METADATA) as pdf:
+            pdf.savefig(fig, dpi=DPI, bbox_inches='tight', pad_inches=0)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+def _render_page_at(i):
+    return _render_page(_page_args[i])
+
+
+def _render_pages_together(page_args):
+    """All pages rendered in-process into one PdfPages: the fallback when the page documents cannot be merged."""
+    buffer = io.BytesIO()
+    with PdfPages(buffer, metadata=PDF_METADATA) as pdf:
+        for args in page_args:
+            fig = _build_page(*args)
+            if fig is None:
+                continue
+            try:
+                pdf.savefig(fig, dpi=DPI, bbox_inches='tight', pad_inches=0)
+            finally:
+                plt.close(fig)
+    return buffer.getvalue()
+
+
+def _page_documents(page_args, processes):
+    """
+    PDF documents of the pages, in page order. With `processes` > 1 each page is built and
+    rendered to PDF by a forked worker, which inherits the report inputs (tables, statistics,
+    raster map, outlines) instead of receiving a pickled copy and only sends back the bytes of
+    its page; the caller merges them (`merge_pdf_pages`), so the result does not depend on the
+    number of processes. Platforms without fork render in-process.
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and len(page_args) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=min(processes, len(page_args)),
+                                 mp_context=multiprocessing.get_context('fork'),
+                                 initializer=_init_page_worker, initargs=(page_args,)) as pool:
+            yield from pool.map(_render_page_at, range(len(page_args)))
+        return
+    for args in page_args:
+        yield _render_page(args)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+#   PER-REPORT PRECOMPUTATION
+# ═════════════════════════════════════════════════════════════════════════════
+def _lever_key(category):
+    c = category.lower()
+    return 'socio-économique' if 'socio' in c else 'environnement' if 'env' in c else 'santé'
+
+
+def _build_report(valid_codes, selected_vars, gdf_merged, variable_dict, unit_dict, category_dict,
+                  stats, geometry, twins, all_levers, version):
+    """Everything the pages share (statistics of the selection, labels, map, outlines, twins), once."""
+    var_cols = stats.cols(selected_vars)
+    percentile = stats.percentile[:, var_cols].astype(float)
+    percentile[stats.percentile[:, var_cols] == PERCENTILE_MISSING] = np.nan
+    units = [unit_dict.get(v, '') for v in selected_vars]
+    mean_labels = [(f"{avg:.1f}{' ' + unit if unit else ''}") if pd.notna(avg) else 'N/D'
+                   for avg, unit in zip(stats.mean[var_cols], units)]
+
+    cats = set()
+    for v in selected_vars:
+        c = category_dict.get(v, '').lower()
+        cats.add('socio-économique' if 'socio' in c else 'environnementale' if 'env' in c else 'sanitaire')
+
+    base_map, outlines, map_label = None, {}, None
+    if selected_vars:
+        primary_var = selected_vars[0]
+        pname = variable_dict.get(primary_var, primary_var)
+        punit = unit_dict.get(primary_var, '')
+        map_label = f'{pname} ({punit})' if punit else pname
+        try:
+            if 'geometry' in gdf_merged.columns:
+                geometries = np.asarray(gdf_merged.geometry.array, dtype=object)
+                codes = gdf_merged['EPCI_CODE'].astype(str).to_numpy(dtype=object)
+            else:
+                if geometry is None:
+                    geometry = get_snapshot().geometry
+                geometries, codes = geometry.geometries, geometry.codes
+            values = pd.to_numeric(gdf_merged[primary_var], errors='coerce').to_numpy(dtype=float)
+            if len(values) != len(geometries):
+                raise ValueError("Le tableau d'attributs n'est pas aligné sur le stockage des géométries.")
+            base_map = _base_map(geometries, values, version, primary_var)
+            selected = {str(c) for c in valid_codes}
+            for code, geom in zip(codes, geometries):
+                if code in selected and code not in outlines and geom is not None and not geom.is_empty:
+                    outlines[code] = _polygon_path(geom)
+        except Exception as e:
+            print(f"⚠️ Carte du rapport indisponible : {e}")
+            base_map, outlines = None, {}
+
+    return _Report(
+        variables=tuple(selected_vars),
+        row_of=stats.row_of,
+        names=stats.names,
+        values=stats.values[:, var_cols],
+        percentile=percentile,
+        status=stats.status[:, var_cols],
+        labels=[(variable_dict.get(v, v) or v) for v in selected_vars],
+        units=units,
+        mean_labels=mean_labels,
+        lever_keys=[_lever_key(category_dict.get(v, '')) for v in selected_vars],
+        categories=', '.join(sorted(cats)) if cats else 'sanitaire',
+        map_label=map_label,
+        base_map=base_map,
+        outlines=outlines,
+        twins=twins,
+        all_levers=all_levers,
+    )
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 #   PUBLIC ENTRY POINT
 # ═════════════════════════════════════════════════════════════════════════════
 def generate_territory_pdf(epci_codes, selected_vars, gdf_merged,
-                            variable_dict, unit_dict, sens_dict, category_dict):
+                            variable_dict, unit_dict, sens_dict, category_dict, stats=None, geometry=None,
+                            twin_index=None, processes=None, version=None):
+    """
+    `stats` is the dataset's precomputed StatsTable (`src.analytics.stats_table(ds)`); when omitted
+    it is built for the selected variables only. `twin_index` is the dataset's TwinIndex of the
+    selected variables (`src.twins.twin_index(ds, selected_vars)`); when omitted it is built once
+    for the report. `gdf_merged` may be a GeoDataFrame or a snapshot's attribute table, whose
+    outlines then come from `geometry` (default: the shared snapshot store). `processes` is the
+    number of worker processes building the pages (default PDF_PROCESSES); pages are written in
+    order whatever their number. `version` is the dataset version (`DataSnapshot.version`): the
+    base map of the primary variable is then rasterized once and cached in data/cache/pdf-maps.
+    """
     buffer     = io.BytesIO()
     all_levers = get_action_levers_by_category()
-    ranks_df   = gdf_merged[selected_vars].rank(pct=True)
+    if stats is None:
+        stats = build_stats_table(gdf_merged, variable_dict, sens_dict, columns=selected_vars)
 
-    valid_codes = [c for c in epci_codes
-                   if not gdf_merged[gdf_merged['EPCI_CODE'] == c].empty]
+    valid_codes = [c for c in epci_codes if str(c) in stats.row_of]
     if not valid_codes:
         with PdfPages(buffer) as pdf:
             fig = plt.figure(figsize=(FIG_W, FIG_H), facecolor='white')
@@ -788,20 +1035,23 @@ def generate_territory_pdf(epci_codes, selected_vars, gdf_merged,
     pages = [valid_codes[i:i + PAGE_MAX]
              for i in range(0, len(valid_codes), PAGE_MAX)]
 
-    with PdfPages(buffer) as pdf:
-        d = pdf.infodict()
-        d['Title']  = 'Diagnostic Territorial — AuRA'
-        d['Author'] = 'SeniAura Analytics'
-
-        for pn, pc in enumerate(pages, 1):
-            fig = _build_page(
-                pc, gdf_merged, selected_vars,
-                variable_dict, unit_dict, sens_dict, category_dict,
-                ranks_df, all_levers, pn, len(pages))
-            if fig is None:
-                continue
-            pdf.savefig(fig, dpi=DPI, bbox_inches='tight', pad_inches=0)
-            plt.close(fig)
-
+    # Twins of every page's first territory, in one search
+    page_twins = {}
+    if len(selected_vars) >= 2:
+        if twin_index is None:
+            twin_index = build_twin_index(gdf_merged, selected_vars)
+        page_twins = twin_index.twins([pc[0] for pc in pages])
+    report = _build_report(valid_codes, selected_vars, gdf_merged, variable_dict, unit_dict, category_dict,
+                           stats, geometry, page_twins, all_levers, version)
+
+    page_args = [(pc, report, pn, len(pages)) for pn, pc in enumerate(pages, 1)]
+    documents = [doc for doc in _page_documents(page_args, PDF_PROCESSES if processes is None else processes)
+                 if doc is not None]
+    try:
+        buffer.write(merge_pdf_pages(documents))
+    except ValueError as e:
+        # Layout written by another matplotlib version: render the pages into a single document
+        print(f"⚠️ Assemblage des pages PDF impossible, rendu en un seul document : {e}")
+        buffer.write(_render_pages_together(page_args))
     buffer.seek(0)
     return buffer
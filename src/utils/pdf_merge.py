@@ -0,0 +1,158 @@
+"""
+Concatenation of the single-page PDF documents written by matplotlib's `PdfPages`.
+
+The pages of a multi-page report are rendered to PDF by worker processes, each into its own
+document; `merge_pdf_pages` joins them in order into one document without re-rendering anything.
+It relies on the layout matplotlib writes (classic cross-reference table in a single section,
+uncompressed object headers, one /Pages tree under the catalog), not on a general PDF parser:
+any other layout (cross-reference stream, incremental update, missing catalog) raises
+ValueError, and the caller renders the pages into one document instead. Each page keeps its own
+resources (fonts, images), renumbered after the previous pages.
+"""
+
+import re
+
+_XREF_SECTION = re.compile(rb'xref\s+0 (\d+)\s')
+_XREF_ENTRY = re.compile(rb'(\d{10}) (\d{5}) ([nf])')
+_OBJECT_HEADER = re.compile(rb'(\d+) 0 obj\s')
+_REFERENCE = re.compile(rb'(\d+) 0 R\b')
+# Outside literal strings, a '(' opens a string and 'stream' starts binary data
+_STRING_OR_STREAM = re.compile(rb'\(|\bstream\r?\n')
+
+
+def _parse(document):
+    """
+    ({object id: content}, root id, info id) of a document written by matplotlib.
+    ValueError if the document does not have the layout this module supports.
+    """
+    if document.count(b'startxref') != 1:
+        raise ValueError("PDF non pris en charge : mise à jour incrémentale ou fin de fichier absente")
+    xref = int(document[document.rindex(b'startxref') + len(b'startxref'):].split()[0])
+    subsection = _XREF_SECTION.match(document, xref)
+    if subsection is None:
+        raise ValueError("PDF non pris en charge : table de références croisées absente ou compressée")
+    trailer_at = document.find(b'trailer', xref)
+    if trailer_at < 0:
+        raise ValueError("PDF non pris en charge : trailer absent")
+    entries = _XREF_ENTRY.findall(document, subsection.end(), trailer_at)
+    if len(entries) != int(subsection.group(1)):
+        raise ValueError("PDF non pris en charge : table de références croisées en plusieurs sections")
+    offsets = sorted((int(off), obj_id) for obj_id, (off, _, kind) in enumerate(entries) if kind == b'n')
+
+    objects = {}
+    for (offset, obj_id), end in zip(offsets, [o for o, _ in offsets[1:]] + [xref]):
+        header = _OBJECT_HEADER.match(document, offset)
+        if header is None or int(header.group(1)) != obj_id:
+            raise ValueError(f"Objet PDF {obj_id} introuvable à l'offset {offset}")
+        body = document[header.end():end].rstrip()
+        if not body.endswith(b'endobj'):
+            raise ValueError(f"Objet PDF {obj_id} mal terminé")
+        objects[obj_id] = body[:-len(b'endobj')]
+
+    trailer = document[trailer_at:]
+    if b'/Prev' in trailer:
+        raise ValueError("PDF non pris en charge : mise à jour incrémentale")
+    root = re.search(rb'/Root (\d+) 0 R', trailer)
+    if root is None or int(root.group(1)) not in objects:
+        raise ValueError("PDF non pris en charge : catalogue (/Root) absent")
+    info = re.search(rb'/Info (\d+) 0 R', trailer)
+    return objects, int(root.group(1)), int(info.group(1)) if info else None
+
+
+def _literal_string_end(content, start):
+    """Position after the literal string opened at `start` (balanced parentheses, escapes)."""
+    depth, i = 0, start
+    while i < len(content):
+        c = content[i]
+        if c == 0x5C:      # backslash: the next byte is escaped
+            i += 2
+            continue
+        if c == 0x28:
+            depth += 1
+        elif c == 0x29:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(content)
+
+
+def _renumber(content, new_id):
+    """`content` with every indirect reference `n 0 R` replaced by `new_id(n)` (strings and streams untouched)."""
+    def refs(segment):
+        return _REFERENCE.sub(lambda m: b'%d 0 R' % new_id(int(m.group(1))), segment)
+
+    out, i = [], 0
+    while True:
+        m = _STRING_OR_STREAM.search(content, i)
+        if m is None:
+            out.append(refs(content[i:]))
+            break
+        out.append(refs(content[i:m.start()]))
+        if m.group() == b'(':
+            end = _literal_string_end(content, m.start())
+            out.append(content[m.start():end])
+            i = end
+        else:
+            out.append(content[m.start():])
+            break
+    return b''.join(out)
+
+
+def merge_pdf_pages(documents):
+    """
+    One PDF document (bytes) with the pages of `documents` (PDF bytes written by matplotlib), in
+    order. The document information (title, author, creation date) is the first document's.
+    ValueError if a document does not have the supported layout (see the module docstring).
+    """
+    documents = list(documents)
+    if len(documents) == 1:
+        return documents[0]
+
+    out = bytearray(b'%PDF-1.4\n%\xac\xdc \xab\xba\n')
+    offsets = {}
+
+    def write(obj_id, content):
+        offsets[obj_id] = len(out)
+        out.extend(b'%d 0 obj\n' % obj_id)
+        out.extend(content)
+        out.extend(b'\nendobj\n')
+
+    # 1 = catalog, 2 = page tree, 3 = document information; page objects follow
+    kids, info, next_id = [], b'<< >>', 4
+    for n, document in enumerate(documents):
+        objects, root, info_id = _parse(document)
+        pages = re.search(rb'/Pages (\d+) 0 R', objects[root])
+        if pages is None or int(pages.group(1)) not in objects:
+            raise ValueError("PDF non pris en charge : arbre des pages (/Pages) absent")
+        pages_id = int(pages.group(1))
+        page_refs = re.search(rb'/Kids \[([^\]]*)\]', objects[pages_id])
+        if page_refs is None:
+            raise ValueError("PDF non pris en charge : arbre des pages imbriqué")
+        base = next_id
+
+        def new_id(obj_id, base=base, pages_id=pages_id):
+            return 2 if obj_id == pages_id else base + obj_id
+
+        for obj_id, content in objects.items():
+            if obj_id in (root, pages_id):
+                continue
+            if obj_id == info_id:
+                if n == 0:
+                    info = _renumber(content.strip(), new_id)
+                continue
+            write(new_id(obj_id), _renumber(content.strip(), new_id))
+        kids += [new_id(int(k)) for k in _REFERENCE.findall(page_refs.group(1))]
+        next_id = base + max(objects) + 1
+
+    write(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    write(2, b'<< /Type /Pages /Kids [ %s ] /Count %d >>' % (b' '.join(b'%d 0 R' % k for k in kids), len(kids)))
+    write(3, info)
+
+    xref = len(out)
+    size = max(offsets) + 1
+    out.extend(b'xref\n0 %d\n' % size)
+    for obj_id in range(size):
+        out.extend(b'%010d 00000 n \n' % offsets[obj_id] if obj_id in offsets else b'0000000000 65535 f \n')
+    out.extend(b'trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref))
+    return bytes(out)
@@ -0,0 +1,83 @@
+"""
+Statistics tables (`src.analytics`) against the per-cell computations they replace: pandas ranks
+and the scalar alert / strength ladder of the quantile panel and the PDF report.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import (PERCENTILE_MISSING, STATUS_ALERT, STATUS_ASSET, STATUS_BALANCED, STATUS_STRENGTH,
+                           STATUS_WATCH, build_stats_table, classify_percentiles, stats_table)
+
+
+def reference_status(pct, sens):
+    """Scalar classification of one percentile, as the panels computed it cell by cell."""
+    if sens == 1:
+        if pct <= 10: return STATUS_ALERT
+        if pct <= 25: return STATUS_WATCH
+        if pct >= 90: return STATUS_STRENGTH
+        if pct >= 75: return STATUS_ASSET
+        return STATUS_BALANCED
+    if pct >= 90: return STATUS_ALERT
+    if pct >= 75: return STATUS_WATCH
+    if pct <= 10: return STATUS_STRENGTH
+    if pct <= 25: return STATUS_ASSET
+    return STATUS_BALANCED
+
+
+def test_classify_percentiles_matches_the_scalar_ladder():
+    pct = np.array([0, 5, 10, 10.5, 24.9, 25, 50, 74.9, 75, 89.9, 90, 100, np.nan])
+    grid = np.column_stack([pct, pct])
+    status = classify_percentiles(grid, [True, False])
+    assert status.dtype == np.int8
+    for i, p in enumerate(pct):
+        assert status[i, 0] == reference_status(p, 1), p
+        assert status[i, 1] == reference_status(p, -1), p
+
+
+@pytest.fixture
+def frame():
+    """Small table with ties, missing values, a text column and a duplicated code."""
+    return pd.DataFrame({
+        'EPCI_CODE': ['1', '2', '3', '4', '5', '2'],
+        'nom_EPCI': ['A', 'B', 'C', 'D', 'E', 'B bis'],
+        'up': [1.0, 2.0, 2.0, np.nan, 5.0, 9.0],
+        'down': [10.0, 3.0, 7.0, 7.0, 1.0, 0.5],
+        'texte': ['4', 'x', '1', '2', '3', '5'],
+    })
+
+
+def test_build_stats_table_matches_pandas(frame):
+    sens = {'up': 1, 'down': -1, 'texte': 1}
+    st = build_stats_table(frame, {'texte': 'Texte'}, sens)
+    assert st.columns == ('up', 'down', 'texte')
+    assert st.row_of == {'1': 0, '2': 1, '3': 2, '4': 3, '5': 4}
+    assert list(st.names) == list(frame['nom_EPCI'])
+
+    numeric = frame[list(st.columns)].apply(pd.to_numeric, errors='coerce')
+    ranks = numeric.rank(pct=True) * 100
+    np.testing.assert_array_equal(st.values, numeric.to_numpy())
+    expected_pct = np.where(ranks.isna(), PERCENTILE_MISSING, np.rint(ranks)).astype(np.int8)
+    np.testing.assert_array_equal(st.percentile, expected_pct)
+    for j, col in enumerate(st.columns):
+        assert [int(s) for s in st.status[:, j]] == [reference_status(p, sens[col]) for p in ranks[col]]
+    np.testing.assert_allclose(st.minimum, numeric.min())
+    np.testing.assert_allclose(st.maximum, numeric.max())
+    np.testing.assert_allclose(st.mean, numeric.mean())
+    np.testing.assert_allclose(st.std, numeric.std())
+
+
+def test_per_variable_table_matches_the_full_table():
+    from src.datasets import get_dataset
+
+    ds = get_dataset('default')
+    full = stats_table(ds)
+    variables = list(full.columns[3:9:2])
+    part = stats_table(ds, variables)
+    assert part.columns == tuple(variables)
+    cols = full.cols(variables)
+    for name in ('values', 'percentile', 'status'):
+        np.testing.assert_array_equal(getattr(part, name), getattr(full, name)[:, cols])
+    for name in ('high_is_good', 'minimum', 'maximum', 'mean', 'std'):
+        np.testing.assert_array_equal(getattr(part, name), getattr(full, name)[cols])
@@ -0,0 +1,73 @@
+"""
+`get_dataset` cache keying: an upload is rebuilt whenever the file or its labels change, reused otherwise,
+and anything unknown falls back to the regional snapshot.
+"""
+
+import os
+
+import pytest
+
+from src import datasets
+from src.data import get_snapshot
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "UPLOADS_DIR", str(tmp_path))
+    monkeypatch.setattr(datasets, "_cache", datasets.OrderedDict())
+    (tmp_path / "local").mkdir()
+    codes = list(get_snapshot().table.get(['EPCI_CODE'])['EPCI_CODE'].astype(str))[:3]
+
+    def write(name, values):
+        path = tmp_path / "local" / name
+        path.write_text("CODE_EPCI,taux_test\n" + "".join(f"{c},{v}\n" for c, v in zip(codes, values)))
+        return f"local/{name}"
+
+    return write
+
+
+def meta(path, label="Taux test"):
+    return [{'file_path': path, 'columns_metadata': {'taux_test': {'label': label}}}]
+
+
+def test_same_file_same_labels_is_cached(upload):
+    path = upload("x.csv", [1, 2, 3])
+    first = datasets.get_dataset(path, meta(path))
+    assert first is not get_snapshot()
+    assert first.variable_dict['taux_test'] == "⭐ Taux test"
+    assert datasets.get_dataset(path, meta(path)) is first
+
+
+def test_file_or_labels_change_rebuilds(upload):
+    path = upload("x.csv", [1, 2, 3])
+    first = datasets.get_dataset(path, meta(path))
+
+    relabelled = datasets.get_dataset(path, meta(path, "Autre libellé"))
+    assert relabelled is not first and relabelled.version != first.version
+    assert relabelled.variable_dict['taux_test'] == "⭐ Autre libellé"
+
+    upload("x.csv", [10, 20, 30])
+    st = os.stat(datasets._local_path(path))
+    os.utime(datasets._local_path(path), ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    rewritten = datasets.get_dataset(path, meta(path))
+    assert rewritten is not first and rewritten.version != first.version
+    assert list(rewritten.table.get(['taux_test'])['taux_test'].dropna()) == [10, 20, 30]
+
+
+def test_unknown_datasets_resolve_to_the_base_snapshot(upload):
+    base = get_snapshot()
+    path = upload("x.csv", [1, 2, 3])
+    assert datasets.get_dataset('default', meta(path)) is base
+    assert datasets.get_dataset(None) is base
+    assert datasets.get_dataset(path, []) is base                       # not listed in the session store
+    assert datasets.get_dataset("local/absent.csv", meta("local/absent.csv")) is base
+    assert datasets.get_dataset("../x.csv", meta("../x.csv")) is base  # escapes UPLOADS_DIR
+
+
+def test_cache_is_bounded(upload, monkeypatch):
+    monkeypatch.setattr(datasets, "DATASET_CACHE_SIZE", 2)
+    paths = [upload(f"{name}.csv", [1, 2, 3]) for name in "abc"]
+    built = [datasets.get_dataset(p, meta(p)) for p in paths]
+    assert len(datasets._cache) == 2
+    assert datasets.get_dataset(paths[2], meta(paths[2])) is built[2]
+    assert datasets.get_dataset(paths[0], meta(paths[0])) is not built[0]   # evicted, rebuilt
@@ -0,0 +1,77 @@
+"""
+Bitmask filter engine (`src.filters`) against the per-slider loop it replaces: one pandas
+conversion and comparison per column, exclusion reasons concatenated string by string.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.filters import FilterMatrix, column_ranges, evaluate_filters, filter_matrix
+
+
+def reference(table, ranges, labels):
+    """(mask, reasons, nan counts, out counts, per-filter exclusions) of the per-slider loop."""
+    n = len(table)
+    mask = np.ones(n, dtype=bool)
+    reasons = np.full(n, "", dtype=object)
+    nan_counts, out_counts, excluded = [], [], []
+    for col, low, high in ranges:
+        values = pd.to_numeric(table[col], errors='coerce').to_numpy(dtype=float)
+        kept = (values >= low) & (values <= high)
+        mask &= kept
+        reasons[~kept] += f"<br>- {labels[col]}"
+        nan_counts.append(int(np.isnan(values).sum()))
+        out_counts.append(int((~kept).sum()) - nan_counts[-1])
+        excluded.append(~table[col].between(low, high).to_numpy())
+    return mask, reasons, nan_counts, out_counts, excluded
+
+
+@pytest.fixture
+def table():
+    """11 columns (more than one byte of filter bits) with missing values and repeated values."""
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 20, size=(11, 200)).astype(float)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    return pd.DataFrame({f"v{i}": row for i, row in enumerate(values)})
+
+
+def matrix_of(table):
+    columns = tuple(table.columns)
+    return FilterMatrix(columns=columns, position={c: i for i, c in enumerate(columns)},
+                        values=table.to_numpy(dtype=np.float64).T.copy())
+
+
+@pytest.mark.parametrize("n_filters", [0, 1, 8, 11])
+def test_evaluate_filters_matches_the_per_slider_loop(table, n_filters):
+    ranges = [(f"v{i}", float(i % 5), float(10 + i)) for i in range(n_filters)]
+    labels = {col: f"Variable {col}" for col in table.columns}
+    mask, reasons, nan_counts, out_counts, excluded = reference(table, ranges, labels)
+
+    result = evaluate_filters(matrix_of(table), ranges)
+    np.testing.assert_array_equal(result.mask, mask)
+    assert list(result.nan_counts) == nan_counts
+    assert list(result.out_counts) == out_counts
+    for j in range(n_filters):
+        np.testing.assert_array_equal(result.excluded_by(j), excluded[j])
+    rows = np.arange(len(table))
+    assert list(result.reasons([labels[c] for c, _, _ in ranges], rows)) == list(reasons)
+    # Reasons decoded for a subset of rows only
+    subset = np.flatnonzero(~mask)[::3]
+    assert list(result.reasons([labels[c] for c, _, _ in ranges], subset)) == list(reasons[subset])
+
+
+def test_dataset_rows_match_the_full_matrix():
+    from src.datasets import get_dataset
+
+    ds = get_dataset('default')
+    full = filter_matrix(ds)
+    columns = list(full.columns[::7][:6])
+    part = filter_matrix(ds, columns)
+    assert part.columns == tuple(columns)
+    np.testing.assert_array_equal(part.values, full.values[[full.position[c] for c in columns]])
+
+    bounds = column_ranges(ds, columns)
+    for col in columns:
+        values = pd.to_numeric(ds.table[col], errors='coerce')
+        assert bounds[col] == (values.min(), values.max())
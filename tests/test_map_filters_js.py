@@ -0,0 +1,63 @@
+"""
+Browser-side map filtering (`assets/map_filters.js`) against the server's `evaluate_filters`.
+
+The clientside callback is run with Node on the payload the server sends; it must keep exactly the
+territories the server keeps, including for bounds one float64 step away from a value.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNNER = """
+const fs = require('fs');
+global.window = {dash_clientside: {no_update: null, callback_context: {triggered: []}}};
+eval(fs.readFileSync(process.argv[2], 'utf8'));
+const args = JSON.parse(fs.readFileSync(process.argv[3], 'utf8'));
+const fig = window.dash_clientside.map.filterMap(
+    args.values, args.values, args.ids, args.payload, args.figure, args.highlight);
+process.stdout.write(JSON.stringify({kept: fig.data[1].locations, highlight: fig.data[3].locations}));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="Node.js absent")
+def test_browser_keeps_the_territories_the_server_keeps(tmp_path):
+    import app_v2  # noqa: F401  (registers the pages)
+    from src.datasets import get_dataset
+    from src.filters import evaluate_filters, filter_matrix
+    from src.pages import exploration
+
+    ds = get_dataset('default')
+    payload = exploration._map_filter_payload(ds)
+    matrix = filter_matrix(ds)
+    columns = [c for c in matrix.columns if ds.table[c].notna().all()][:3]
+    ranges = []
+    for col in columns:
+        values = matrix.values[matrix.position[col]]
+        lo, hi = np.nanpercentile(values, [20, 80])
+        # Bounds just past an actual value: float32 rounding would keep it, float64 excludes it
+        lo = np.nextafter(values[np.argmin(np.abs(values - lo))], np.inf)
+        hi = np.nextafter(values[np.argmin(np.abs(values - hi))], -np.inf)
+        ranges.append((col, float(lo), float(hi)))
+    server = evaluate_filters(filter_matrix(ds, columns), ranges)
+
+    figure = {'layout': {'meta': ds.version},
+              'data': [{}, {'meta': 'INCI_AVC'}, {}, {}, {}, {}]}
+    args = {'values': [[lo, hi] for _, lo, hi in ranges], 'payload': payload, 'figure': figure,
+            'ids': [{'type': 'exploration-slider', 'index': col} for col, _, _ in ranges], 'highlight': columns[0]}
+    (tmp_path / "args.json").write_text(json.dumps(args))
+    (tmp_path / "run.js").write_text(RUNNER)
+    out = json.loads(subprocess.run(
+        ["node", str(tmp_path / "run.js"), os.path.join(ROOT, "assets", "map_filters.js"), str(tmp_path / "args.json")],
+        capture_output=True, text=True, check=True).stdout)
+
+    codes = np.asarray(payload['codes'])
+    assert 0 < server.mask.sum() < len(codes)
+    assert out['kept'] == codes[server.mask].tolist()
+    assert out['highlight'] == codes[server.excluded_by(0)].tolist()
@@ -0,0 +1,137 @@
+"""
+Contents of the map Patch sent by `update_map` for each input that can fire it.
+
+The callback is called directly (original function, no Dash server) on the regional dataset, with
+the triggered inputs set in the callback context as Dash does for a request.
+"""
+
+import dash
+import pytest
+from dash import Patch
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+
+
+@pytest.fixture(scope="module")
+def exploration():
+    import app_v2  # noqa: F401  (registers the pages)
+    from src.pages import exploration
+    return exploration
+
+
+@pytest.fixture(scope="module")
+def state(exploration):
+    """Inputs of one map view: 2 sliders on their interdecile range, 1 selected EPCI, a highlighted slider."""
+    import numpy as np
+    from src.datasets import get_dataset
+    from src.filters import filter_matrix
+
+    ds = get_dataset('default')
+    columns = [c for c in filter_matrix(ds).columns if ds.table[c].notna().all()][:2]
+    matrix = filter_matrix(ds, columns)
+    vals = [[float(v) for v in np.nanpercentile(matrix.values[i], [10, 90])] for i in range(len(columns))]
+    return {
+        'ds': ds,
+        'ids': [{'type': 'exploration-slider', 'index': c} for c in columns],
+        'vals': vals,
+        'selection': [str(ds.table['EPCI_CODE'][0])],
+        'highlight': columns[0],
+    }
+
+
+def update_map(exploration, state, triggers, base_key, **changes):
+    """Runs update_map as a request fired by `triggers` (prop ids); returns (figure, new map-base-key)."""
+    args = {'ind': 'INCI', 'patho': 'AVC', 'slider_vals': state['vals'], 'epci_selection': state['selection'],
+            'highlight_var': state['highlight'], **changes}
+    token = context_value.set(AttributeDict(triggered_inputs=[{'prop_id': t, 'value': None} for t in triggers]))
+    try:
+        # @callback wraps the function (functools.wraps) when Dash registers it
+        callback = getattr(exploration.update_map, '__wrapped__', exploration.update_map)
+        out = callback(
+            args['ind'], args['patho'], args['slider_vals'], args['epci_selection'], args['highlight_var'], False,
+            '/exploration', 'default', state['ids'], None, base_key)
+    finally:
+        context_value.reset(token)
+    return out[0], out[5]
+
+
+def patched(fig):
+    """{trace index: set of patched properties} of a Patch."""
+    assert isinstance(fig, Patch)
+    props = {}
+    for op in fig.to_plotly_json()['operations']:
+        location = op['location']
+        assert location[0] == 'data'
+        props.setdefault(location[1], set()).add('.'.join(str(k) for k in location[2:]))
+    return props
+
+
+@pytest.fixture
+def base_key(exploration, state):
+    """map-base-key after the first, full render of the view."""
+    fig, key = update_map(exploration, state, [], None)
+    assert not isinstance(fig, Patch)
+    assert key['version'] == state['ds'].version
+    return key
+
+
+def test_selection_patches_only_the_selection_layer(exploration, state, base_key):
+    fig, _ = update_map(exploration, state, ['sidebar-epci-radar.value'], base_key,
+                        epci_selection=[str(c) for c in state['ds'].table['EPCI_CODE'][:3]])
+    assert patched(fig) == {exploration.MAP_TRACE_SELECTION: {'locations', 'z'}}
+
+
+def test_highlight_patches_only_the_highlight_layer(exploration, state, base_key):
+    fig, _ = update_map(exploration, state, ['highlight-variable-select.value'], base_key,
+                        highlight_var=state['ids'][1]['index'])
+    assert patched(fig) == {exploration.MAP_TRACE_HIGHLIGHT: {'locations', 'z', 'text', 'hovertemplate', 'name'}}
+
+
+def test_indicator_patches_only_the_focus_values(exploration, state, base_key):
+    fig, _ = update_map(exploration, state, ['map-indic-select.value'], base_key, ind='MORT')
+    assert patched(fig) == {exploration.MAP_TRACE_FOCUS: {'z', 'hovertemplate', 'colorbar.title.text', 'meta'}}
+
+
+def test_slider_changing_exclusions_patches_the_exclusion_layers(exploration, state, base_key):
+    trigger = '{"index":"%s","type":"exploration-slider"}.value' % state['ids'][0]['index']
+    low, high = state['vals'][0]
+    vals = [[low, (low + high) / 2]] + state['vals'][1:]
+    fig, key = update_map(exploration, state, [trigger], base_key, slider_vals=vals)
+    props = patched(fig)
+    assert set(props) == {exploration.MAP_TRACE_BACKGROUND, exploration.MAP_TRACE_FOCUS,
+                          exploration.MAP_TRACE_HIGHLIGHT}
+    assert props[exploration.MAP_TRACE_BACKGROUND] == {'text'}
+    assert {'locations', 'text', 'customdata', 'z'} <= props[exploration.MAP_TRACE_FOCUS]
+    assert key['exclusions'] != base_key['exclusions']
+
+
+def test_slider_keeping_exclusions_sends_no_figure(exploration, state, base_key):
+    trigger = '{"index":"%s","type":"exploration-slider"}.value' % state['ids'][0]['index']
+    fig, key = update_map(exploration, state, [trigger], base_key)
+    assert fig is dash.no_update
+    assert key == base_key
+
+
+def test_dataset_or_page_change_patches_every_layer(exploration, state, base_key):
+    for trigger in ('dataset-select.value', 'url.pathname'):
+        fig, _ = update_map(exploration, state, [trigger], base_key)
+        assert set(patched(fig)) == set(exploration.MAP_PATCH_LAYERS)
+
+
+def test_zoom_within_the_shown_tier_sends_nothing(exploration, base_key):
+    with pytest.raises(dash.exceptions.PreventUpdate):
+        exploration.update_map_geometry_tier({'geo.projection.scale': 1.5}, 'default', None, base_key)
+
+
+def test_zoom_into_another_tier_patches_the_outlines(exploration, state, base_key, monkeypatch):
+    detailed = {'url': '/geometry/detailed/epci.geojson', 'departments_url': '/geometry/detailed/departements.geojson'}
+    monkeypatch.setattr(exploration, '_map_geometry_tier', lambda ds, scale=1.0: detailed)
+    fig, key = exploration.update_map_geometry_tier({'geo.projection.scale': 8}, 'default', None, base_key)
+    assert patched(fig) == {**{i: {'geojson'} for i in exploration.MAP_EPCI_TRACES},
+                            exploration.MAP_TRACE_DEPARTMENTS: {'geojson'}}
+    assert key == {**base_key, 'tier': detailed['url']}
+    # Same tier again: nothing to send; later patches of update_map keep the tier shown
+    with pytest.raises(dash.exceptions.PreventUpdate):
+        exploration.update_map_geometry_tier({'geo.projection.scale': 9}, 'default', None, key)
+    _, after = update_map(exploration, state, ['sidebar-epci-radar.value'], key)
+    assert after['tier'] == detailed['url']
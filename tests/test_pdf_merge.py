@@ -0,0 +1,139 @@
+"""
+Merging of single-page PDF documents (`merge_pdf_pages`) and its use by the multi-page report.
+
+The merged files are checked independently of the merge code: every cross-reference entry points
+to its object, every indirect reference resolves, and the page tree counts every page.
+"""
+
+import io
+import re
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.backends.backend_pdf import PdfPages
+
+from src.utils.pdf_merge import merge_pdf_pages
+
+STREAM = re.compile(rb'stream\r?\n.*?endstream', re.S)
+
+
+def render(draw, metadata=None):
+    """Single-page PDF (bytes) of the figure drawn by `draw(fig)`."""
+    buffer = io.BytesIO()
+    with PdfPages(buffer, metadata=metadata) as pdf:
+        fig = plt.figure(figsize=(4, 3))
+        draw(fig)
+        pdf.savefig(fig)
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+def check_document(pdf):
+    """Number of pages of `pdf`, after checking its cross-reference table and references."""
+    xref = int(pdf[pdf.rindex(b'startxref') + len(b'startxref'):].split()[0])
+    assert pdf.count(b'startxref') == 1
+    assert re.match(rb'xref\s+0 \d+\s', pdf[xref:])
+    entries = re.findall(rb'(\d{10}) (\d{5}) ([nf])', pdf[xref:pdf.index(b'trailer', xref)])
+    in_use = set()
+    for obj_id, (offset, _, kind) in enumerate(entries):
+        if kind == b'n':
+            assert re.match(rb'%d 0 obj\s' % obj_id, pdf[int(offset):]), obj_id
+            in_use.add(obj_id)
+
+    structure = STREAM.sub(b'', pdf)
+    assert {int(r) for r in re.findall(rb'(\d+) 0 R\b', structure)} <= in_use
+    pages = re.findall(rb'/Type /Page\b(?!s)', structure)
+    kids = re.search(rb'/Type /Pages /Kids \[([^\]]*)\] /Count (\d+)', structure)
+    assert len(re.findall(rb'\d+ 0 R', kids.group(1))) == int(kids.group(2)) == len(pages)
+    return len(pages)
+
+
+def pages():
+    """Three pages with text in two fonts, an image and vector paths."""
+    def text(fig):
+        fig.text(0.1, 0.5, "Diagnostic territorial (AuRA) — é", fontsize=14)
+        fig.text(0.1, 0.2, "monospace", family="monospace")
+
+    def image(fig):
+        fig.add_subplot().imshow(np.arange(64).reshape(8, 8))
+
+    def lines(fig):
+        ax = fig.add_subplot()
+        ax.plot([0, 1, 2], [2, 0, 1])
+        ax.set_title("Courbe")
+
+    return [render(text), render(image), render(lines)]
+
+
+def test_merged_document_is_consistent():
+    documents = pages()
+    merged = merge_pdf_pages(documents)
+    assert check_document(merged) == 3
+    # Page contents, fonts and images are copied as they are
+    assert {s for d in documents for s in STREAM.findall(d)} == set(STREAM.findall(merged))
+
+
+def test_merge_keeps_page_order():
+    documents = pages()
+    forward, backward = merge_pdf_pages(documents), merge_pdf_pages(documents[::-1])
+    assert STREAM.findall(forward) != STREAM.findall(backward)
+    assert check_document(backward) == 3
+
+
+def test_single_document_is_returned_as_is():
+    document = pages()[0]
+    assert merge_pdf_pages([document]) is document
+
+
+@pytest.mark.parametrize("alter", [
+    # startxref pointing to an object: cross-reference stream
+    lambda d: d[:d.rindex(b'startxref')] + b'startxref\n9\n%%EOF\n',
+    # incremental update: a second section chained with /Prev
+    lambda d: d + b'xref\n0 1\n0000000000 65535 f \ntrailer\n<< /Size 1 /Prev 9 >>\nstartxref\n%d\n%%%%EOF\n' % len(d),
+    # no catalog
+    lambda d: d.replace(b'/Root', b'/Rxxx'),
+])
+def test_unsupported_layout_raises_value_error(alter):
+    documents = pages()
+    with pytest.raises(ValueError):
+        merge_pdf_pages([alter(documents[0]), documents[1]])
+
+
+@pytest.fixture(scope="module")
+def report_inputs():
+    from src.analytics import stats_table
+    from src.datasets import get_dataset
+    from src.utils.pdf_generator import PAGE_MAX
+
+    ds = get_dataset('default')
+    stats = stats_table(ds)
+    codes = ds.table['EPCI_CODE'].astype(str).tolist()[:2 * PAGE_MAX + 1]
+    variables = [c for c in stats.columns if c in ds.variable_dict][:4]
+    return lambda processes: (codes, variables, ds.table, ds.variable_dict, ds.unit_dict, ds.sens_dict,
+                              ds.category_dict, stats, ds.geometry, None, processes)
+
+
+def _without_creation_date(pdf):
+    return re.sub(rb'/CreationDate \([^)]*\)', b'', pdf)
+
+
+def test_report_does_not_depend_on_the_number_of_processes(report_inputs):
+    from src.utils.pdf_generator import generate_territory_pdf
+
+    sequential = generate_territory_pdf(*report_inputs(1)).getvalue()
+    parallel = generate_territory_pdf(*report_inputs(3)).getvalue()
+    assert check_document(sequential) == 3
+    assert _without_creation_date(parallel) == _without_creation_date(sequential)
+
+
+def test_report_falls_back_to_one_document(report_inputs, monkeypatch):
+    from src.utils import pdf_generator
+
+    def unsupported(documents):
+        raise ValueError("layout")
+
+    monkeypatch.setattr(pdf_generator, "merge_pdf_pages", unsupported)
+    assert check_document(pdf_generator.generate_territory_pdf(*report_inputs(1)).getvalue()) == 3
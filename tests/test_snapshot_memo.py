@@ -0,0 +1,28 @@
+"""
+DataSnapshot.memo: values computed once per snapshot, including factories that memoize in turn.
+"""
+
+import threading
+
+from src.data import get_snapshot
+
+
+def test_nested_memo_does_not_deadlock():
+    ds = get_snapshot()
+    calls = []
+
+    def inner():
+        calls.append('inner')
+        return 1
+
+    def outer():
+        calls.append('outer')
+        return ds.memo('test.memo.inner', inner) + 1
+
+    result = []
+    worker = threading.Thread(target=lambda: result.append(ds.memo('test.memo.outer', outer)), daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert not worker.is_alive(), "memo deadlocked on a nested factory"
+    assert result == [2]
+    assert ds.memo('test.memo.outer', outer) == 2 and calls == ['outer', 'inner']
@@ -0,0 +1,64 @@
+"""
+Vendored stylesheets: url(...) rewriting and serving of the fonts they reference.
+"""
+
+import pytest
+
+from src import static_assets
+
+CSS_URL = "https://use.fontawesome.com/releases/v5.15.4/css/all.css"
+CSS = """@font-face{font-family:"Font Awesome 5 Free";
+src:url(../webfonts/fa-regular-400.eot);
+src:url(../webfonts/fa-regular-400.eot?#iefix) format("embedded-opentype"),
+url("../webfonts/fa-regular-400.woff2") format("woff2"),url(../webfonts/fa-regular-400.woff) format("woff"),
+url('../webfonts/fa-regular-400.svg#fontawesome') format("svg"),url(data:font/woff2;base64,AAAA)}"""
+FONT_URL = "https://use.fontawesome.com/releases/v5.15.4/webfonts/fa-regular-400"
+FONTS = {FONT_URL + ext: data for ext, data in
+         ((".eot", b"eot"), (".woff2", b"woff2 bytes"), (".woff", b"woff bytes"), (".svg", b"<svg/>"))}
+
+
+@pytest.fixture
+def built(tmp_path, monkeypatch):
+    """Stylesheet vendored into a temporary static directory, with its manifest loaded."""
+    monkeypatch.setattr(static_assets, "STATIC_DIR", str(tmp_path))
+    text, resources = static_assets.vendor_stylesheet(CSS, CSS_URL, FONTS.__getitem__)
+    css_entry = static_assets.write_static_file("all.css", text.encode("utf-8"))
+    monkeypatch.setattr(static_assets, "_manifest", {CSS_URL: css_entry})
+    monkeypatch.setattr(static_assets, "_by_file", None)
+    monkeypatch.setattr(static_assets, "read_json_artifact", lambda name: {"resources": resources})
+    return text, resources
+
+
+def test_every_reference_points_to_its_own_copy(built):
+    text, resources = built
+    assert set(resources) == set(FONTS)
+    for url, entry in resources.items():
+        assert entry["etag"] == static_assets.content_hash(FONTS[url])
+    file = {url[len(FONT_URL):]: entry["file"] for url, entry in resources.items()}
+    # The .woff reference is a prefix of the .woff2 one: each must keep its own file
+    assert f'url("/static-assets/{file[".woff2"]}")' in text
+    assert f"url(/static-assets/{file['.woff']})" in text
+    assert f"url(/static-assets/{file['.eot']}#iefix)" in text
+    assert f"url('/static-assets/{file['.svg']}#fontawesome')" in text
+    assert "url(data:font/woff2;base64,AAAA)" in text
+    assert "../webfonts" not in text
+
+
+def test_rewriting_is_deterministic(built):
+    text, _ = built
+    again, _ = static_assets.vendor_stylesheet(CSS, CSS_URL, FONTS.__getitem__)
+    assert again == text
+
+
+def test_font_url_is_served(built):
+    import app_v2
+
+    _, resources = built
+    entry = resources[FONT_URL + ".woff2"]
+    client = app_v2.server.test_client()
+    response = client.get(static_assets.STATIC_URL_PREFIX + entry["file"])
+    assert response.status_code == 200
+    assert response.data == b"woff2 bytes"
+    assert response.mimetype == "font/woff2"
+    assert response.headers["Cache-Control"] == static_assets.STATIC_CACHE_CONTROL
+    assert client.get(static_assets.STATIC_URL_PREFIX + "missing.0000.woff2").status_code == 404
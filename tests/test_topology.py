@@ -0,0 +1,77 @@
+"""
+Shared-arc topology (`src.topology`) against the geometries it replaces: the EPCI polygons served
+as GeoJSON and the department outlines dissolved with shapely (`unary_union`).
+"""
+
+import pytest
+from shapely.geometry import box, shape
+from shapely.ops import unary_union
+
+from src.topology import TOPOLOGY_QUANTIZATION, encode_topology, merge_object, shapely_rings, topology_to_geojson
+
+# Quantization step of the test extent (7 units wide): decoded points move by at most half a step
+STEP = 7 / (TOPOLOGY_QUANTIZATION - 1)
+
+
+def grid():
+    """
+    5 × 5 unit cells plus two isolated cells, grouped so the merge has to produce a polygon with a
+    hole (the frame around the inner cells, and the inner ring around the centre) and a
+    multipolygon (the islands).
+    """
+    cells = []
+    for i in range(5):
+        for j in range(5):
+            if i in (0, 4) or j in (0, 4):
+                group = "frame"
+            elif (i, j) == (2, 2):
+                group = "centre"
+            else:
+                group = "mid"
+            cells.append((f"{i}{j}", group, box(i, j, i + 1, j + 1)))
+    cells += [("i1", "islands", box(6, 0, 7, 1)), ("i2", "islands", box(6, 4, 7, 5))]
+    return cells
+
+
+@pytest.fixture(scope="module")
+def topology():
+    cells = grid()
+    topo = encode_topology("epci", [({"code": c, "dep": g}, shapely_rings(geom)) for c, g, geom in cells])
+    return merge_object(topo, "epci", "departements", "dep")
+
+
+def test_shared_borders_are_stored_once(topology):
+    # Each border between two cells is one arc, referenced by both cells in opposite directions
+    refs = [ref for g in topology["objects"]["epci"]["geometries"] for ring in g["arcs"] for ref in ring]
+    forward = {r for r in refs if r >= 0}
+    backward = {~r for r in refs if r < 0}
+    assert backward and backward <= forward
+    assert len(topology["arcs"]) == len(forward)
+
+
+def test_decoded_cells_match_the_source_polygons(topology):
+    decoded = topology_to_geojson(topology, "epci")["features"]
+    for (code, _, geom), feature in zip(grid(), decoded):
+        assert feature["properties"]["code"] == code
+        out = shape(feature["geometry"])
+        assert out.is_valid
+        assert out.symmetric_difference(geom).area < geom.length * STEP
+        assert out.hausdorff_distance(geom) < STEP
+
+
+def test_merged_groups_match_unary_union(topology):
+    expected = {}
+    for _, group, geom in grid():
+        expected.setdefault(group, []).append(geom)
+    merged = {f["properties"]["dep"]: shape(f["geometry"])
+              for f in topology_to_geojson(topology, "departements")["features"]}
+    assert set(merged) == set(expected)
+    for group, parts in expected.items():
+        union = unary_union(parts)
+        out = merged[group]
+        assert out.is_valid, group
+        assert out.geom_type == union.geom_type, group
+        assert out.symmetric_difference(union).area < union.length * STEP, group
+        assert out.hausdorff_distance(union) < STEP, group
+    assert len(merged["frame"].interiors) == 1 and len(merged["mid"].interiors) == 1
+    assert len(merged["islands"].geoms) == 2
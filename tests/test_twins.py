@@ -0,0 +1,98 @@
+"""
+Twin search (`src.twins`) against the brute-force loop it replaces: median fill, z-scores, then the
+Euclidean distance of the target to every other territory, sorted (ties in table order).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.twins import build_twin_index
+from src.utils.pdf_generator import calculate_twins
+
+
+def brute_force_twins(frame, target_code, variables, k=3):
+    """Former calculate_twins: one distance per row, full sort."""
+    df = frame[['EPCI_CODE', 'nom_EPCI'] + variables].copy()
+    for v in variables:
+        df[v] = pd.to_numeric(df[v], errors='coerce')
+        med = df[v].median()
+        df[v] = df[v].fillna(med if pd.notna(med) else 0.0)
+    z = df[variables].copy()
+    for v in variables:
+        mu, sig = z[v].mean(), z[v].std()
+        z[v] = (z[v] - mu) / (sig if sig != 0 else 1.0)
+    target = df[df['EPCI_CODE'] == target_code]
+    if target.empty:
+        return []
+    vec = z.loc[target.index[0]].values
+    results = []
+    for i, row in df.iterrows():
+        if row['EPCI_CODE'] == target_code:
+            continue
+        results.append({'nom': row['nom_EPCI'], 'distance': float(np.sqrt(np.sum((vec - z.loc[i].values) ** 2)))})
+    results.sort(key=lambda x: x['distance'])
+    return results[:k]
+
+
+@pytest.fixture
+def frame():
+    """Territories with missing values, an all-missing column, a constant column and exact ties."""
+    rng = np.random.default_rng(1)
+    n = 60
+    frame = pd.DataFrame({
+        'EPCI_CODE': [str(200000000 + i) for i in range(n)],
+        'nom_EPCI': [f"EPCI {i}" for i in range(n)],
+        'a': rng.normal(size=n),
+        'b': rng.integers(0, 4, size=n).astype(float),
+        'c': np.full(n, 3.0),
+        'd': np.nan,
+    })
+    frame.loc[rng.random(n) < 0.1, 'a'] = np.nan
+    frame.loc[[5, 6, 7], ['a', 'b']] = [[0.5, 1.0]] * 3   # identical profiles: ties
+    return frame
+
+
+@pytest.mark.parametrize("variables", [['a', 'b'], ['a', 'b', 'c'], ['a', 'b', 'c', 'd']])
+def test_twins_match_the_brute_force_loop(frame, variables):
+    index = build_twin_index(frame, variables)
+    for target in frame['EPCI_CODE'].iloc[[0, 5, 6, 33]]:
+        expected = brute_force_twins(frame, target, variables)
+        got = calculate_twins(frame, target, variables, index=index)
+        assert [t['nom'] for t in got] == [t['nom'] for t in expected]
+        np.testing.assert_allclose([t['distance'] for t in got], [t['distance'] for t in expected], atol=1e-9)
+        for t in got:
+            assert t['resemblance'] == pytest.approx(100.0 * np.exp(-t['distance'] / np.sqrt(len(variables))))
+
+
+def test_many_targets_at_once_match_one_by_one(frame):
+    index = build_twin_index(frame, ['a', 'b'])
+    codes = list(frame['EPCI_CODE'])
+    rows, positions, distances = index.nearest(codes + ['inconnu'], k=5)
+    assert list(rows) == list(range(len(codes)))
+    for row, pos, dist in zip(rows, positions, distances):
+        expected = brute_force_twins(frame, codes[row], ['a', 'b'], k=5)
+        assert [index.names[p] for p in pos] == [t['nom'] for t in expected]
+        np.testing.assert_allclose(dist, [t['distance'] for t in expected], atol=1e-9)
+
+
+def test_fewer_territories_than_twins(frame):
+    index = build_twin_index(frame.head(3), ['a', 'b'])
+    rows, positions, distances = index.nearest([frame['EPCI_CODE'][0]], k=4)
+    assert list(positions[0][2:]) == [-1, -1] and np.isinf(distances[0][2:]).all()
+
+
+def test_regional_dataset_matches_the_brute_force_loop():
+    from src.datasets import get_dataset
+    from src.twins import GLOBAL_CLUSTER_VARS, twin_index
+
+    ds = get_dataset('default')
+    variables = [v for v in GLOBAL_CLUSTER_VARS if v in ds.table]
+    frame = ds.table[['EPCI_CODE', 'nom_EPCI'] + variables]
+    index = twin_index(ds, variables)
+    for target in frame['EPCI_CODE'].astype(str).iloc[::40]:
+        expected = brute_force_twins(frame, target, variables)
+        got = index.twins([target])[target]
+        assert [t['nom'] for t in got] == [t['nom'] for t in expected]
+        # Precomputed lists (ETL) store float32 distances
+        np.testing.assert_allclose([t['distance'] for t in got], [t['distance'] for t in expected], rtol=1e-5)
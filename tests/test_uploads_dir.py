@@ -0,0 +1,31 @@
+"""
+Where local uploads are resolved: `UPLOADS_DIR`, whatever SENIAURA_DATA_DIR points the base data set at.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_uploads_do_not_follow_the_data_dir_override(tmp_path):
+    env = {**os.environ, "SENIAURA_DATA_DIR": str(tmp_path), "PYTHONPATH": ROOT}
+    env.pop("SENIAURA_UPLOADS_DIR", None)
+    out = subprocess.run(
+        [sys.executable, "-c",
+         "from src import data, datasets; print(data.DATA_DIR_DASH); print(datasets._local_path('local/a.csv'))"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout.split("\n")
+    assert out[0] == str(tmp_path)
+    assert out[1] == os.path.join(ROOT, "data", "local", "a.csv")
+
+
+def test_local_path_stays_inside_uploads_dir():
+    from src.data import UPLOADS_DIR
+    from src.datasets import _local_path
+
+    assert _local_path("local/a.csv") == os.path.join(os.path.abspath(UPLOADS_DIR), "local", "a.csv")
+    with pytest.raises(ValueError):
+        _local_path("../secrets.csv")